@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify, current_app, send_from_directory
 import os
 import json
 
+from exceptions import QuotaExceededError
 from services.task_manager import task_manager
 from services.analysis_service import analysis_service
 from .auth import get_device_id
@@ -24,7 +25,9 @@ def start_analysis():
             "device_id": "guest_xxx",
             "options": {
                 "frame_interval": 5,
-                "sport_type": "basketball"
+                "sport_type": "basketball",
+                "speed_profile": "balanced",  // 可选: fast / balanced / precise
+                "two_stage": false  // 可选: 先快速发布预览结果，再后台升级为精确结果
             }
         }
 
@@ -68,14 +71,21 @@ def start_analysis():
         options = data.get('options', {})
         options['device_id'] = device_id
 
+        from config import SPEED_PROFILES
+        speed_profile = options.get('speed_profile')
+        if speed_profile is not None and speed_profile not in SPEED_PROFILES:
+            return jsonify({
+                'code': 400,
+                'message': f'未知的速度档位: {speed_profile}'
+            }), 400
+
         # 创建分析任务
-        def analysis_callback(video_path, opts, progress_cb):
-            return analysis_service.analyze_video(video_path, opts, progress_cb)
+        two_stage = bool(options.pop('two_stage', False))
 
-        task_id = task_manager.create_task(
+        task_id = task_manager.submit_task(
+            'analyze_two_stage' if two_stage else 'analyze',
             video_path=file_path,
-            options=options,
-            callback=analysis_callback
+            options=options
         )
 
         return jsonify({
@@ -84,10 +94,19 @@ def start_analysis():
             'data': {
                 'task_id': task_id,
                 'status': 'pending',
-                'device_id': device_id
+                'two_stage': two_stage,
+                'device_id': device_id,
+                **task_manager.estimate_start(task_id)
             }
         })
 
+    except QuotaExceededError as e:
+        return jsonify({
+            'code': 429,
+            'message': e.user_message,
+            'data': task_manager.get_device_usage(device_id)
+        }), 429
+
     except Exception as e:
         return jsonify({
             'code': 500,
@@ -108,7 +127,11 @@ def get_task_status(task_id):
                 "status": "processing",
                 "progress": 45,
                 "message": "正在分析第 23/50 帧",
-                "result": null  // 完成后包含结果
+                "stage": "preview",  // 两阶段任务: preview（预览可查看）/ final
+                "analysis_id": "...",  // 预览可用或完成后返回
+                "lane": "standard",  // 优先级通道: interactive / standard / bulk
+                "queue_position": 3,  // 排队中返回：预计第几个开始
+                "estimated_start_at": "2025-10-14T11:05:30"  // 排队中返回：预计开始时间（配额用完时为 null）
             }
         }
     """
@@ -129,12 +152,22 @@ def get_task_status(task_id):
             'message': task['message'],
             'created_at': task['created_at'],
             'started_at': task['started_at'],
-            'completed_at': task['completed_at']
+            'completed_at': task['completed_at'],
+            'lane': task.get('lane')
         }
 
-        # 如果任务完成，返回analysis_id
-        if task['status'] == 'completed' and task['result']:
+        # 排队中的任务返回预计开始时间
+        if task['status'] == 'pending':
+            response_data.update(task_manager.estimate_start(task_id))
+
+        # 任务完成或预览结果已发布时，返回analysis_id（预览阶段结果会被原地升级）
+        if task['status'] in ('processing', 'completed') and task['result']:
             response_data['analysis_id'] = task['result'].get('analysis_id')
+            response_data['stage'] = task.get('stage')
+
+        # 任务完成时返回各阶段性能（墙钟时间、CPU 时间、内存、处理数量）
+        if task['status'] == 'completed' and task['result']:
+            response_data['stages'] = task['result'].get('stages')
 
         # 如果任务失败，返回错误信息
         if task['status'] == 'failed' and task['error']:
@@ -152,6 +185,190 @@ def get_task_status(task_id):
         }), 500
 
 
+@analysis_bp.route('/analysis/batch', methods=['POST'])
+def start_batch():
+    """
+    批量分析：一次提交多个视频（共享分析选项），由分析 worker 并行处理
+
+    请求体：
+        {
+            "file_paths": ["/path/to/a.mp4", "/path/to/b.mp4"],
+            "options": {...}  // 同 /analysis/start，应用到每个视频
+        }
+
+    响应：
+        {
+            "code": 200,
+            "message": "批量任务已创建",
+            "data": {
+                "batch_id": "batch-uuid",
+                "task_ids": ["task-uuid", ...],
+                "status": "processing"
+            }
+        }
+    """
+    try:
+        data = request.get_json() or {}
+
+        # 获取设备ID
+        device_id = get_device_id()
+        if not device_id:
+            return jsonify({
+                'code': 401,
+                'message': '缺少设备ID，请先验证设备'
+            }), 401
+
+        # 验证参数
+        file_paths = data.get('file_paths')
+        if not file_paths or not isinstance(file_paths, list):
+            return jsonify({
+                'code': 400,
+                'message': '缺少参数: file_paths'
+            }), 400
+
+        max_files = current_app.config['BATCH_MAX_FILES']
+        if len(file_paths) > max_files:
+            return jsonify({
+                'code': 400,
+                'message': f'单个批次最多 {max_files} 个视频'
+            }), 400
+
+        missing = [path for path in file_paths if not os.path.exists(path)]
+        if missing:
+            return jsonify({
+                'code': 404,
+                'message': '视频文件不存在',
+                'data': {'missing': missing}
+            }), 404
+
+        options = data.get('options', {})
+        options['device_id'] = device_id
+
+        from config import SPEED_PROFILES
+        speed_profile = options.get('speed_profile')
+        if speed_profile is not None and speed_profile not in SPEED_PROFILES:
+            return jsonify({
+                'code': 400,
+                'message': f'未知的速度档位: {speed_profile}'
+            }), 400
+
+        two_stage = bool(options.pop('two_stage', False))
+        batch_id = task_manager.submit_batch(
+            'analyze_two_stage' if two_stage else 'analyze', file_paths, options)
+
+        return jsonify({
+            'code': 200,
+            'message': '批量任务已创建',
+            'data': {
+                'batch_id': batch_id,
+                'task_ids': task_manager.store.get_batch(batch_id)['task_ids'],
+                'status': 'processing'
+            }
+        })
+
+    except QuotaExceededError as e:
+        return jsonify({
+            'code': 429,
+            'message': e.user_message,
+            'data': task_manager.get_device_usage(device_id)
+        }), 429
+
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'创建批量任务失败: {str(e)}'
+        }), 500
+
+
+@analysis_bp.route('/analysis/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """
+    查询批量任务状态（一次请求返回全部视频的进度）
+
+    响应：
+        {
+            "code": 200,
+            "data": {
+                "batch_id": "batch-uuid",
+                "status": "processing",  // processing / comparing（生成汇总对比中）/ completed
+                "total": 3,
+                "counts": {"pending": 1, "processing": 1, "completed": 1, "failed": 0},
+                "progress": 48.3,
+                "items": [
+                    {"index": 0, "task_id": "...", "file_path": "...", "status": "completed",
+                     "progress": 100, "message": "分析完成", "analysis_id": "..."},
+                    {"index": 2, "task_id": "...", "status": "pending", "progress": 0,
+                     "queue_position": 2, "estimated_start_at": "2025-10-14T11:05:30"}
+                ],
+                "comparison": null  // 全部结束后: {"path": "...", "summary": {...}}
+            }
+        }
+    """
+    try:
+        status = task_manager.get_batch_status(batch_id)
+        if status is None:
+            return jsonify({
+                'code': 404,
+                'message': '批量任务不存在'
+            }), 404
+
+        return jsonify({
+            'code': 200,
+            'data': status
+        })
+
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'查询批量任务状态失败: {str(e)}'
+        }), 500
+
+
+@analysis_bp.route('/analysis/batch/<batch_id>/comparison', methods=['GET'])
+def get_batch_comparison(batch_id):
+    """
+    获取批量任务的汇总对比（各关键帧时间和角度的逐视频数值与组间统计）
+
+    响应：
+        {
+            "code": 200,
+            "data": {
+                "labels": ["a.mp4", "b.mp4"],
+                "keyframes": {"release": {"timestamp": {...}, "angles": {"elbow_angle": {...}}}},
+                "summary": {"count": 2, "common_keyframes": [...], "most_variable_angles": [...]}
+            }
+        }
+    """
+    try:
+        batch = task_manager.store.get_batch(batch_id)
+        if batch is None:
+            return jsonify({
+                'code': 404,
+                'message': '批量任务不存在'
+            }), 404
+
+        comparison = batch.get('comparison') or {}
+        if batch['status'] != 'completed' or not comparison.get('path'):
+            return jsonify({
+                'code': 404,
+                'message': comparison.get('error') or '汇总对比尚未生成'
+            }), 404
+
+        with open(comparison['path'], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        return jsonify({
+            'code': 200,
+            'data': data
+        })
+
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'获取汇总对比失败: {str(e)}'
+        }), 500
+
+
 @analysis_bp.route('/analysis/result/<analysis_id>', methods=['GET'])
 def get_analysis_result(analysis_id):
     """
@@ -203,6 +420,103 @@ def get_analysis_result(analysis_id):
         }), 500
 
 
+@analysis_bp.route('/analysis/reprocess', methods=['POST'])
+def reprocess_analysis():
+    """
+    基于已保存的关节点重新计算分析指标（不读取视频、不运行姿态检测）
+
+    请求体：
+        {
+            "analysis_id": "analysis_20251014_110258",  // 重算单个分析（同步返回）
+            "all": false,  // 为 true 时重算该设备的全部分析（异步任务，进程池并行）
+            "sport_type": "basketball",
+            "workers": 4  // 可选：批量重算的进程数
+        }
+
+    响应：
+        单个分析: {"code": 200, "data": {"analysis_id": "...", "keyframe_count": 12, "moved_keyframes": [...], "elapsed": 0.4}}
+        全部分析: {"code": 200, "data": {"task_id": "task-uuid", "status": "pending"}}
+    """
+    try:
+        # 获取设备ID
+        device_id = get_device_id()
+        if not device_id:
+            return jsonify({
+                'code': 401,
+                'message': '缺少设备ID，请先验证设备'
+            }), 401
+
+        data = request.get_json() or {}
+        sport_type = data.get('sport_type', 'basketball')
+
+        if data.get('all'):
+            workers = data.get('workers')
+            if workers is not None and (isinstance(workers, bool) or not isinstance(workers, int)
+                                        or workers < 1):
+                return jsonify({
+                    'code': 400,
+                    'message': 'workers 必须为正整数'
+                }), 400
+
+            # 提前校验目录，避免越界参数进入后台任务
+            analysis_service.resolve_user_path(device_id, sport_type)
+            task_id = task_manager.submit_task(
+                'reprocess_all',
+                video_path='',
+                options={'reprocess': True, 'sport_type': sport_type, 'device_id': device_id,
+                         'workers': workers}
+            )
+
+            return jsonify({
+                'code': 200,
+                'message': '批量重算任务已创建',
+                'data': {
+                    'task_id': task_id,
+                    'status': 'pending'
+                }
+            })
+
+        analysis_id = data.get('analysis_id')
+        if not analysis_id:
+            return jsonify({
+                'code': 400,
+                'message': '缺少参数: analysis_id'
+            }), 400
+
+        result = analysis_service.reprocess_analysis(analysis_id, sport_type, device_id)
+
+        return jsonify({
+            'code': 200,
+            'message': '重算完成',
+            'data': result
+        })
+
+    except PermissionError as e:
+        return jsonify({
+            'code': 403,
+            'message': str(e)
+        }), 403
+
+    except FileNotFoundError as e:
+        return jsonify({
+            'code': 404,
+            'message': str(e)
+        }), 404
+
+    except QuotaExceededError as e:
+        return jsonify({
+            'code': 429,
+            'message': e.user_message,
+            'data': task_manager.get_device_usage(device_id)
+        }), 429
+
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'重算分析失败: {str(e)}'
+        }), 500
+
+
 @analysis_bp.route('/analysis/list', methods=['GET'])
 def list_analyses():
     """
@@ -238,6 +552,30 @@ def list_analyses():
         }), 500
 
 
+@analysis_bp.route('/analysis/profiles', methods=['GET'])
+def list_speed_profiles():
+    """
+    获取可用的速度档位
+
+    响应：
+        {
+            "code": 200,
+            "data": [
+                {"name": "fast", "description": "...", "overrides": {...}}
+            ]
+        }
+    """
+    from config import SPEED_PROFILES
+
+    return jsonify({
+        'code': 200,
+        'data': [
+            {'name': name, 'description': profile['description'], 'overrides': profile['overrides']}
+            for name, profile in SPEED_PROFILES.items()
+        ]
+    })
+
+
 @analysis_bp.route('/analysis/tasks', methods=['GET'])
 def list_tasks():
     """
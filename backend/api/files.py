@@ -4,6 +4,7 @@
 from flask import Blueprint, send_file, current_app, jsonify, request
 import os
 
+from services.metrics import record_file_response
 from .auth import get_device_id
 
 files_bp = Blueprint('files', __name__)
@@ -90,7 +91,9 @@ def get_file(file_type, filename):
             }), 404
 
         # 返回文件
-        return send_file(file_path)
+        response = send_file(file_path)
+        record_file_response(file_type, response)
+        return response
 
     except Exception as e:
         return jsonify({
@@ -127,7 +130,13 @@ def get_report(report_path):
                 'message': '报告文件不存在'
             }), 404
 
-        return send_file(file_path, mimetype='text/html')
+        # 报表引用的共享静态资源（CSS/JS/视频）按扩展名推断类型
+        if file_path.endswith('.html'):
+            response = send_file(file_path, mimetype='text/html')
+        else:
+            response = send_file(file_path)
+        record_file_response('report', response)
+        return response
 
     except Exception as e:
         return jsonify({
@@ -4,12 +4,15 @@
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 import os
+import time
 import uuid
 from datetime import datetime
-import cv2
 import json
 
 from config_backend import Config
+from services.metrics import upload_bytes, upload_duration
+from services.task_manager import task_manager
+from services.upload_preprocessor import get_video_info, is_derived_file, update_upload_metadata
 from .auth import get_device_id, ensure_user_folder, get_user_folder
 
 upload_bp = Blueprint('upload', __name__)
@@ -20,11 +23,19 @@ def upload_video():
     """
     上传视频文件
 
+    保存文件后立即返回，视频信息探测、封面、分析代理和关节点预提取在后台完成
+    （见 services/upload_preprocessor.py），进度通过 /upload/<file_id> 或
+    /analysis/status/<preprocess_task_id> 查询；未启用后处理时同步探测视频信息。
+
     请求：
         - multipart/form-data
         - file: 视频文件
         - sport_type: 运动类型（可选，默认basketball）
         - device_id: 设备ID（必需）
+        - two_stage: 随后是否使用两阶段分析（可选，默认否；是时生成分析代理并预提取预览阶段的关节点）
+        - preextract: 是否预提取关节点（可选，默认取 UPLOAD_PREEXTRACT）
+        - speed_profile / frame_interval: 随后分析使用的参数（可选，与随后 /analysis/start
+          的选项一致时分析直接命中关节点缓存）
 
     响应：
         {
@@ -35,12 +46,15 @@ def upload_video():
                 "filename": "original_name.mp4",
                 "file_path": "/path/to/file",
                 "size": 1024000,
-                "duration": 5.2,
+                "duration": 5.2,  // 后台处理时为 0，处理完成后从 /upload/<file_id> 获取
                 "fps": 30,
-                "resolution": "1920x1080"
+                "resolution": "1920x1080",
+                "preprocess_task_id": "task-uuid",  // 未提交后台处理时为 null
+                "preprocess_status": "pending"  // pending / skipped / disabled
             }
         }
     """
+    start_time = time.perf_counter()
     try:
         # 获取设备ID
         device_id = get_device_id()
@@ -86,22 +100,49 @@ def upload_video():
         file_path = os.path.join(upload_folder, filename)
         file.save(file_path)
 
-        # 获取视频信息
-        video_info = get_video_info(file_path)
-        
-        # 保存元数据
-        metadata = {
+        # 保存元数据（视频信息由后台处理写入）
+        sport_type = request.form.get('sport_type', 'basketball')
+        metadata = update_upload_metadata(file_path, {
             'file_id': file_id,
             'original_filename': original_filename,
             'upload_time': datetime.now().isoformat(),
             'device_id': device_id,
-            'sport_type': request.form.get('sport_type', 'basketball'),
-            'video_info': video_info
-        }
-        
-        metadata_path = os.path.join(upload_folder, f"{file_id}.json")
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+            'sport_type': sport_type,
+            'video_info': {},
+            'preprocess': {'status': 'pending' if Config.UPLOAD_PREPROCESS else 'disabled'}
+        })
+
+        # 提交后台处理：探测视频信息、封面、分析代理、预提取关节点
+        preprocess_task_id = None
+        if Config.UPLOAD_PREPROCESS:
+            preextract = request.form.get('preextract')
+            two_stage = request.form.get('two_stage', '').lower() in ('1', 'true', 'yes')
+            analysis_options = {'sport_type': sport_type}
+            if request.form.get('speed_profile'):
+                analysis_options['speed_profile'] = request.form['speed_profile']
+            if request.form.get('frame_interval', type=int):
+                analysis_options['frame_interval'] = request.form.get('frame_interval', type=int)
+            # 后台任务不受设备配额限制（配额用完时后处理跳过关节点预提取）
+            preprocess_task_id = task_manager.submit_task('preprocess', file_path, {
+                'file_id': file_id,
+                'device_id': device_id,
+                'sport_type': sport_type,
+                'two_stage': two_stage,
+                'preextract': (Config.UPLOAD_PREEXTRACT if preextract is None
+                               else preextract.lower() not in ('0', 'false', 'no')),
+                'analysis_options': analysis_options
+            })
+
+        if preprocess_task_id is None:
+            metadata = update_upload_metadata(file_path, {
+                'video_info': get_video_info(file_path),
+                'preprocess': {'status': 'skipped' if Config.UPLOAD_PREPROCESS else 'disabled'}
+            })
+        video_info = metadata['video_info']
+
+        file_size = os.path.getsize(file_path)
+        upload_bytes.inc(file_size)
+        upload_duration.labels('ok').observe(time.perf_counter() - start_time)
 
         # 返回结果
         return jsonify({
@@ -111,59 +152,25 @@ def upload_video():
                 'file_id': file_id,
                 'filename': original_filename,
                 'file_path': file_path,
-                'size': os.path.getsize(file_path),
+                'size': file_size,
                 'duration': video_info.get('duration', 0),
                 'fps': video_info.get('fps', 0),
                 'resolution': f"{video_info.get('width', 0)}x{video_info.get('height', 0)}",
                 'frame_count': video_info.get('frame_count', 0),
-                'device_id': device_id
+                'device_id': device_id,
+                'preprocess_task_id': preprocess_task_id,
+                'preprocess_status': metadata['preprocess']['status']
             }
         })
 
     except Exception as e:
+        upload_duration.labels('error').observe(time.perf_counter() - start_time)
         return jsonify({
             'code': 500,
             'message': f'上传失败: {str(e)}'
         }), 500
 
 
-def get_video_info(video_path):
-    """
-    获取视频信息
-
-    Args:
-        video_path: 视频文件路径
-
-    Returns:
-        dict: 视频信息
-    """
-    try:
-        cap = cv2.VideoCapture(video_path)
-
-        if not cap.isOpened():
-            return {}
-
-        info = {
-            'fps': int(cap.get(cv2.CAP_PROP_FPS)),
-            'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
-            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-        }
-
-        # 计算时长
-        if info['fps'] > 0:
-            info['duration'] = round(info['frame_count'] / info['fps'], 2)
-        else:
-            info['duration'] = 0
-
-        cap.release()
-        return info
-
-    except Exception as e:
-        print(f"获取视频信息失败: {e}")
-        return {}
-
-
 @upload_bp.route('/upload/list', methods=['GET'])
 def list_uploads():
     """
@@ -199,8 +206,8 @@ def list_uploads():
 
         if os.path.exists(upload_folder):
             for filename in os.listdir(upload_folder):
-                # 跳过元数据文件
-                if filename.endswith('.json'):
+                # 跳过元数据文件和后处理生成的封面、分析代理
+                if filename.endswith('.json') or is_derived_file(filename):
                     continue
                     
                 file_path = os.path.join(upload_folder, filename)
@@ -211,12 +218,14 @@ def list_uploads():
                     file_id = filename.rsplit('.', 1)[0]
                     metadata_path = os.path.join(upload_folder, f"{file_id}.json")
                     original_filename = filename
+                    preprocess = {}
                     
                     if os.path.exists(metadata_path):
                         try:
                             with open(metadata_path, 'r', encoding='utf-8') as f:
                                 metadata = json.load(f)
                                 original_filename = metadata.get('original_filename', filename)
+                                preprocess = metadata.get('preprocess') or {}
                         except:
                             pass
                     
@@ -226,7 +235,9 @@ def list_uploads():
                         'original_filename': original_filename,
                         'size': stat.st_size,
                         'upload_time': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                        'file_path': file_path
+                        'file_path': file_path,
+                        'poster': preprocess.get('poster'),
+                        'preprocess_status': preprocess.get('status')
                     })
 
         # 按上传时间倒序排序
@@ -247,3 +258,58 @@ def list_uploads():
             'code': 500,
             'message': f'获取文件列表失败: {str(e)}'
         }), 500
+
+
+@upload_bp.route('/upload/<file_id>', methods=['GET'])
+def get_upload(file_id):
+    """
+    获取上传文件的元数据和后处理状态
+
+    响应：
+        {
+            "code": 200,
+            "data": {
+                "file_id": "uuid",
+                "original_filename": "shot.mp4",
+                "video_info": {"fps": 30, "frame_count": 156, "width": 1920, "height": 1080, "duration": 5.2},
+                "preprocess": {
+                    "status": "completed",  // pending / processing / completed / failed / skipped / disabled
+                    "poster": "uuid_poster.jpg",  // 通过 /files/upload/<device_id>/<poster> 访问
+                    "proxy": "uuid_proxy.mp4",
+                    "proxy_resolution": "640x360",
+                    "landmarks": {"cache_key": "...", "frames": 32, "cached": false}
+                }
+            }
+        }
+    """
+    try:
+        # 获取设备ID
+        device_id = get_device_id()
+        if not device_id:
+            return jsonify({
+                'code': 401,
+                'message': '缺少设备ID，请先验证设备'
+            }), 401
+
+        upload_folder = get_user_folder(device_id, 'upload')
+        metadata_path = os.path.join(upload_folder, f"{secure_filename(file_id)}.json")
+        if not os.path.exists(metadata_path):
+            return jsonify({
+                'code': 404,
+                'message': '文件不存在'
+            }), 404
+
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        return jsonify({
+            'code': 200,
+            'message': '获取文件信息成功',
+            'data': metadata
+        })
+
+    except Exception as e:
+        return jsonify({
+            'code': 500,
+            'message': f'获取文件信息失败: {str(e)}'
+        }), 500
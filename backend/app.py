@@ -2,7 +2,7 @@
 AIMotionMind Web API
 Flask 后端应用入口
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
@@ -13,6 +13,7 @@ from api.upload import upload_bp
 from api.analysis import analysis_bp
 from api.files import files_bp
 from api.auth import auth_bp
+from services.metrics import registry as metrics_registry
 
 # 导入配置
 from config_backend import Config
@@ -53,6 +54,13 @@ def create_app(config_class=Config):
             'timestamp': datetime.now().isoformat()
         })
 
+    # 运行指标（Prometheus 文本格式）
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """导出运行指标"""
+        return Response(metrics_registry.render(),
+                        mimetype='text/plain; version=0.0.4; charset=utf-8')
+
     # 统一错误处理
     @app.errorhandler(404)
     def not_found(error):
@@ -20,6 +20,13 @@ class Config:
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB 最大上传大小
     ALLOWED_EXTENSIONS = {'mp4', 'webm'}
 
+    # 上传后处理：上传请求只保存文件，随后在后台探测视频信息、生成封面和低分辨率分析代理，
+    # 并可按默认分析参数预提取关节点（/analysis/start 直接命中关节点缓存）
+    UPLOAD_PREPROCESS = os.environ.get('UPLOAD_PREPROCESS', '1') != '0'
+    UPLOAD_PREEXTRACT = os.environ.get('UPLOAD_PREEXTRACT', '1') != '0'
+    UPLOAD_POSTER_MAX_DIMENSION = 480  # 封面缩略图最大边长（像素）
+    UPLOAD_PROXY_MAX_DIMENSION = 640  # 分析代理最大边长（与 fast 档位的推理分辨率一致）
+
     # 输出目录（复用项目原有的output目录）
     OUTPUT_FOLDER = os.path.join(BASE_DIR, 'output')
 
@@ -27,6 +34,23 @@ class Config:
     TASK_TIMEOUT = 600  # 任务超时时间（秒）
     TASK_CHECK_INTERVAL = 1  # 任务状态检查间隔（秒）
 
+    # 任务状态存储：memory（进程内，开发服务器）/ sqlite（多进程共享，生产模式）
+    TASK_STORE = os.environ.get('TASK_STORE', 'memory')
+    TASK_DB_PATH = os.environ.get('TASK_DB_PATH') or os.path.join(
+        BASE_DIR, 'output', '.cache', 'tasks.sqlite3')
+    TASK_HEARTBEAT_TIMEOUT = 60  # 运行中任务心跳超时（秒），超时视为分析进程已退出
+    METRICS_FLUSH_INTERVAL = 10  # 共享存储下各进程把运行指标累加到任务数据库的间隔（秒）
+
+    # 任务调度：同时运行的任务数（进程内存储下为实际上限，共享存储下应等于全部 worker 的并发数之和，
+    # 用于估算排队时间）、单设备同时运行的任务数、单设备每日可分析帧数（默认 0 不限，运营方按需开启）
+    TASK_MAX_CONCURRENT = int(os.environ.get('TASK_MAX_CONCURRENT', 2))
+    TASK_MAX_PER_DEVICE = int(os.environ.get('TASK_MAX_PER_DEVICE', 1))
+    DEVICE_DAILY_FRAME_QUOTA = int(os.environ.get('DEVICE_DAILY_FRAME_QUOTA', 0))
+    # 同时运行的后台任务数（上传后处理，全部 worker 合计），不占用上面的分析并发数
+    TASK_MAX_BACKGROUND = int(os.environ.get('TASK_MAX_BACKGROUND', 1))
+    TASK_DEFAULT_DURATION = 60  # 没有历史任务时估算排队使用的任务耗时（秒）
+    BATCH_MAX_FILES = 20  # 单个批量任务的视频数上限
+
     # 分析配置（从原config.py导入）
     FRAME_INTERVAL = 5  # 帧提取间隔
 
@@ -52,3 +52,14 @@ class InsufficientFramesError(VideoAnalysisError):
                       "2. 视频包含完整的投篮动作\n" \
                       "3. 视频质量良好"
         super().__init__(message, user_message)
+
+
+class QuotaExceededError(Exception):
+    """设备当日算力配额已用完"""
+
+    def __init__(self, frames_used: int, daily_quota: int):
+        message = f"设备当日配额已用完: {frames_used}/{daily_quota} 帧"
+        super().__init__(message)
+        self.frames_used = frames_used
+        self.daily_quota = daily_quota
+        self.user_message = f"今日分析额度已用完（{daily_quota} 帧），请明天再试"
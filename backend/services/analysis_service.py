@@ -4,16 +4,18 @@
 import sys
 import os
 import json
+import uuid
 from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.dirname(
     os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, BASE_DIR)
 
-from sports.basketball.shot_analyzer import BasketballShotAnalyzer
-from core.report_generator import ReportGenerator
-from core.data_manager import DataManager
-from core.video_processor import VideoProcessor
+# 分析管线（MediaPipe / OpenCV / pandas / Jinja2）在首次使用时才导入，
+# API 进程启动时不加载
+from sports.basketball.speed_profiles import apply_speed_profile
+from core.asset_store import compute_file_hash
+from core.instrumentation import StageProfiler
 from config import BASKETBALL_SHOT_CONFIG, OUTPUT_DIR
 
 # 导入自定义异常
@@ -36,11 +38,22 @@ class AnalysisService:
         Args:
             video_path: 视频文件路径
             options: 分析选项
-                - frame_interval: 帧间隔（默认5）
+                - frame_interval: 帧间隔（默认5；启用关键帧精细化时默认使用粗采样间隔）
+                - refine_keyframes: 是否启用关键帧精细化（默认取配置）
+                - adaptive_sampling: 是否按运动量自适应采样（默认取配置）
+                - speed_profile: 速度档位 fast / balanced / precise（可选，覆盖模型复杂度、
+                  推理分辨率和采样密度；显式传入的其他选项优先）
                 - sport_type: 运动类型（默认basketball）
                 - device_id: 设备ID（用于确定输出目录）
                 - analysis_name: 自定义分析名称（可选）
                 - analysis_id: 自定义分析ID（可选）
+                - save_frames: 是否保存采样帧图片（默认True）
+                - generate_report: 是否生成HTML报告（默认True）
+                - use_landmark_cache: 是否读写关节点缓存（默认取配置；命中时跳过解码和推理，
+                  也不再保存采样帧图片）
+                - proxy_path: 低分辨率分析代理（帧率和帧号与原视频一致）；提供时从代理解码采样帧，
+                  关节点坐标换算回原视频尺寸，视频信息和关键帧图片仍取自原视频
+                - analysis_stage: 写入清单的分析阶段 preview / final（默认final）
             progress_callback: 进度回调函数 callback(progress: int, message: str)
 
         Returns:
@@ -50,15 +63,42 @@ class AnalysisService:
                 - video_info: 视频信息
                 - keyframes: 关键帧信息
                 - report_path: 报告路径
+                - stages: 各阶段性能（probe / decode / pose / kinematics / keyframes / annotate /
+                  keyframe_images / export / report 的墙钟时间、CPU 时间、内存和处理数量）
         """
+        from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+        from core.report_generator import ReportGenerator
+        from core.data_manager import DataManager, ANALYSIS_SCHEMA_VERSION
+        from core.video_processor import VideoProcessor
+        from core.landmark_cache import LandmarkCache, get_landmark_cache
+
+        profiler = StageProfiler()
+
         try:
             # 更新进度：0%
             if progress_callback:
                 progress_callback(0, '开始处理视频...')
 
+            # 应用速度档位（未知档位直接报错）
+            config = apply_speed_profile(self.config, options.get('speed_profile'))
+
             # 1. 初始化视频处理器
-            processor = VideoProcessor(video_path)
-            video_info = processor.get_video_info()
+            with profiler.stage('probe'):
+                processor = VideoProcessor(
+                    video_path,
+                    max_inference_dimension=config.get('max_inference_dimension'))
+                video_info = processor.get_video_info()
+
+                # 采样帧从分析代理解码（代理不存在时回退原视频）
+                decoder = processor
+                decode_path = video_path
+                proxy_path = options.get('proxy_path')
+                if proxy_path and os.path.exists(proxy_path):
+                    decoder = VideoProcessor(
+                        proxy_path,
+                        max_inference_dimension=config.get('max_inference_dimension'),
+                        source_size=(processor.width, processor.height))
+                    decode_path = proxy_path
 
             # 更新进度：5%
             if progress_callback:
@@ -66,19 +106,8 @@ class AnalysisService:
 
             # 2. 创建输出目录（支持用户隔离和自定义名称）
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # 如果提供了自定义分析ID，使用它；否则生成默认ID
-            if options.get('analysis_id'):
-                analysis_id = options.get('analysis_id')
-            elif options.get('analysis_name'):
-                # 清理分析名称，确保文件系统安全
-                clean_name = options.get('analysis_name', '').strip()
-                clean_name = ''.join(c for c in clean_name if c.isalnum() or c in ('_', '-', ' '))
-                clean_name = clean_name.replace(' ', '_')[:50]  # 限制长度
-                analysis_id = f"{clean_name}_{timestamp}" if clean_name else f"analysis_{timestamp}"
-            else:
-                analysis_id = f"analysis_{timestamp}"
-            
+            analysis_id = self._resolve_analysis_id(options, timestamp)
+
             sport_type = options.get('sport_type', 'basketball')
             device_id = options.get('device_id', '')
             
@@ -93,29 +122,55 @@ class AnalysisService:
                 progress_callback(10, '创建输出目录...')
 
             # 3. 提取视频帧
-            frame_interval = options.get(
-                'frame_interval', self.config.get('frame_interval', 5))
-
-            if progress_callback:
-                progress_callback(15, f'开始提取视频帧（间隔{frame_interval}帧）...')
-
-            frames_data = processor.extract_frames(
-                frame_interval=frame_interval,
-                output_dir=os.path.join(output_dir, 'frames')
-            )
-
-            # 更新进度：30%
-            if progress_callback:
-                progress_callback(30, f'视频帧提取完成: {len(frames_data)}帧')
+            refine_keyframes, frame_interval, adaptive_sampling = self._sampling_params(config, options)
+            sampling_config = config.get('adaptive_sampling', {})
+
+            # 同一视频、采样参数和模型配置的检测结果可直接复用
+            landmark_cache = None
+            cache_key = None
+            cached = None
+            if options.get('use_landmark_cache',
+                           config.get('landmark_cache', {}).get('enabled', False)):
+                with profiler.stage('landmark_cache') as stage:
+                    landmark_cache = get_landmark_cache()
+                    cache_key = LandmarkCache.make_key(
+                        decode_path, config, frame_interval, adaptive_sampling)
+                    cached = landmark_cache.load(cache_key)
+                    stage.items = len(cached['frames']) if cached else 0
+
+            if cached is not None:
+                frames_data = cached['frames']
+                if progress_callback:
+                    progress_callback(30, f'命中关节点缓存: {len(frames_data)}帧，跳过解码和推理')
+            else:
+                if progress_callback:
+                    progress_callback(15, f'开始提取视频帧（间隔{frame_interval}帧）...')
+
+                with profiler.stage('decode') as stage:
+                    frames_data = decoder.extract_frames(
+                        frame_interval=frame_interval,
+                        output_dir=(os.path.join(output_dir, 'frames')
+                                    if options.get('save_frames', True) else None),
+                        adaptive=adaptive_sampling,
+                        min_interval=sampling_config.get('min_frame_interval', 1),
+                        max_interval=sampling_config.get('max_frame_interval')
+                    )
+                    stage.items = len(frames_data)
+
+                # 更新进度：30%
+                if progress_callback:
+                    progress_callback(30, f'视频帧提取完成: {len(frames_data)}帧')
 
             # 4. 姿态分析
             if progress_callback:
                 progress_callback(35, '开始姿态检测和指标计算...')
 
             try:
-                analyzer = BasketballShotAnalyzer(self.config)
+                analyzer = BasketballShotAnalyzer(config, profiler=profiler)
                 analysis_results = analyzer.analyze_frames(
-                    frames_data, processor.fps)
+                    frames_data, processor.fps,
+                    video_processor=processor if refine_keyframes else None,
+                    dense_frames=cached['dense_frames'] if cached else None)
             except ValueError as e:
                 # 捕获关键帧检测失败的错误
                 error_msg = str(e)
@@ -129,6 +184,13 @@ class AnalysisService:
                 # 捕获NoneType相关的错误
                 raise PoseDetectionError(f"姿态数据处理失败: {str(e)}")
 
+            if landmark_cache is not None:
+                try:
+                    landmark_cache.save(cache_key, analyzer.frames_data,
+                                        analyzer.dense_frames, previous=cached)
+                except OSError as e:
+                    print(f"⚠️ 关节点缓存写入失败: {e}")
+
             # 更新进度：60%
             if progress_callback:
                 progress_callback(60, '姿态分析完成，开始检测关键帧...')
@@ -141,12 +203,21 @@ class AnalysisService:
             os.makedirs(keyframes_dir, exist_ok=True)
 
             import cv2
-            for kf_name, kf_data in keyframes.items():
-                if 'frame_data' in kf_data and 'image' in kf_data['frame_data']:
-                    kf_filename = f"keyframe_{kf_name}.jpg"
-                    kf_path = os.path.join(keyframes_dir, kf_filename)
-                    cv2.imwrite(kf_path, kf_data['frame_data']['image'])
-                    kf_data['filename'] = kf_filename
+            with profiler.stage('keyframe_images') as stage:
+                for kf_name, kf_data in keyframes.items():
+                    if 'frame_data' in kf_data:
+                        # 推理帧可能已缩小，关键帧图片使用原分辨率帧
+                        kf_image = processor.get_full_resolution_image(kf_data['frame_data'])
+                        if kf_image is None:
+                            continue
+                        kf_filename = f"keyframe_{kf_name}.jpg"
+                        kf_path = os.path.join(keyframes_dir, kf_filename)
+                        # 两阶段分析的精确阶段覆盖预览图片，先写临时文件再替换
+                        tmp_path = f"{os.path.splitext(kf_path)[0]}.{uuid.uuid4().hex}.tmp.jpg"
+                        cv2.imwrite(tmp_path, kf_image)
+                        os.replace(tmp_path, kf_path)
+                        kf_data['filename'] = kf_filename
+                stage.items = sum(1 for kf_data in keyframes.values() if 'filename' in kf_data)
 
             # 更新进度：75%
             if progress_callback:
@@ -156,60 +227,64 @@ class AnalysisService:
             if progress_callback:
                 progress_callback(80, '保存分析数据...')
 
-            data_manager = DataManager()
-            data_manager.create_dataframes(analysis_results)
-
-            # 导出 CSV 数据
-            csv_dir = os.path.join(output_dir, 'data')
-            data_manager.export_to_csv(csv_dir)
-
-            # 导出分析结果 JSON（仅 analysis_results）
-            json_path = os.path.join(output_dir, 'data', 'analysis_data.json')
-            data_manager.export_to_json(analysis_results, json_path)
-
-            # 导出完整数据 JSON（包含 video_info、keyframes 等）
-            complete_json_path = os.path.join(output_dir, 'data', 'complete_data.json')
-            complete_data = {
-                'video_info': video_info,
-                'analysis_results': analysis_results,
-                'keyframes': keyframes,
-                'timestamp': timestamp,
-                'device_id': device_id,
-                'sport_type': sport_type,
-                'analysis_name': options.get('analysis_name', '')
-            }
-            os.makedirs(os.path.dirname(complete_json_path), exist_ok=True)
-            with open(complete_json_path, 'w', encoding='utf-8') as f:
-                json.dump(complete_data, f, ensure_ascii=False, indent=2, default=str)
-            
-            # 保存元数据到单独的文件
-            metadata_path = os.path.join(output_dir, 'metadata.json')
-            metadata = {
-                'analysis_id': analysis_id,
-                'analysis_name': options.get('analysis_name', ''),
-                'analysis_time': datetime.now().isoformat(),
-                'video_file': os.path.basename(video_path),
-                'sport_type': sport_type,
-                'device_id': device_id,
-                'output_dir': output_dir,
-                'frame_interval': options.get('frame_interval', 5)
-            }
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
-
-            # 更新进度：90%
-            if progress_callback:
-                progress_callback(90, '生成分析报告...')
-
-            # 7. 生成报告
-            report_generator = ReportGenerator()
-            reports_dir = os.path.join(output_dir, 'reports')
-            os.makedirs(reports_dir, exist_ok=True)
-            report_path = report_generator.generate_report(
-                analysis_results=analysis_results,
-                video_path=video_path,
-                output_dir=reports_dir
-            )
+            with profiler.stage('export', len(analysis_results['frames'])):
+                data_manager = DataManager()
+                data_manager.create_dataframes(
+                    analysis_results, analyzer.get_time_series())
+
+                # 导出 CSV 数据
+                csv_dir = os.path.join(output_dir, 'data')
+                data_manager.export_to_csv(csv_dir)
+
+                # 导出分析结果 JSON（唯一的规范数据文件，帧数据只保存一份）
+                json_path = os.path.join(output_dir, 'data', 'analysis_data.json')
+                data_manager.export_to_json(analysis_results, json_path)
+
+                # 保存精简清单（元数据 + 视频信息），列表和详情页只需读取此文件定位数据
+                metadata_path = os.path.join(output_dir, 'metadata.json')
+                metadata = {
+                    'analysis_id': analysis_id,
+                    'analysis_name': options.get('analysis_name', ''),
+                    'analysis_time': datetime.now().isoformat(),
+                    'timestamp': timestamp,
+                    'video_file': os.path.basename(video_path),
+                    'video_hash': compute_file_hash(video_path),
+                    'video_info': video_info,
+                    'sport_type': sport_type,
+                    'device_id': device_id,
+                    'output_dir': output_dir,
+                    'frame_interval': frame_interval,
+                    'refine_keyframes': bool(refine_keyframes),
+                    'adaptive_sampling': bool(adaptive_sampling),
+                    'speed_profile': options.get('speed_profile'),
+                    'analysis_stage': options.get('analysis_stage', 'final'),
+                    'keyframe_count': len(keyframes),
+                    'data_file': os.path.join('data', 'analysis_data.json'),
+                    'schema_version': ANALYSIS_SCHEMA_VERSION
+                }
+                # 精确阶段覆盖预览阶段的清单，先写临时文件再替换
+                tmp_path = f"{metadata_path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(metadata, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, metadata_path)
+
+            # 7. 生成报告（预览阶段跳过，由精确阶段生成）
+            report_path = None
+            if options.get('generate_report', True):
+                # 更新进度：90%
+                if progress_callback:
+                    progress_callback(90, '生成分析报告...')
+
+                # 报表通过 HTTP 提供，逐帧数据写入独立文件由页面按需加载
+                with profiler.stage('report'):
+                    report_generator = ReportGenerator(data_mode="external")
+                    reports_dir = os.path.join(output_dir, 'reports')
+                    os.makedirs(reports_dir, exist_ok=True)
+                    report_path = report_generator.generate_report(
+                        analysis_results=analysis_results,
+                        video_path=video_path,
+                        output_dir=reports_dir
+                    )
 
             # 更新进度：95%
             if progress_callback:
@@ -218,6 +293,8 @@ class AnalysisService:
             # 8. 清理
             if hasattr(processor, 'cap') and processor.cap is not None:
                 processor.cap.release()
+            if decoder is not processor and decoder.cap is not None:
+                decoder.cap.release()
 
             # 更新进度：100%
             if progress_callback:
@@ -231,7 +308,8 @@ class AnalysisService:
                 'analysis_results': analysis_results,
                 'keyframes': keyframes,
                 'report_path': report_path,
-                'timestamp': timestamp
+                'timestamp': timestamp,
+                'stages': profiler.summary()
             }
 
         except VideoAnalysisError as e:
@@ -247,6 +325,205 @@ class AnalysisService:
                 progress_callback(-1, user_msg)
             raise VideoAnalysisError(error_msg, user_msg)
 
+    def analyze_video_two_stage(self, video_path: str, options: dict, progress_callback=None):
+        """
+        两阶段分析：先快速预览，再在后台升级为精确结果
+
+        第一阶段使用轻量模型和粗采样，只输出关键帧和摘要（不保存采样帧、
+        不生成报告），完成后通过 progress_callback 的 partial_result 参数
+        发布到任务结果；第二阶段使用精确档位写入同一分析目录，原地覆盖预览数据。
+        精确阶段失败时保留预览结果，不让整个任务失败。
+        上传后处理已生成低分辨率分析代理时，预览阶段从代理解码。
+
+        Args:
+            video_path: 视频文件路径
+            options: 分析选项（同 analyze_video），额外支持：
+                - preview_profile: 预览阶段档位（默认fast）
+                - final_profile: 精确阶段档位（默认precise，显式传入 speed_profile 时使用它）
+                - use_proxy: 预览阶段是否使用分析代理（默认True）
+            progress_callback: 进度回调函数
+                callback(progress: int, message: str, partial_result: dict = None)
+
+        Returns:
+            dict: 精确阶段的分析结果（stage 为 final）；精确阶段失败时为预览结果
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        analysis_id = self._resolve_analysis_id(options, timestamp)
+
+        # 阶段1：预览（占总进度 0-30%）
+        preview_options = self.preview_options(video_path, options)
+        preview_options['analysis_id'] = analysis_id
+        preview = self.analyze_video(
+            video_path, preview_options,
+            self._stage_progress(progress_callback, 0, 30, '预览'))
+        preview['stage'] = 'preview'
+
+        if progress_callback:
+            progress_callback(30, '预览结果已生成，正在进行精确分析...', partial_result=preview)
+
+        # 阶段2：精确分析（占总进度 30-100%），写入同一目录
+        final_options = dict(options)
+        final_options.update({
+            'analysis_id': analysis_id,
+            'speed_profile': options.get('speed_profile') or options.get('final_profile', 'precise'),
+            'analysis_stage': 'final'
+        })
+        try:
+            result = self.analyze_video(
+                video_path, final_options,
+                self._stage_progress(progress_callback, 30, 100, '精确分析'))
+        except VideoAnalysisError as e:
+            print(f"⚠️ 精确分析失败，保留预览结果: {e}")
+            preview['refine_error'] = e.user_message
+            return preview
+
+        result['stage'] = 'final'
+        return result
+
+    @staticmethod
+    def preview_options(video_path: str, options: dict) -> dict:
+        """
+        两阶段分析预览阶段的分析选项（上传后处理按它预提取预览使用的关节点）
+
+        Args:
+            video_path: 视频文件路径
+            options: 两阶段分析选项
+
+        Returns:
+            dict: 预览阶段选项（不含 analysis_id）
+        """
+        preview_options = dict(options)
+        for key in ('frame_interval', 'refine_keyframes', 'adaptive_sampling'):
+            preview_options.pop(key, None)
+        preview_options.update({
+            'speed_profile': options.get('preview_profile', 'fast'),
+            'refine_keyframes': False,
+            'save_frames': False,
+            'generate_report': False,
+            'analysis_stage': 'preview'
+        })
+        if options.get('use_proxy', True):
+            from services.upload_preprocessor import find_proxy
+            preview_options['proxy_path'] = find_proxy(video_path)
+        return preview_options
+
+    def preextract_landmarks(self, video_path: str, options: dict) -> dict:
+        """
+        预提取关节点：按分析时相同的采样参数解码并检测，结果写入关节点缓存
+
+        不计算指标、不输出分析目录；随后用相同选项（速度档位、帧间隔、采样方式）
+        分析同一视频时命中缓存，跳过解码和推理。
+
+        Args:
+            video_path: 视频文件路径
+            options: 分析选项（读取 speed_profile / frame_interval / refine_keyframes / adaptive_sampling /
+                proxy_path，与随后分析的选项一致才能命中缓存）
+
+        Returns:
+            dict: {cache_key, frames: 检测的帧数, cached: 是否已有缓存（已有时不重复检测）}；
+                未启用关节点缓存时 cache_key 为 None
+        """
+        from core.video_processor import VideoProcessor
+        from core.landmark_cache import LandmarkCache, get_landmark_cache
+        from core.pose_backends import create_pose_backend
+
+        config = apply_speed_profile(self.config, options.get('speed_profile'))
+        if not options.get('use_landmark_cache',
+                           config.get('landmark_cache', {}).get('enabled', False)):
+            return {'cache_key': None, 'frames': 0, 'cached': False}
+        _, frame_interval, adaptive_sampling = self._sampling_params(config, options)
+        sampling_config = config.get('adaptive_sampling', {})
+
+        # 与 analyze_video 相同：提供分析代理时从代理解码，缓存键按代理计算
+        decode_path = video_path
+        source_size = None
+        proxy_path = options.get('proxy_path')
+        if proxy_path and os.path.exists(proxy_path):
+            source = VideoProcessor(video_path)
+            source_size = (source.width, source.height)
+            source.cap.release()
+            decode_path = proxy_path
+
+        landmark_cache = get_landmark_cache()
+        cache_key = LandmarkCache.make_key(decode_path, config, frame_interval, adaptive_sampling)
+        if landmark_cache.contains(cache_key):
+            return {'cache_key': cache_key, 'frames': 0, 'cached': True}
+
+        processor = VideoProcessor(
+            decode_path, max_inference_dimension=config.get('max_inference_dimension'),
+            source_size=source_size)
+        pose_backend = create_pose_backend(config)
+        try:
+            frames_data = processor.extract_frames(
+                frame_interval=frame_interval,
+                adaptive=adaptive_sampling,
+                min_interval=sampling_config.get('min_frame_interval', 1),
+                max_interval=sampling_config.get('max_frame_interval'))
+            # 检测后立即丢弃图像，只保留缓存需要的字段
+            records = []
+            for frame_info in frames_data:
+                record = {
+                    'frame_number': frame_info['frame_number'],
+                    'timestamp': frame_info['timestamp'],
+                    'cached_pose': pose_backend.detect_frame(frame_info)
+                }
+                if 'original_size' in frame_info:
+                    record['original_size'] = frame_info['original_size']
+                records.append(record)
+                frame_info.pop('image', None)
+        finally:
+            pose_backend.close()
+            processor.cap.release()
+
+        landmark_cache.save(cache_key, records)
+        return {'cache_key': cache_key, 'frames': len(records), 'cached': False}
+
+    @staticmethod
+    def _stage_progress(progress_callback, start: int, end: int, label: str):
+        """将单阶段 0-100 的进度映射到总进度区间 [start, end]"""
+        if progress_callback is None:
+            return None
+
+        def callback(progress: int, message: str):
+            if progress < 0:
+                # 失败由两阶段流程统一处理，不提前改写任务消息
+                return
+            scaled = start + (end - start) * progress // 100
+            progress_callback(scaled, f'[{label}] {message}')
+
+        return callback
+
+    @staticmethod
+    def _sampling_params(config: dict, options: dict):
+        """
+        帧采样参数（选项优先，其次取配置）
+
+        Returns:
+            (refine_keyframes, frame_interval, adaptive_sampling)
+        """
+        refinement_config = config.get('keyframe_refinement', {})
+        refine_keyframes = options.get(
+            'refine_keyframes', refinement_config.get('enabled', False))
+        default_interval = (refinement_config.get('coarse_frame_interval', 6)
+                            if refine_keyframes else config.get('frame_interval', 5))
+        frame_interval = options.get('frame_interval', default_interval)
+        adaptive_sampling = options.get(
+            'adaptive_sampling', config.get('adaptive_sampling', {}).get('enabled', False))
+        return refine_keyframes, frame_interval, adaptive_sampling
+
+    @staticmethod
+    def _resolve_analysis_id(options: dict, timestamp: str) -> str:
+        """根据选项确定分析ID（自定义ID > 自定义名称 > 默认ID）"""
+        if options.get('analysis_id'):
+            return options.get('analysis_id')
+        if options.get('analysis_name'):
+            # 清理分析名称，确保文件系统安全
+            clean_name = options.get('analysis_name', '').strip()
+            clean_name = ''.join(c for c in clean_name if c.isalnum() or c in ('_', '-', ' '))
+            clean_name = clean_name.replace(' ', '_')[:50]  # 限制长度
+            return f"{clean_name}_{timestamp}" if clean_name else f"analysis_{timestamp}"
+        return f"analysis_{timestamp}"
+
     def get_analysis_result(self, analysis_id: str, sport_type: str = 'basketball', device_id: str = None):
         """
         获取分析结果
@@ -259,6 +536,8 @@ class AnalysisService:
         Returns:
             dict: 分析结果
         """
+        from core.data_manager import DataManager, ANALYSIS_SCHEMA_VERSION
+
         try:
             # 如果有device_id，从用户文件夹读取
             if device_id:
@@ -269,20 +548,33 @@ class AnalysisService:
             if not os.path.exists(output_dir):
                 raise FileNotFoundError(f"分析结果不存在: {analysis_id}")
 
-            # 优先读取完整数据文件
-            complete_data_file = os.path.join(output_dir, 'data', 'complete_data.json')
+            metadata_file = os.path.join(output_dir, 'metadata.json')
             data_file = os.path.join(output_dir, 'data', 'analysis_data.json')
+            # 旧版本分析额外写出的完整数据文件
+            complete_data_file = os.path.join(output_dir, 'data', 'complete_data.json')
+
+            metadata = {}
+            if os.path.exists(metadata_file):
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
 
             data = {}
-            if os.path.exists(complete_data_file):
-                # 读取完整数据（包含 video_info）
+            if metadata.get('schema_version', 1) >= ANALYSIS_SCHEMA_VERSION \
+                    and os.path.exists(data_file):
+                # 规范数据文件 + 清单：按帧索引还原关键帧数据
+                analysis_results = DataManager.load_analysis_json(data_file)
+                data = {
+                    'video_info': metadata.get('video_info'),
+                    'analysis_results': analysis_results,
+                    'keyframes': analysis_results.get('keyframes')
+                }
+            elif os.path.exists(complete_data_file):
+                # 兼容旧格式：完整数据（包含 video_info）
                 with open(complete_data_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
             elif os.path.exists(data_file):
                 # 降级读取旧格式数据（仅 analysis_results）
-                with open(data_file, 'r', encoding='utf-8') as f:
-                    analysis_results = json.load(f)
-                    data = {'analysis_results': analysis_results}
+                data = {'analysis_results': DataManager.load_analysis_json(data_file)}
             else:
                 raise FileNotFoundError(f"分析数据文件不存在")
 
@@ -340,19 +632,30 @@ class AnalysisService:
                 if not os.path.isdir(analysis_path) or 'comparison' in analysis_id:
                     continue
 
-                # 读取分析数据
+                # 优先读取精简清单，避免为列表加载完整帧数据
+                metadata_file = os.path.join(analysis_path, 'metadata.json')
                 data_file = os.path.join(
                     analysis_path, 'data', 'analysis_data.json')
-                if os.path.exists(data_file):
+                if not os.path.exists(data_file):
+                    continue
+
+                metadata = {}
+                if os.path.exists(metadata_file):
+                    with open(metadata_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+
+                if 'keyframe_count' in metadata:
+                    keyframe_count = metadata['keyframe_count']
+                else:
                     with open(data_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                        keyframe_count = len(json.load(f).get('keyframes', []))
 
-                    analyses.append({
-                        'analysis_id': analysis_id,
-                        'timestamp': analysis_id.replace('analysis_', ''),
-                        'video_info': data.get('video_info'),
-                        'keyframe_count': len(data.get('keyframes', []))
-                    })
+                analyses.append({
+                    'analysis_id': analysis_id,
+                    'timestamp': analysis_id.replace('analysis_', ''),
+                    'video_info': metadata.get('video_info'),
+                    'keyframe_count': keyframe_count
+                })
 
             # 按时间倒序排序
             analyses.sort(key=lambda x: x['timestamp'], reverse=True)
@@ -362,6 +665,108 @@ class AnalysisService:
         except Exception as e:
             raise Exception(f"列出分析结果失败: {str(e)}")
 
+    def reprocess_analysis(self, analysis_id: str, sport_type: str = 'basketball',
+                           device_id: str = None):
+        """
+        基于已保存的关节点重新计算单个分析的全部指标（不读取视频）
+
+        Args:
+            analysis_id: 分析ID
+            sport_type: 运动类型
+            device_id: 设备ID（用于定位用户文件夹）
+
+        Returns:
+            dict: 重算摘要
+
+        Raises:
+            PermissionError: 参数指向用户目录之外
+            FileNotFoundError: 分析结果不存在
+        """
+        analysis_dir = self.resolve_user_path(device_id, sport_type, analysis_id)
+        if not os.path.exists(os.path.join(analysis_dir, 'data', 'analysis_data.json')):
+            raise FileNotFoundError(f"分析结果不存在: {analysis_id}")
+
+        from sports.basketball.reprocessor import reprocess_analysis
+        return reprocess_analysis(analysis_dir, self.config)
+
+    def reprocess_all(self, sport_type: str = 'basketball', device_id: str = None,
+                      max_workers: int = None, progress_callback=None):
+        """
+        用进程池批量重算用户（或全局）目录下的全部分析
+
+        Args:
+            sport_type: 运动类型
+            device_id: 设备ID（用于定位用户文件夹）
+            max_workers: 进程数，默认为 CPU 核数
+            progress_callback: 进度回调函数 callback(progress: int, message: str)
+
+        Returns:
+            dict: 汇总 {total, completed, failed, elapsed, results}
+
+        Raises:
+            PermissionError: 运动类型指向用户目录之外
+        """
+        from sports.basketball.reprocessor import reprocess_all, find_analysis_dirs
+
+        sport_dir = self.resolve_user_path(device_id, sport_type)
+        analysis_dirs = find_analysis_dirs(sport_dir) if os.path.isdir(sport_dir) else []
+        if progress_callback:
+            progress_callback(0, f'共 {len(analysis_dirs)} 个分析待重算...')
+
+        return reprocess_all(analysis_dirs, max_workers=max_workers,
+                             progress_callback=progress_callback)
+
+    def compare_batch(self, batch_id: str, items: list, sport_type: str = 'basketball',
+                      device_id: str = None) -> dict:
+        """
+        生成批量分析的汇总对比
+
+        Args:
+            batch_id: 批次ID
+            items: 成功分析的条目 [{label, output_dir}, ...]
+            sport_type: 运动类型
+            device_id: 设备ID（用于定位用户文件夹）
+
+        Returns:
+            dict: {path: 对比数据文件, summary: 对比摘要}
+        """
+        from sports.basketball.keyframe_comparison import KeyframeComparison
+        from core.data_manager import DataManager
+
+        datas = [DataManager.load_analysis_json(
+            os.path.join(item['output_dir'], 'data', 'analysis_data.json')) for item in items]
+        comparison = KeyframeComparison.compare_many(
+            datas, [item['label'] for item in items], [item['output_dir'] for item in items])
+        comparison['batch_id'] = batch_id
+
+        output_dir = os.path.join(
+            self._sport_dir(sport_type, device_id), 'comparison_reports', f'batch_{batch_id}')
+        os.makedirs(output_dir, exist_ok=True)
+        path = KeyframeComparison.save_comparison_data(comparison, output_dir)
+        return {'path': path, 'summary': comparison['summary']}
+
+    def _sport_dir(self, sport_type: str, device_id: str = None) -> str:
+        """分析结果所在目录（有device_id时为用户文件夹）"""
+        if device_id:
+            return os.path.join(self.output_dir, device_id, sport_type)
+        return os.path.join(self.output_dir, sport_type)
+
+    def resolve_user_path(self, device_id: str, *parts: str) -> str:
+        """
+        用户目录（无device_id时为输出根目录）下的路径
+
+        重算会改写文件，客户端传入的运动类型和分析ID不能借助 ../ 或绝对路径访问其他用户的分析。
+
+        Raises:
+            PermissionError: 路径不在用户目录之内
+        """
+        base_dir = os.path.abspath(
+            os.path.join(self.output_dir, device_id) if device_id else self.output_dir)
+        path = os.path.abspath(os.path.join(base_dir, *parts))
+        if not path.startswith(base_dir + os.sep):
+            raise PermissionError(f"非法的分析路径: {'/'.join(parts)}")
+        return path
+
 
 # 全局分析服务实例
 analysis_service = AnalysisService()
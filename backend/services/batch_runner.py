@@ -0,0 +1,344 @@
+"""
+批量分析 - 无交互地分析目录或通配符匹配的全部视频
+
+- 多进程并行，每个视频的分析流程与 Web 接口相同（AnalysisService.analyze_video）
+- 按视频内容哈希跳过已分析的视频（处理日志 + 已有分析清单中的 video_hash）
+- 处理日志逐条追加并落盘，中断后重新运行同一命令即可继续
+- 运行结束写出 JSON 汇总（逐视频状态、各阶段性能及汇总统计）
+"""
+import sys
+import os
+import re
+import json
+import glob
+import time
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from tqdm import tqdm
+
+BASE_DIR = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from config import OUTPUT_DIR, CACHE_DIR, ASSET_STORE_DIR
+from core.asset_store import compute_file_hash
+
+# 批量运行的日志和汇总目录
+BATCH_DIR = os.path.join(OUTPUT_DIR, 'batch')
+
+# 参与批量分析的视频扩展名
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v')
+
+
+class IngestJournal:
+    """
+    处理日志（JSON Lines，每行一条记录，按视频内容哈希索引）
+
+    每条记录写入后立即 fsync，进程崩溃最多丢失正在写入的一行；
+    读取时忽略不完整的行。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化处理日志
+
+        Args:
+            path: 日志文件路径
+        """
+        self.path = os.path.abspath(path)
+        self.lock = threading.Lock()
+
+    def load(self) -> Dict[str, dict]:
+        """
+        读取日志
+
+        Returns:
+            视频哈希 -> 最后一条记录
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 崩溃时写了一半的行
+                    continue
+                if record.get('video_hash'):
+                    records[record['video_hash']] = record
+        return records
+
+    def completed_hashes(self) -> Set[str]:
+        """已成功分析的视频哈希"""
+        return {video_hash for video_hash, record in self.load().items()
+                if record.get('status') == 'completed'}
+
+    def append(self, record: dict):
+        """
+        追加一条记录并落盘
+
+        Args:
+            record: 记录（必须包含 video_hash 和 status）
+        """
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def collect_videos(inputs: Iterable[str], recursive: bool = True) -> List[str]:
+    """
+    展开输入为视频文件列表
+
+    Args:
+        inputs: 目录、通配符（如 "clips/**/*.mp4"）或视频文件路径
+        recursive: 目录是否递归搜索
+
+    Returns:
+        去重并排序的视频绝对路径列表
+    """
+    videos = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                if not recursive:
+                    dirs[:] = []
+                for filename in files:
+                    if filename.lower().endswith(VIDEO_EXTENSIONS):
+                        videos.add(os.path.abspath(os.path.join(root, filename)))
+        elif os.path.isfile(item):
+            videos.add(os.path.abspath(item))
+        else:
+            for path in glob.glob(item, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.add(os.path.abspath(path))
+    return sorted(videos)
+
+
+def existing_video_hashes(root_dir: str = OUTPUT_DIR) -> Set[str]:
+    """
+    收集已有分析清单（metadata.json）中记录的视频哈希
+
+    Args:
+        root_dir: 分析输出根目录
+
+    Returns:
+        视频哈希集合
+    """
+    skip_dirs = {os.path.abspath(CACHE_DIR), os.path.abspath(ASSET_STORE_DIR),
+                 os.path.abspath(BATCH_DIR)}
+    hashes = set()
+
+    for current_dir, dirs, files in os.walk(root_dir):
+        dirs[:] = [d for d in dirs
+                   if os.path.abspath(os.path.join(current_dir, d)) not in skip_dirs]
+        if 'metadata.json' not in files:
+            continue
+        dirs[:] = []
+        try:
+            with open(os.path.join(current_dir, 'metadata.json'), 'r', encoding='utf-8') as f:
+                video_hash = json.load(f).get('video_hash')
+        except (OSError, json.JSONDecodeError):
+            continue
+        if video_hash:
+            hashes.add(video_hash)
+
+    return hashes
+
+
+def analysis_id_for(video_path: str, video_hash: str) -> str:
+    """由文件名和内容哈希生成稳定的分析ID（重复运行写入同一目录）"""
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    stem = re.sub(r'[^0-9A-Za-z_-]+', '_', stem).strip('_')[:50] or 'video'
+    return f"{stem}_{video_hash[:8]}"
+
+
+def run_batch(inputs: List[str], workers: int = 2, options: Optional[dict] = None,
+              journal_path: Optional[str] = None, summary_path: Optional[str] = None,
+              skip_existing: bool = True, recursive: bool = True,
+              log_dir: Optional[str] = None) -> Dict:
+    """
+    批量分析视频
+
+    Args:
+        inputs: 目录、通配符或视频文件路径
+        workers: 并行分析的进程数
+        options: 传给 AnalysisService.analyze_video 的分析选项
+        journal_path: 处理日志路径（默认 output/batch/journal.jsonl）
+        summary_path: 运行汇总路径（默认 output/batch/run_时间戳.json）
+        skip_existing: 是否同时跳过已有分析清单中出现过的视频
+        recursive: 目录是否递归搜索
+        log_dir: 每个视频的分析输出日志目录（默认在汇总文件旁）
+
+    Returns:
+        运行汇总字典
+    """
+    started_at = datetime.now()
+    start_time = time.perf_counter()
+    run_id = f"run_{started_at.strftime('%Y%m%d_%H%M%S')}"
+    options = dict(options or {})
+    journal = IngestJournal(journal_path or os.path.join(BATCH_DIR, 'journal.jsonl'))
+    summary_path = summary_path or os.path.join(BATCH_DIR, f'{run_id}.json')
+    log_dir = log_dir or os.path.join(os.path.dirname(os.path.abspath(summary_path)),
+                                      f'{run_id}_logs')
+
+    videos = collect_videos(inputs, recursive=recursive)
+    print(f"📹 找到 {len(videos)} 个视频")
+
+    done_hashes = journal.completed_hashes()
+    if skip_existing:
+        done_hashes |= existing_video_hashes()
+
+    # 计算内容哈希，确定待分析的视频
+    records = []
+    pending = []
+    seen_hashes = set()
+    for video_path in tqdm(videos, desc="计算哈希", disable=not videos):
+        video_hash = compute_file_hash(video_path)
+        record = {'video_path': video_path, 'video_hash': video_hash}
+        if video_hash in done_hashes:
+            record.update({'status': 'skipped', 'reason': 'already_analyzed'})
+        elif video_hash in seen_hashes:
+            record.update({'status': 'skipped', 'reason': 'duplicate'})
+        else:
+            pending.append(record)
+        seen_hashes.add(video_hash)
+        records.append(record)
+
+    skipped = len(records) - len(pending)
+    print(f"✓ 待分析 {len(pending)} 个，跳过 {skipped} 个（已分析或重复）")
+
+    interrupted = False
+    if pending:
+        os.makedirs(log_dir, exist_ok=True)
+        # spawn 避免子进程继承父进程中 OpenCV/MediaPipe 的线程状态
+        context = multiprocessing.get_context('spawn')
+        executor = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context)
+        futures = {
+            executor.submit(run_analysis_job, record['video_path'], record['video_hash'],
+                            options, log_dir): record
+            for record in pending
+        }
+        counts = {'completed': 0, 'failed': 0}
+        progress = tqdm(total=len(futures), desc="批量分析")
+        try:
+            for future in as_completed(futures):
+                record = futures[future]
+                record.update(future.result())
+                journal.append(record)
+                counts[record['status']] += 1
+                progress.set_postfix(ok=counts['completed'], failed=counts['failed'])
+                progress.update(1)
+        except KeyboardInterrupt:
+            interrupted = True
+            print("\n⚠️ 已中断，已完成的视频已记录，重新运行同一命令即可继续")
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            executor.shutdown(wait=True)
+        finally:
+            progress.close()
+
+    for record in pending:
+        record.setdefault('status', 'interrupted')
+
+    summary = {
+        'run_id': run_id,
+        'started_at': started_at.isoformat(),
+        'finished_at': datetime.now().isoformat(),
+        'elapsed': round(time.perf_counter() - start_time, 3),
+        'interrupted': interrupted,
+        'inputs': list(inputs),
+        'workers': workers,
+        'options': options,
+        'journal': journal.path,
+        'totals': _count_statuses(records),
+        'stage_timings': _aggregate_stages(records),
+        'videos': records
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    summary['summary_path'] = os.path.abspath(summary_path)
+
+    return summary
+
+
+def run_analysis_job(video_path: str, video_hash: str, options: dict, log_dir: str) -> dict:
+    """
+    进程池任务：分析单个视频，分析过程的输出写入独立日志文件
+
+    Returns:
+        记录字段 {status, analysis_id, output_dir, elapsed, stages, error, finished_at}
+    """
+    from services.analysis_service import analysis_service
+    from exceptions import VideoAnalysisError
+
+    analysis_id = analysis_id_for(video_path, video_hash)
+    log_path = os.path.join(log_dir, f'{analysis_id}.log')
+    start_time = time.perf_counter()
+    record = {'analysis_id': analysis_id, 'log_path': log_path}
+
+    with open(log_path, 'w', encoding='utf-8') as log_file, \
+            contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+        try:
+            result = analysis_service.analyze_video(
+                video_path, {**options, 'analysis_id': analysis_id})
+            record.update({
+                'status': 'completed',
+                'output_dir': result['output_dir'],
+                'report_path': result.get('report_path'),
+                'keyframe_count': len(result.get('keyframes', {})),
+                'stages': result.get('stages', {})
+            })
+        except VideoAnalysisError as e:
+            record.update({'status': 'failed', 'error': e.user_message})
+        except Exception as e:
+            record.update({'status': 'failed', 'error': str(e)})
+
+    record['elapsed'] = round(time.perf_counter() - start_time, 3)
+    record['finished_at'] = datetime.now().isoformat()
+    return record
+
+
+def _count_statuses(records: List[dict]) -> Dict[str, int]:
+    """按状态统计视频数"""
+    totals = {'videos': len(records), 'completed': 0, 'failed': 0,
+              'skipped': 0, 'interrupted': 0}
+    for record in records:
+        totals[record['status']] = totals.get(record['status'], 0) + 1
+    return totals
+
+
+def _aggregate_stages(records: List[dict]) -> Dict[str, dict]:
+    """汇总成功分析的视频各阶段墙钟时间（总计、平均、最大，秒）"""
+    per_stage: Dict[str, List[float]] = {}
+    for record in records:
+        if record['status'] != 'completed':
+            continue
+        for stage, measurement in record.get('stages', {}).items():
+            if stage != 'total':
+                per_stage.setdefault(stage, []).append(measurement['wall_time'])
+
+    return {
+        stage: {
+            'total': round(sum(values), 3),
+            'mean': round(sum(values) / len(values), 3),
+            'max': round(max(values), 3),
+            'count': len(values)
+        }
+        for stage, values in per_stage.items()
+    }
@@ -0,0 +1,189 @@
+"""
+Web 服务运行指标 - 任务队列、分析阶段耗时、吞吐、上传和文件下载
+
+指标由 /metrics 接口按 Prometheus 文本格式导出（见 core/metrics.py）。
+
+各指标在产生它的进程内计数：API 进程记录上传和文件下载，执行任务的进程（开发服务器或
+分析 worker）记录任务耗时、阶段耗时、帧吞吐和关键点缓存命中。使用共享任务存储时
+（enable_shared_metrics），每个进程定期把计数增量累加到任务数据库，任一 API 进程的
+/metrics 都导出全部进程的合计；任务数量类仪表直接读取共享存储。
+"""
+import sys
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from core.metrics import registry
+
+
+def _task_counts():
+    from services.task_manager import task_manager
+    return task_manager.get_stats()
+
+
+def _queue_depth():
+    return _task_counts().get('pending', 0)
+
+
+def _tasks_by_status():
+    return {(status,): count for status, count in _task_counts().items()}
+
+
+def _busy_workers():
+    return _task_counts().get('processing', 0)
+
+
+def _worker_utilization():
+    # 以配置的任务并发数作为满载：分析任务 TASK_MAX_CONCURRENT（共享存储下为全部 worker 之和）
+    # 加上后台任务 TASK_MAX_BACKGROUND
+    from services.task_manager import task_manager
+    scheduler = task_manager.scheduler
+    return _busy_workers() / (scheduler.max_concurrent + scheduler.max_background)
+
+
+registry.gauge('aimotionmind_task_queue_depth',
+               'Analysis tasks waiting to start', callback=_queue_depth)
+registry.gauge('aimotionmind_tasks', 'Analysis tasks by status', ['status'],
+               callback=_tasks_by_status)
+registry.gauge('aimotionmind_task_workers_busy',
+               'Analysis worker threads currently running', callback=_busy_workers)
+registry.gauge('aimotionmind_task_worker_utilization',
+               'Running tasks divided by the configured task concurrency '
+               '(TASK_MAX_CONCURRENT + TASK_MAX_BACKGROUND)', callback=_worker_utilization)
+
+task_duration = registry.histogram(
+    'aimotionmind_task_duration_seconds',
+    'Analysis task wall time from start to finish', ['status'],
+    buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200))
+stage_duration = registry.histogram(
+    'aimotionmind_stage_duration_seconds',
+    'Analysis stage wall time per task', ['stage'])
+frames_processed = registry.counter(
+    'aimotionmind_frames_processed_total',
+    'Frames run through pose analysis')
+analysis_fps = registry.histogram(
+    'aimotionmind_analysis_fps',
+    'Pose analysis throughput per task (frames per second)',
+    buckets=(1, 2, 5, 10, 15, 20, 30, 60, 120, 240, 480))
+
+upload_bytes = registry.counter(
+    'aimotionmind_upload_bytes_total', 'Bytes of uploaded video files')
+upload_duration = registry.histogram(
+    'aimotionmind_upload_duration_seconds',
+    'Upload request latency including the video probe', ['status'])
+
+file_bytes_served = registry.counter(
+    'aimotionmind_file_bytes_served_total',
+    'Bytes sent by the file serving endpoints', ['file_type'])
+file_requests = registry.counter(
+    'aimotionmind_file_requests_total',
+    'File serving requests by file type and HTTP status', ['file_type', 'status'])
+
+
+def record_task(result: Optional[dict], elapsed: float, status: str):
+    """
+    记录一个结束的分析任务
+
+    Args:
+        result: 任务结果（包含 stages 时记录各阶段耗时和帧吞吐）
+        elapsed: 任务墙钟时间（秒）
+        status: completed / failed
+    """
+    task_duration.labels(status).observe(elapsed)
+    if not isinstance(result, dict):
+        return
+
+    stages = result.get('stages') or {}
+    for stage, measurement in stages.items():
+        if stage != 'total' and isinstance(measurement, dict):
+            stage_duration.labels(stage).observe(measurement.get('wall_time', 0.0))
+
+    pose = stages.get('pose') or {}
+    if pose.get('items'):
+        frames_processed.inc(pose['items'])
+        if pose.get('wall_time'):
+            analysis_fps.observe(pose['items'] / pose['wall_time'])
+
+
+def record_file_response(file_type: str, response):
+    """记录一次文件下载（按响应实际长度，Range 请求只计发送的部分）"""
+    file_bytes_served.labels(file_type).inc(response.content_length or 0)
+    file_requests.labels(file_type, response.status_code).inc()
+
+
+class SharedMetrics:
+    """把本进程的计数增量累加到共享任务存储，返回全部进程的合计"""
+
+    def __init__(self, store, interval: float):
+        """
+        Args:
+            store: 共享任务存储（需提供 add_metrics）
+            interval: 后台累加间隔（秒）
+        """
+        self.store = store
+        self.interval = interval
+        self._flushed: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def __call__(self, local: Dict[Tuple[str, str], float]) -> Dict[Tuple[str, str], float]:
+        """累加自上次以来的增量（导出 /metrics 时由 registry 调用）"""
+        self._ensure_thread()
+        with self._lock:
+            deltas = {key: value - self._flushed.get(key, 0.0)
+                      for key, value in local.items() if self._flushed.get(key) != value}
+            totals = self.store.add_metrics(deltas)
+            # 写入成功后才更新基准，失败的增量下次重试
+            self._flushed = dict(local)
+        return totals
+
+    def flush(self):
+        """立即累加本进程的增量"""
+        self(registry.local_samples())
+
+    def _ensure_thread(self):
+        # 启动后台累加线程；fork 出的子进程（如 gunicorn --preload）不继承线程，需重新启动
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._loop, name='metrics-flush', daemon=True).start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ 运行指标写入任务数据库失败: {e}")
+
+
+_shared: Optional[SharedMetrics] = None
+
+
+def enable_shared_metrics(store, interval: float = 10.0):
+    """
+    启用跨进程指标汇总（共享任务存储下由 task_manager 调用）
+
+    Args:
+        store: 共享任务存储
+        interval: 后台累加间隔（秒）
+    """
+    global _shared
+    _shared = SharedMetrics(store, interval)
+    _shared._ensure_thread()
+    registry.set_aggregator(_shared)
+
+
+def flush_shared_metrics():
+    """进程退出前累加剩余的计数增量（未启用跨进程汇总时不做任何事）"""
+    if _shared is None:
+        return
+    try:
+        _shared.flush()
+    except Exception as e:
+        print(f"⚠️ 运行指标写入任务数据库失败: {e}")
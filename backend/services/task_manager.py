@@ -1,30 +1,305 @@
 """
 任务管理器 - 管理异步分析任务
+
+任务状态保存在任务存储中（见 services/task_store.py）：
+- memory：进程内字典，任务在 API 进程的后台线程中执行（开发服务器）
+- sqlite：多进程共享的 SQLite 数据库，API 进程（可多个 gunicorn worker）只负责入队，
+  由独立的分析 worker 进程（python main.py worker）领取执行，两者可分别扩容
+
+待执行任务按调度策略（services/task_scheduler.py）领取：优先级通道、设备间轮转、
+单设备并发上限和每日帧数配额；进程内存储下同时运行的任务数也受 TASK_MAX_CONCURRENT 限制。
 """
 import threading
 import uuid
 import sys
 import os
+import time
+import statistics
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 import traceback
 
 # 导入自定义异常
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
-from exceptions import VideoAnalysisError
+from exceptions import VideoAnalysisError, QuotaExceededError
+from config_backend import Config
+from services.metrics import enable_shared_metrics, record_task
+from services.task_scheduler import BACKGROUND_KINDS, TaskScheduler, task_device, task_lane
+from services.task_store import create_task_store
+
+
+def _run_analyze(video_path: str, options: dict, progress_callback):
+    from services.analysis_service import analysis_service
+    return analysis_service.analyze_video(video_path, options, progress_callback)
+
+
+def _run_analyze_two_stage(video_path: str, options: dict, progress_callback):
+    from services.analysis_service import analysis_service
+    return analysis_service.analyze_video_two_stage(video_path, options, progress_callback)
+
+
+def _run_reprocess_all(video_path: str, options: dict, progress_callback):
+    from services.analysis_service import analysis_service
+    return analysis_service.reprocess_all(
+        options.get('sport_type', 'basketball'), options.get('device_id'),
+        max_workers=options.get('workers'), progress_callback=progress_callback)
+
+
+def _run_preprocess(video_path: str, options: dict, progress_callback):
+    from services.upload_preprocessor import preprocess_upload
+    return preprocess_upload(video_path, options, progress_callback)
+
+
+# 任务类型 -> 执行函数 callback(video_path, options, progress_callback)
+# 共享存储中的任务只保存类型和参数，由领取任务的进程按类型找到执行函数
+TASK_HANDLERS: Dict[str, Callable] = {
+    'analyze': _run_analyze,
+    'analyze_two_stage': _run_analyze_two_stage,
+    'reprocess_all': _run_reprocess_all,
+    'preprocess': _run_preprocess,
+}
+
+# 运行中任务的心跳间隔（秒）
+HEARTBEAT_INTERVAL = 10
+
+# 估算排队时间使用的最近完成任务数
+DURATION_SAMPLE_SIZE = 20
 
 
 class TaskManager:
     """任务管理器：管理异步视频分析任务"""
 
-    def __init__(self):
-        self.tasks: Dict[str, dict] = {}
-        self.lock = threading.Lock()
+    def __init__(self, store=None, scheduler: Optional[TaskScheduler] = None):
+        """
+        Args:
+            store: 任务存储，默认为进程内存储
+            scheduler: 调度策略，默认不限配额、每个设备同时运行一个任务
+        """
+        self.store = store if store is not None else create_task_store('memory')
+        self.scheduler = scheduler or TaskScheduler()
+        # 本进程正在执行的任务（共享存储下定期刷新心跳）
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._heartbeat_thread = None
+        # 进程内存储下由本进程调度的分析任务（后台任务由调度器按 max_background 单独限流）
+        self._dispatched = set()
+        self._dispatch_lock = threading.Lock()
+
+    def submit_task(self, kind: str, video_path: str, options: dict) -> str:
+        """
+        按任务类型提交任务
+
+        任务先进入队列，按调度策略领取：进程内存储下由本进程的后台线程执行，
+        共享存储下由分析 worker 进程执行。
+
+        Args:
+            kind: 任务类型（见 TASK_HANDLERS）
+            video_path: 视频文件路径
+            options: 任务参数（需可 JSON 序列化）
+
+        Returns:
+            task_id: 任务ID
+
+        Raises:
+            QuotaExceededError: 设备当日配额已用完（后台任务不受配额限制）
+        """
+        if kind not in TASK_HANDLERS:
+            raise ValueError(f"未知的任务类型: {kind}")
+
+        device_id = options.get('device_id') or ''
+        usage = self.get_device_usage(device_id)
+        if usage['remaining'] == 0 and kind not in BACKGROUND_KINDS:
+            raise QuotaExceededError(usage['frames_used'], usage['daily_quota'])
+
+        task_id = self._new_task(video_path, options, kind)
+        if not self.store.shared:
+            self._dispatch()
+        return task_id
+
+    def submit_batch(self, kind: str, video_paths: list, options: dict) -> str:
+        """
+        提交批量任务：每个视频一个子任务（共享分析选项），全部结束后生成汇总对比
+
+        Args:
+            kind: 子任务类型（见 TASK_HANDLERS）
+            video_paths: 视频文件路径列表
+            options: 共享的任务参数
+
+        Returns:
+            batch_id: 批次ID
+
+        Raises:
+            QuotaExceededError: 设备当日配额已用完
+        """
+        if kind not in TASK_HANDLERS:
+            raise ValueError(f"未知的任务类型: {kind}")
+
+        device_id = options.get('device_id') or ''
+        usage = self.get_device_usage(device_id)
+        if usage['remaining'] == 0:
+            raise QuotaExceededError(usage['frames_used'], usage['daily_quota'])
+
+        batch_id = str(uuid.uuid4())
+        # 子任务ID预先生成并随批次记录一起写入：子任务可能在其余子任务入队前就被领取并结束，
+        # 结束时必须能看到完整的子任务列表，否则会误判整个批次已结束
+        task_ids = [str(uuid.uuid4()) for _ in video_paths]
+        self.store.create_batch({
+            'batch_id': batch_id,
+            'kind': kind,
+            'device_id': device_id,
+            'sport_type': options.get('sport_type', 'basketball'),
+            'video_paths': list(video_paths),
+            'task_ids': task_ids,
+            'status': 'processing',  # processing, comparing, completed
+            'created_at': datetime.now().isoformat(),
+            'completed_at': None,
+            'comparison': None
+        })
+        for index, video_path in enumerate(video_paths):
+            self._new_task(video_path, dict(options, batch_id=batch_id, batch_index=index), kind,
+                           task_id=task_ids[index])
+
+        if not self.store.shared:
+            self._dispatch()
+        return batch_id
+
+    def get_batch_status(self, batch_id: str) -> Optional[dict]:
+        """
+        批量任务的汇总状态（逐项进度 + 整体进度）
+
+        Args:
+            batch_id: 批次ID
+
+        Returns:
+            汇总状态，批次不存在时返回None
+        """
+        batch = self.store.get_batch(batch_id)
+        if batch is None:
+            return None
+
+        estimates = None
+        counts = {'pending': 0, 'processing': 0, 'completed': 0, 'failed': 0}
+        items = []
+        for index, task_id in enumerate(batch['task_ids']):
+            task = self.store.get(task_id)
+            if task is None:
+                # 批次进行中时子任务可能尚未入队；汇总完成后缺失的子任务已被清理
+                task = ({'status': 'pending', 'progress': 0, 'message': '等待入队...', 'result': None}
+                        if batch['status'] == 'processing' else
+                        {'status': 'failed', 'progress': 0, 'message': '任务已被清理', 'result': None})
+            counts[task['status']] = counts.get(task['status'], 0) + 1
+            item = {
+                'index': index,
+                'task_id': task_id,
+                'file_path': batch['video_paths'][index],
+                'status': task['status'],
+                'progress': task['progress'],
+                'message': task['message']
+            }
+            if task.get('result'):
+                item['analysis_id'] = task['result'].get('analysis_id')
+            if task['status'] == 'pending':
+                if estimates is None:
+                    estimates = self._estimates()
+                item.update(estimates.get(task_id, {'queue_position': None,
+                                                    'estimated_start_at': None}))
+            items.append(item)
+
+        finished = counts['completed'] + counts['failed']
+        if batch['status'] == 'processing' and items and finished == len(items):
+            # 兜底：子任务结束时未能触发汇总（例如任务被标记为心跳超时）
+            self._finish_batch(batch_id)
+            batch = self.store.get_batch(batch_id)
+
+        # 失败的子任务按已结束计入整体进度
+        progress = sum(100 if item['status'] == 'failed' else max(0, item['progress'])
+                       for item in items) / max(1, len(items))
+        return {
+            'batch_id': batch_id,
+            'status': batch['status'],
+            'total': len(items),
+            'counts': counts,
+            'progress': round(progress, 1),
+            'created_at': batch['created_at'],
+            'completed_at': batch['completed_at'],
+            'items': items,
+            'comparison': batch['comparison']
+        }
+
+    def _finish_batch(self, batch_id: str):
+        """全部子任务结束后生成汇总对比（多进程下只有一个调用者执行）"""
+        if not self.store.finish_batch(batch_id):
+            return
+
+        batch = self.store.get_batch(batch_id)
+        completed = []
+        for index, task_id in enumerate(batch['task_ids']):
+            task = self.store.get(task_id)
+            if task and task['status'] == 'completed' and isinstance(task.get('result'), dict) \
+                    and task['result'].get('output_dir'):
+                completed.append({
+                    'label': os.path.basename(batch['video_paths'][index]),
+                    'output_dir': task['result']['output_dir']
+                })
+
+        comparison = None
+        if len(completed) >= 2:
+            try:
+                from services.analysis_service import analysis_service
+                comparison = analysis_service.compare_batch(
+                    batch_id, completed, batch['sport_type'], batch['device_id'] or None)
+            except Exception as e:
+                print(f"批次 {batch_id} 生成汇总对比失败: {e}")
+                comparison = {'error': str(e)}
+        else:
+            comparison = {'error': '成功分析的视频少于2个，无法对比'}
+
+        self.store.update_batch(batch_id, {
+            'status': 'completed',
+            'completed_at': datetime.now().isoformat(),
+            'comparison': comparison
+        })
+
+    def _on_task_finished(self, task_id: str):
+        """任务结束（完成或失败）后：批量子任务全部结束时生成汇总对比"""
+        task = self.store.get(task_id)
+        batch_id = ((task or {}).get('options') or {}).get('batch_id')
+        if not batch_id:
+            return
+        batch = self.store.get_batch(batch_id)
+        if batch is None or batch['status'] != 'processing' or not batch['task_ids']:
+            return
+        statuses = [(self.store.get(other) or {}).get('status') for other in batch['task_ids']]
+        if all(status in ('completed', 'failed') for status in statuses):
+            self._finish_batch(batch_id)
+
+    def _dispatch(self):
+        """进程内存储：按调度策略领取任务，直到分析任务数和后台任务数都达到上限"""
+        # 进程内存储没有轮询领取的 worker，配额用完的任务在这里结束，否则会永远等待
+        self.fail_over_quota_tasks()
+        with self._dispatch_lock:
+            while True:
+                task = self.store.claim(
+                    'local', self.scheduler,
+                    analysis=len(self._dispatched) < self.scheduler.max_concurrent)
+                if task is None:
+                    break
+                if task['kind'] not in BACKGROUND_KINDS:
+                    self._dispatched.add(task['task_id'])
+                threading.Thread(target=self._run_dispatched, args=(task,), daemon=True).start()
+
+    def _run_dispatched(self, task: dict):
+        try:
+            self.run_claimed_task(task)
+        finally:
+            with self._dispatch_lock:
+                self._dispatched.discard(task['task_id'])
+            self._dispatch()
 
     def create_task(self, video_path: str, options: dict, callback) -> str:
         """
-        创建新任务
+        创建新任务（在本进程的后台线程中执行给定的回调）
 
         Args:
             video_path: 视频文件路径
@@ -34,23 +309,49 @@ class TaskManager:
         Returns:
             task_id: 任务ID
         """
-        task_id = str(uuid.uuid4())
+        task_id = self._new_task(video_path, options)
+        self._start_thread(task_id, callback)
+        return task_id
 
-        with self.lock:
-            self.tasks[task_id] = {
-                'task_id': task_id,
-                'status': 'pending',  # pending, processing, completed, failed
-                'progress': 0,
-                'message': '任务创建成功，等待开始...',
-                'video_path': video_path,
-                'options': options,
-                'created_at': datetime.now().isoformat(),
-                'started_at': None,
-                'completed_at': None,
-                'result': None,
-                'error': None
-            }
+    def run_claimed_task(self, task: dict):
+        """
+        执行从共享存储领取的任务（分析 worker 进程调用，阻塞到任务结束）
+
+        Args:
+            task: claim() 返回的任务
+        """
+        handler = TASK_HANDLERS.get(task.get('kind'))
+        if handler is None:
+            self.update_task(task['task_id'], {
+                'status': 'failed',
+                'message': f"未知的任务类型: {task.get('kind')}",
+                'completed_at': datetime.now().isoformat()
+            })
+            return
+        self._run_task(task['task_id'], handler)
+
+    def _new_task(self, video_path: str, options: dict, kind: Optional[str] = None,
+                  task_id: Optional[str] = None) -> str:
+        task_id = task_id or str(uuid.uuid4())
+        self.store.create({
+            'task_id': task_id,
+            'kind': kind,  # 回调任务为 None（只能在创建它的进程中执行）
+            'lane': task_lane(kind, options) if kind else None,
+            'status': 'pending',  # pending, processing, completed, failed
+            'progress': 0,
+            'message': '任务创建成功，等待开始...',
+            'video_path': video_path,
+            'options': options,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'completed_at': None,
+            'result': None,
+            'stage': None,  # 两阶段任务: preview（预览可用）, final
+            'error': None
+        })
+        return task_id
 
+    def _start_thread(self, task_id: str, callback):
         # 启动后台线程执行分析
         thread = threading.Thread(
             target=self._run_task,
@@ -59,7 +360,16 @@ class TaskManager:
         )
         thread.start()
 
-        return task_id
+    def _heartbeat_loop(self):
+        """共享存储下定期刷新本进程运行中任务的心跳，供其他进程判断任务是否丢失"""
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                self.store.heartbeat(running)
+            except Exception as e:
+                print(f"⚠️ 刷新任务心跳失败: {e}")
 
     def _run_task(self, task_id: str, callback):
         """
@@ -69,6 +379,12 @@ class TaskManager:
             task_id: 任务ID
             callback: 分析函数
         """
+        start_time = time.perf_counter()
+        with self._running_lock:
+            self._running.add(task_id)
+            if self.store.shared and self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+                self._heartbeat_thread.start()
         try:
             # 更新任务状态为进行中
             self.update_task(task_id, {
@@ -82,12 +398,17 @@ class TaskManager:
             video_path = task['video_path']
             options = task['options']
 
-            # 执行分析（传入进度更新回调）
-            def progress_callback(progress: int, message: str):
-                self.update_task(task_id, {
+            # 执行分析（传入进度更新回调，可附带阶段性结果）
+            def progress_callback(progress: int, message: str, partial_result: dict = None):
+                updates = {
                     'progress': progress,
                     'message': message
-                })
+                }
+                if partial_result is not None:
+                    # 任务仍在进行，先发布预览结果供客户端提前展示
+                    updates['result'] = partial_result
+                    updates['stage'] = partial_result.get('stage', 'preview')
+                self.update_task(task_id, updates)
 
             result = callback(video_path, options, progress_callback)
 
@@ -97,8 +418,15 @@ class TaskManager:
                 'progress': 100,
                 'message': '分析完成',
                 'completed_at': datetime.now().isoformat(),
-                'result': result
+                'result': result,
+                'stage': result.get('stage', 'final') if isinstance(result, dict) else 'final'
             })
+            record_task(result, time.perf_counter() - start_time, 'completed')
+
+            # 计入设备当日配额（姿态分析处理的帧数；后台任务不计入）
+            frames = _frames_analyzed(result) if task.get('kind') not in BACKGROUND_KINDS else 0
+            if frames:
+                self.store.add_usage(task_device(task), frames)
 
         except VideoAnalysisError as e:
             # 捕获自定义的视频分析错误，使用用户友好的错误信息
@@ -115,6 +443,7 @@ class TaskManager:
                     'type': 'VideoAnalysisError'
                 }
             })
+            record_task(None, time.perf_counter() - start_time, 'failed')
         except Exception as e:
             # 任务失败 - 其他未预期的错误
             error_msg = f'分析过程发生错误: {str(e)}'
@@ -133,8 +462,17 @@ class TaskManager:
                 }
             })
 
+            record_task(None, time.perf_counter() - start_time, 'failed')
+
             print(f"任务 {task_id} 失败:")
             print(error_trace)
+        finally:
+            with self._running_lock:
+                self._running.discard(task_id)
+            try:
+                self._on_task_finished(task_id)
+            except Exception as e:
+                print(f"⚠️ 任务 {task_id} 结束处理失败: {e}")
 
     def update_task(self, task_id: str, updates: dict):
         """
@@ -144,9 +482,7 @@ class TaskManager:
             task_id: 任务ID
             updates: 更新的字段
         """
-        with self.lock:
-            if task_id in self.tasks:
-                self.tasks[task_id].update(updates)
+        self.store.update(task_id, updates)
 
     def get_task(self, task_id: str) -> Optional[dict]:
         """
@@ -158,8 +494,7 @@ class TaskManager:
         Returns:
             任务信息字典，如果不存在返回None
         """
-        with self.lock:
-            return self.tasks.get(task_id)
+        return self.store.get(task_id)
 
     def get_all_tasks(self) -> list:
         """
@@ -168,8 +503,18 @@ class TaskManager:
         Returns:
             任务列表
         """
-        with self.lock:
-            return list(self.tasks.values())
+        return self.store.list()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        按状态统计任务数
+
+        Returns:
+            {pending, processing, completed, failed}
+        """
+        counts = {'pending': 0, 'processing': 0, 'completed': 0, 'failed': 0}
+        counts.update(self.store.stats())
+        return counts
 
     def delete_task(self, task_id: str) -> bool:
         """
@@ -181,11 +526,7 @@ class TaskManager:
         Returns:
             是否删除成功
         """
-        with self.lock:
-            if task_id in self.tasks:
-                del self.tasks[task_id]
-                return True
-            return False
+        return self.store.delete(task_id)
 
     def cleanup_old_tasks(self, max_age_hours: int = 24):
         """
@@ -197,19 +538,144 @@ class TaskManager:
         from datetime import timedelta
 
         cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+        return self.store.delete_finished_before(cutoff_time.isoformat())
+
+    def get_device_usage(self, device_id: str) -> dict:
+        """
+        设备当日配额使用情况
+
+        Args:
+            device_id: 设备ID
+
+        Returns:
+            {frames_used, daily_quota, remaining}（不限配额时 daily_quota 和 remaining 为 None）
+        """
+        frames_used = self.scheduler.frames_used(self.store.get_devices().get(device_id))
+        quota = self.scheduler.daily_frame_quota or None
+        return {
+            'frames_used': frames_used,
+            'daily_quota': quota,
+            'remaining': max(0, quota - frames_used) if quota else None
+        }
+
+    def estimate_start(self, task_id: str) -> dict:
+        """
+        估算排队任务的开始时间
+
+        按调度策略模拟排队，每个任务耗时取最近完成任务耗时的中位数。
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            {queue_position, estimated_start_at}（已开始或无法调度的任务 estimated_start_at 为 None）
+        """
+        return self._estimates().get(task_id, {'queue_position': None, 'estimated_start_at': None})
+
+    def _estimates(self) -> Dict[str, dict]:
+        """全部排队任务的 {task_id: {queue_position, estimated_start_at}}"""
+        tasks = self.store.list()
+        pending = [task for task in tasks if task['status'] == 'pending' and task.get('kind')]
+        running = [task for task in tasks if task['status'] == 'processing']
+        estimates = self.scheduler.estimate_start_times(
+            pending, running, self.store.get_devices(),
+            self._average_duration(tasks), time.time())
+
+        result = {}
+        for position, (task_id, start) in enumerate(estimates.items(), 1):
+            if start is None:
+                result[task_id] = {'queue_position': None, 'estimated_start_at': None}
+            else:
+                result[task_id] = {
+                    'queue_position': position,
+                    'estimated_start_at': datetime.fromtimestamp(start).isoformat(timespec='seconds')
+                }
+        return result
+
+    @staticmethod
+    def _average_duration(tasks: list) -> float:
+        """最近完成的分析任务耗时的中位数（秒）"""
+        finished = sorted((task for task in tasks
+                           if task['status'] == 'completed' and task.get('started_at')
+                           and task.get('completed_at') and task.get('kind') not in BACKGROUND_KINDS),
+                          key=lambda task: task['completed_at'])[-DURATION_SAMPLE_SIZE:]
+        durations = [(datetime.fromisoformat(task['completed_at'])
+                      - datetime.fromisoformat(task['started_at'])).total_seconds()
+                     for task in finished]
+        return statistics.median(durations) if durations else Config.TASK_DEFAULT_DURATION
+
+    def fail_stale_tasks(self, timeout: float = None) -> list:
+        """
+        将心跳超时的运行中任务标记为失败（执行它的进程已退出）
+
+        Args:
+            timeout: 心跳超时（秒），默认取 Config.TASK_HEARTBEAT_TIMEOUT
+
+        Returns:
+            被标记为失败的任务ID
+        """
+        lost = self.store.fail_stale(
+            timeout or Config.TASK_HEARTBEAT_TIMEOUT, '分析进程意外退出，请重新提交任务')
+        for task_id in lost:
+            self._on_task_finished(task_id)
+        return lost
+
+    def fail_over_quota_tasks(self) -> list:
+        """
+        将设备当日配额已用完的待执行任务标记为失败
+
+        入队时配额还有剩余，但同设备先运行的任务用完了配额；调度器不会再领取这些任务，
+        留在队列中只会一直等待。
+
+        Returns:
+            被标记为失败的任务ID
+        """
+        if not self.scheduler.daily_frame_quota:
+            return []
+
+        devices = self.store.get_devices()
+        failed = []
+        for task in self.store.list():
+            if task['status'] != 'pending' or not task.get('kind') or task['kind'] in BACKGROUND_KINDS:
+                continue
+            state = devices.get(task_device(task))
+            if not self.scheduler.quota_exceeded(state):
+                continue
+            error = QuotaExceededError(self.scheduler.frames_used(state),
+                                       self.scheduler.daily_frame_quota)
+            self.update_task(task['task_id'], {
+                'status': 'failed',
+                'message': error.user_message,
+                'completed_at': datetime.now().isoformat(),
+                'error': {
+                    'message': str(error),
+                    'user_message': error.user_message,
+                    'type': 'QuotaExceededError'
+                }
+            })
+            failed.append(task['task_id'])
+
+        for task_id in failed:
+            self._on_task_finished(task_id)
+        return failed
 
-        with self.lock:
-            tasks_to_delete = []
-            for task_id, task in self.tasks.items():
-                created_at = datetime.fromisoformat(task['created_at'])
-                if created_at < cutoff_time and task['status'] in ['completed', 'failed']:
-                    tasks_to_delete.append(task_id)
 
-            for task_id in tasks_to_delete:
-                del self.tasks[task_id]
+def _frames_analyzed(result) -> int:
+    """任务结果中姿态分析处理的帧数"""
+    if not isinstance(result, dict):
+        return 0
+    pose = (result.get('stages') or {}).get('pose') or {}
+    return int(pose.get('items') or 0)
 
-            return len(tasks_to_delete)
 
+# 全局任务管理器实例（任务存储由 TASK_STORE / TASK_DB_PATH 环境变量选择）
+task_manager = TaskManager(
+    create_task_store(Config.TASK_STORE, Config.TASK_DB_PATH),
+    TaskScheduler(max_concurrent=Config.TASK_MAX_CONCURRENT,
+                  max_per_device=Config.TASK_MAX_PER_DEVICE,
+                  daily_frame_quota=Config.DEVICE_DAILY_FRAME_QUOTA,
+                  max_background=Config.TASK_MAX_BACKGROUND))
 
-# 全局任务管理器实例
-task_manager = TaskManager()
+# 多进程部署时各进程的运行指标累加到共享任务存储，/metrics 导出全部进程的合计
+if task_manager.store.shared:
+    enable_shared_metrics(task_manager.store, Config.METRICS_FLUSH_INTERVAL)
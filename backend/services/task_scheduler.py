@@ -0,0 +1,200 @@
+"""
+任务调度策略 - 优先级通道、设备间轮转、单设备并发上限和每日算力配额
+
+待执行任务的选择顺序：
+1. 优先级通道：interactive（两阶段预览等交互任务）> standard（普通分析）> bulk（批量重算、上传后处理）
+2. 同一通道内按设备轮转：最久未被调度的设备先执行，一个设备提交再多任务也只能轮流占用
+3. 同一设备内按提交顺序
+跳过已达到并发上限（全部 worker 合计）或当日配额已用完的设备；后台任务（上传后处理）
+单独计数，不会让同一设备随后提交的分析等待。后台任务也不占用全局的分析并发数，
+全部 worker 合计最多同时运行 max_background 个，不会挤占其他设备的交互分析。
+
+调度器本身无状态，任务存储在领取事务内把待执行/运行中任务和设备状态交给 choose()；
+estimate_start_times() 用同一策略模拟调度，估算排队任务的开始时间。
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 优先级通道（靠前的优先）
+TASK_LANES = ('interactive', 'standard', 'bulk')
+
+# 任务类型的默认通道
+KIND_LANES = {
+    'analyze_two_stage': 'interactive',
+    'analyze': 'standard',
+    'reprocess_all': 'bulk',
+    'preprocess': 'bulk',
+}
+
+# 后台任务类型（上传后处理）：不占用分析并发名额（设备和全局），按设备单独限流，全局另有上限
+BACKGROUND_KINDS = frozenset({'preprocess'})
+
+# 后台任务并发名额的后缀（见 task_slot）
+BACKGROUND_SLOT_SUFFIX = '/background'
+
+# 未提供 device_id 的任务归入的设备
+ANONYMOUS_DEVICE = ''
+
+
+def task_device(task: dict) -> str:
+    """任务所属设备"""
+    return (task.get('options') or {}).get('device_id') or ANONYMOUS_DEVICE
+
+
+def task_slot(task: dict) -> str:
+    """任务占用的并发名额：设备的分析名额，后台任务使用该设备单独的后台名额"""
+    device = task_device(task)
+    return device + BACKGROUND_SLOT_SUFFIX if task.get('kind') in BACKGROUND_KINDS else device
+
+
+def task_lane(kind: Optional[str], options: Optional[dict] = None) -> str:
+    """
+    任务的优先级通道
+
+    Args:
+        kind: 任务类型
+        options: 任务参数；options['lane'] 只能把任务降到更低的通道
+
+    Returns:
+        通道名称
+    """
+    lane = KIND_LANES.get(kind, 'standard')
+    requested = (options or {}).get('lane')
+    if requested in TASK_LANES and TASK_LANES.index(requested) > TASK_LANES.index(lane):
+        lane = requested
+    return lane
+
+
+def today() -> str:
+    """配额计算使用的日期（本地时间）"""
+    return datetime.now().date().isoformat()
+
+
+class TaskScheduler:
+    """公平调度策略"""
+
+    def __init__(self, max_concurrent: int = 2, max_per_device: int = 1,
+                 daily_frame_quota: int = 0, max_background: int = 1):
+        """
+        Args:
+            max_concurrent: 同时运行的分析任务数（估算开始时间使用；进程内存储下也是实际上限），
+                不含后台任务
+            max_per_device: 单个设备同时运行的任务数上限
+            daily_frame_quota: 单个设备每日可分析的帧数，0 表示不限
+            max_background: 同时运行的后台任务数上限（全部 worker 合计）
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_device = max(1, max_per_device)
+        self.daily_frame_quota = daily_frame_quota
+        self.max_background = max(1, max_background)
+
+    def frames_used(self, device_state: Optional[dict], day: Optional[str] = None) -> int:
+        """设备当日已用帧数"""
+        if not device_state or device_state.get('day') != (day or today()):
+            return 0
+        return device_state.get('frames', 0)
+
+    def quota_exceeded(self, device_state: Optional[dict], day: Optional[str] = None) -> bool:
+        """设备当日配额是否已用完"""
+        return bool(self.daily_frame_quota) and \
+            self.frames_used(device_state, day) >= self.daily_frame_quota
+
+    def choose(self, pending: List[dict], running_counts: Dict[str, int],
+               devices: Dict[str, dict], day: Optional[str] = None,
+               analysis: bool = True) -> Optional[dict]:
+        """
+        选择下一个要执行的任务
+
+        Args:
+            pending: 待执行任务
+            running_counts: {并发名额（见 task_slot）: 运行中任务数}
+            devices: {设备: {day, frames, last_started_at}}
+            day: 配额日期，默认今天
+            analysis: 是否可以选择分析任务（领取方的分析并发已满时为 False，只选择后台任务）
+
+        Returns:
+            选中的任务，没有可执行的任务时返回 None
+        """
+        day = day or today()
+        background_full = sum(count for slot, count in running_counts.items()
+                              if slot.endswith(BACKGROUND_SLOT_SUFFIX)) >= self.max_background
+        best = None
+        best_key = None
+        for task in pending:
+            if task.get('kind') in BACKGROUND_KINDS:
+                if background_full:
+                    continue
+            elif not analysis:
+                continue
+            if running_counts.get(task_slot(task), 0) >= self.max_per_device:
+                continue
+            state = devices.get(task_device(task))
+            # 后台任务不计入也不受限于配额（上传后处理在配额用完时跳过预提取）
+            if task.get('kind') not in BACKGROUND_KINDS and self.quota_exceeded(state, day):
+                continue
+            key = (TASK_LANES.index(task.get('lane') or task_lane(task.get('kind'), task.get('options'))),
+                   (state or {}).get('last_started_at') or 0.0,
+                   task['created_at'])
+            if best_key is None or key < best_key:
+                best, best_key = task, key
+        return best
+
+    def estimate_start_times(self, pending: List[dict], running: List[dict],
+                             devices: Dict[str, dict], average_duration: float,
+                             now: float) -> Dict[str, Optional[float]]:
+        """
+        按调度策略模拟排队，估算各待执行任务的开始时间
+
+        假设每个任务耗时 average_duration，运行中的任务按已运行时间扣除；
+        因配额用完而不会被调度的任务估算值为 None。
+
+        Args:
+            pending: 待执行任务
+            running: 运行中任务
+            devices: {设备: {day, frames, last_started_at}}
+            average_duration: 平均任务耗时（秒）
+            now: 当前时间戳
+
+        Returns:
+            {task_id: 预计开始时间戳或 None}（按预计调度顺序排列）
+        """
+        average_duration = max(1.0, average_duration)
+        day = today()
+        devices = {device: dict(state) for device, state in devices.items()}
+        # 模拟中的运行任务: [(预计结束时间, 并发名额)]
+        active = [(max(now, _started_ts(task, now) + average_duration), task_slot(task))
+                  for task in running]
+        remaining = list(pending)
+        estimates: Dict[str, Optional[float]] = {}
+
+        t = now
+        while remaining:
+            active = [item for item in active if item[0] > t]
+            counts: Dict[str, int] = {}
+            for _, slot in active:
+                counts[slot] = counts.get(slot, 0) + 1
+            analysis_running = sum(count for slot, count in counts.items()
+                                   if not slot.endswith(BACKGROUND_SLOT_SUFFIX))
+            task = self.choose(remaining, counts, devices, day,
+                               analysis=analysis_running < self.max_concurrent)
+            if task is not None:
+                estimates[task['task_id']] = t
+                remaining.remove(task)
+                active.append((t + average_duration, task_slot(task)))
+                if task.get('kind') not in BACKGROUND_KINDS:
+                    devices.setdefault(task_device(task), {})['last_started_at'] = t
+                continue
+            if not active:
+                break  # 剩余任务都因配额无法调度
+            t = min(end for end, _ in active)
+
+        for task in remaining:
+            estimates[task['task_id']] = None
+        return estimates
+
+
+def _started_ts(task: dict, default: float) -> float:
+    try:
+        return datetime.fromisoformat(task['started_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return default
@@ -0,0 +1,458 @@
+"""
+任务状态存储
+
+- MemoryTaskStore：进程内字典，开发服务器（单进程）使用
+- SQLiteTaskStore：SQLite 数据库（WAL 模式），多个 API 进程和分析 worker 进程共享同一份任务状态；
+  worker 通过 claim() 原子地领取待执行任务，运行中的任务定期刷新心跳，
+  心跳超时的任务（worker 进程已退出）由 fail_stale() 标记为失败
+
+领取时按调度策略（services/task_scheduler.py）选择任务；每个设备的调度时间和当日已用帧数
+保存在设备状态中（{day, frames, last_started_at}），用于设备间轮转和每日配额。
+
+批量任务（一次提交多个视频）另存一条批次记录（task_ids、状态、汇总对比），
+finish_batch() 保证全部子任务结束后只有一个进程生成汇总对比。
+
+任务记录是普通字典（字段见 TaskManager.create_task），SQLite 中整体以 JSON 保存，
+status / kind / created_at 另存为列用于查询。
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.task_scheduler import BACKGROUND_KINDS, TaskScheduler, task_device, task_slot, today
+
+# 写入共享存储时从任务结果中去掉的大字段（逐帧数据、关键帧图像），
+# 状态接口只需要 analysis_id、阶段性能等摘要，完整结果在分析目录中
+STORED_RESULT_EXCLUDE = ('analysis_results', 'keyframes', 'frames')
+
+
+class MemoryTaskStore:
+    """进程内任务存储"""
+
+    shared = False
+
+    def __init__(self):
+        self.tasks: Dict[str, dict] = {}
+        self.devices: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def create(self, task: dict):
+        with self.lock:
+            self.tasks[task['task_id']] = dict(task)
+
+    def update(self, task_id: str, updates: dict):
+        with self.lock:
+            if task_id in self.tasks:
+                self.tasks[task_id].update(updates)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self.lock:
+            task = self.tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def list(self) -> List[dict]:
+        with self.lock:
+            return [dict(task) for task in self.tasks.values()]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        with self.lock:
+            for task in self.tasks.values():
+                counts[task['status']] = counts.get(task['status'], 0) + 1
+        return counts
+
+    def delete(self, task_id: str) -> bool:
+        with self.lock:
+            return self.tasks.pop(task_id, None) is not None
+
+    def delete_finished_before(self, cutoff: str) -> int:
+        with self.lock:
+            expired = [task_id for task_id, task in self.tasks.items()
+                       if task['created_at'] < cutoff and task['status'] in ('completed', 'failed')]
+            for task_id in expired:
+                del self.tasks[task_id]
+            return len(expired)
+
+    def claim(self, worker_id: str, scheduler: TaskScheduler,
+              analysis: bool = True) -> Optional[dict]:
+        with self.lock:
+            pending = [task for task in self.tasks.values()
+                       if task['status'] == 'pending' and task.get('kind')]
+            task = scheduler.choose(pending, _running_counts(self.tasks.values()), self.devices,
+                                    analysis=analysis)
+            if task is None:
+                return None
+            task.update(_claim_updates(worker_id))
+            if task['kind'] not in BACKGROUND_KINDS:
+                self.devices.setdefault(task_device(task), {})['last_started_at'] = time.time()
+            return dict(task)
+
+    def get_devices(self) -> Dict[str, dict]:
+        with self.lock:
+            return {device: dict(state) for device, state in self.devices.items()}
+
+    def add_usage(self, device_id: str, frames: int):
+        with self.lock:
+            state = self.devices.setdefault(device_id, {})
+            if state.get('day') != today():
+                state.update({'day': today(), 'frames': 0})
+            state['frames'] += frames
+
+    def create_batch(self, batch: dict):
+        with self.lock:
+            self.batches[batch['batch_id']] = dict(batch)
+
+    def get_batch(self, batch_id: str) -> Optional[dict]:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            return dict(batch) if batch is not None else None
+
+    def update_batch(self, batch_id: str, updates: dict):
+        with self.lock:
+            if batch_id in self.batches:
+                self.batches[batch_id].update(updates)
+
+    def finish_batch(self, batch_id: str) -> bool:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch is None or batch['status'] != 'processing':
+                return False
+            batch['status'] = 'comparing'
+            return True
+
+    def heartbeat(self, task_ids: Iterable[str]):
+        pass  # 单进程内任务不会丢失 worker
+
+    def fail_stale(self, timeout: float, message: str) -> List[str]:
+        return []
+
+
+class SQLiteTaskStore:
+    """SQLite 共享任务存储（多进程安全）"""
+
+    shared = True
+
+    def __init__(self, db_path: str):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # 每个线程一个连接（sqlite3 连接不能跨线程使用）
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    kind TEXT,
+                    created_at TEXT NOT NULL,
+                    heartbeat_at REAL,
+                    data TEXT NOT NULL
+                )""")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batches (
+                    batch_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS devices (
+                    device_id TEXT PRIMARY KEY,
+                    day TEXT,
+                    frames INTEGER NOT NULL DEFAULT 0,
+                    last_started_at REAL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metrics (
+                    sample TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    value REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (sample, labels)
+                )""")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务（BEGIN IMMEDIATE：读-改-写期间其他进程不能写入）"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _dumps(task: dict) -> str:
+        task = dict(task)
+        if isinstance(task.get('result'), dict):
+            task['result'] = {key: value for key, value in task['result'].items()
+                              if key not in STORED_RESULT_EXCLUDE}
+        return json.dumps(task, ensure_ascii=False, default=_json_default)
+
+    def create(self, task: dict):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO tasks (task_id, status, kind, created_at, heartbeat_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (task['task_id'], task['status'], task.get('kind'), task['created_at'],
+                 time.time(), self._dumps(task)))
+
+    def update(self, task_id: str, updates: dict):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return
+            task = json.loads(row[0])
+            task.update(updates)
+            conn.execute(
+                "UPDATE tasks SET status = ?, heartbeat_at = ?, data = ? WHERE task_id = ?",
+                (task['status'], time.time(), self._dumps(task), task_id))
+
+    def get(self, task_id: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self) -> List[dict]:
+        rows = self._connection().execute("SELECT data FROM tasks ORDER BY created_at").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def delete(self, task_id: str) -> bool:
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,)).rowcount > 0
+
+    def delete_finished_before(self, cutoff: str) -> int:
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM tasks WHERE created_at < ? AND status IN ('completed', 'failed')",
+                (cutoff,)).rowcount
+
+    def claim(self, worker_id: str, scheduler: TaskScheduler,
+              analysis: bool = True) -> Optional[dict]:
+        """
+        按调度策略原子地领取下一个待执行任务
+
+        Args:
+            worker_id: 领取者标识（主机名:进程号）
+            scheduler: 调度策略
+            analysis: 是否可以领取分析任务（False 时只领取后台任务）
+
+        Returns:
+            已标记为 processing 的任务，没有可执行的任务时返回 None
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT status, data FROM tasks WHERE status = 'processing' "
+                "OR (status = 'pending' AND kind IS NOT NULL)").fetchall()
+            tasks = [json.loads(data) for _, data in rows]
+            pending = [task for task in tasks if task['status'] == 'pending']
+            task = scheduler.choose(pending, _running_counts(tasks), self._read_devices(conn),
+                                    analysis=analysis)
+            if task is None:
+                return None
+
+            task.update(_claim_updates(worker_id))
+            now = time.time()
+            conn.execute(
+                "UPDATE tasks SET status = ?, heartbeat_at = ?, data = ? WHERE task_id = ?",
+                (task['status'], now, self._dumps(task), task['task_id']))
+            # 后台任务不参与设备轮转，不能让设备因自己的上传后处理排到后面
+            if task['kind'] not in BACKGROUND_KINDS:
+                conn.execute(
+                    "INSERT INTO devices (device_id, last_started_at) VALUES (?, ?) "
+                    "ON CONFLICT (device_id) DO UPDATE SET last_started_at = excluded.last_started_at",
+                    (task_device(task), now))
+            return task
+
+    @staticmethod
+    def _read_devices(conn: sqlite3.Connection) -> Dict[str, dict]:
+        rows = conn.execute("SELECT device_id, day, frames, last_started_at FROM devices").fetchall()
+        return {device: {'day': day, 'frames': frames, 'last_started_at': last_started_at}
+                for device, day, frames, last_started_at in rows}
+
+    def get_devices(self) -> Dict[str, dict]:
+        return self._read_devices(self._connection())
+
+    def add_usage(self, device_id: str, frames: int):
+        """累加设备当日已用帧数（跨日时重新计数）"""
+        day = today()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO devices (device_id, day, frames) VALUES (?, ?, ?) "
+                "ON CONFLICT (device_id) DO UPDATE SET "
+                "frames = CASE WHEN day = excluded.day THEN frames + excluded.frames "
+                "ELSE excluded.frames END, day = excluded.day",
+                (device_id, day, frames))
+
+    def create_batch(self, batch: dict):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO batches (batch_id, status, created_at, data) VALUES (?, ?, ?, ?)",
+                (batch['batch_id'], batch['status'], batch['created_at'],
+                 json.dumps(batch, ensure_ascii=False, default=_json_default)))
+
+    def get_batch(self, batch_id: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT data FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_batch(self, batch_id: str, updates: dict):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT data FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+            if row is None:
+                return
+            batch = json.loads(row[0])
+            batch.update(updates)
+            conn.execute(
+                "UPDATE batches SET status = ?, data = ? WHERE batch_id = ?",
+                (batch['status'], json.dumps(batch, ensure_ascii=False, default=_json_default),
+                 batch_id))
+
+    def finish_batch(self, batch_id: str) -> bool:
+        """
+        将批次从 processing 标记为 comparing（只有第一个调用者成功）
+
+        Args:
+            batch_id: 批次ID
+
+        Returns:
+            是否由本次调用负责生成汇总对比
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT data FROM batches WHERE batch_id = ? AND status = 'processing'",
+                (batch_id,)).fetchone()
+            if row is None:
+                return False
+            batch = json.loads(row[0])
+            batch['status'] = 'comparing'
+            conn.execute("UPDATE batches SET status = ?, data = ? WHERE batch_id = ?",
+                         (batch['status'], json.dumps(batch, ensure_ascii=False), batch_id))
+            return True
+
+    def heartbeat(self, task_ids: Iterable[str]):
+        """刷新运行中任务的心跳"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE tasks SET heartbeat_at = ? WHERE task_id = ? AND status = 'processing'",
+                [(time.time(), task_id) for task_id in task_ids])
+
+    def fail_stale(self, timeout: float, message: str) -> List[str]:
+        """
+        将心跳超时的运行中任务标记为失败（执行它的进程已退出）
+
+        Args:
+            timeout: 心跳超时（秒）
+            message: 写入任务的提示信息
+
+        Returns:
+            被标记为失败的任务ID
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT task_id, data FROM tasks WHERE status = 'processing' AND heartbeat_at < ?",
+                (time.time() - timeout,)).fetchall()
+            for task_id, data in rows:
+                task = json.loads(data)
+                task.update({
+                    'status': 'failed',
+                    'message': message,
+                    'completed_at': datetime.now().isoformat(),
+                    'error': {'message': message, 'type': 'WorkerLost'}
+                })
+                conn.execute("UPDATE tasks SET status = ?, data = ? WHERE task_id = ?",
+                             (task['status'], self._dumps(task), task_id))
+        return [row[0] for row in rows]
+
+    def add_metrics(self, deltas: Dict[Tuple[str, str], float]) -> Dict[Tuple[str, str], float]:
+        """
+        累加一个进程的指标增量，返回全部进程的合计
+
+        Args:
+            deltas: {(样本名, 标签JSON): 自上次累加以来的增量}
+
+        Returns:
+            {(样本名, 标签JSON): 全部进程合计}
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO metrics (sample, labels, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (sample, labels) DO UPDATE SET value = value + excluded.value",
+                [(sample, labels, value) for (sample, labels), value in deltas.items()])
+            rows = conn.execute("SELECT sample, labels, value FROM metrics").fetchall()
+        return {(sample, labels): value for sample, labels, value in rows}
+
+
+def _running_counts(tasks: Iterable[dict]) -> Dict[str, int]:
+    """{并发名额: 运行中任务数}"""
+    counts: Dict[str, int] = {}
+    for task in tasks:
+        if task['status'] == 'processing':
+            slot = task_slot(task)
+            counts[slot] = counts.get(slot, 0) + 1
+    return counts
+
+
+def _claim_updates(worker_id: str) -> dict:
+    return {
+        'status': 'processing',
+        'started_at': datetime.now().isoformat(),
+        'message': '开始分析视频...',
+        'worker_id': worker_id
+    }
+
+
+def _json_default(obj):
+    """numpy 标量等转换为原生类型，其他对象转为字符串"""
+    if hasattr(obj, 'item'):
+        try:
+            return obj.item()
+        except (TypeError, ValueError):
+            pass
+    return str(obj)
+
+
+def create_task_store(kind: str = 'memory', db_path: Optional[str] = None):
+    """
+    创建任务存储
+
+    Args:
+        kind: memory / sqlite
+        db_path: SQLite 数据库路径（sqlite 时必需）
+
+    Returns:
+        任务存储实例
+    """
+    if kind == 'memory':
+        return MemoryTaskStore()
+    if kind == 'sqlite':
+        if not db_path:
+            raise ValueError("sqlite 任务存储需要数据库路径")
+        return SQLiteTaskStore(db_path)
+    raise ValueError(f"未知的任务存储: {kind}（可选: memory, sqlite）")
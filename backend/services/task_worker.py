@@ -0,0 +1,107 @@
+"""
+分析 worker - 从共享任务存储领取并执行分析任务
+
+生产模式下 API 进程（gunicorn 多 worker）只把任务写入共享的 SQLite 任务存储，
+由一个或多个分析 worker 进程领取执行，HTTP 并发和分析并发分别扩容：
+
+    TASK_STORE=sqlite python main.py worker --concurrency 2
+
+- 领取是原子的（BEGIN IMMEDIATE 事务），多个 worker 进程不会重复执行同一任务；
+  按调度策略选择任务，单设备并发上限对全部 worker 合计生效
+- 运行中的任务定期刷新心跳；worker 进程被强制结束后，其任务在心跳超时后由其他 worker 标记为失败
+- 收到停止信号后不再领取新任务，等待正在运行的分析完成再退出
+- 上传后处理等后台任务不占用 --concurrency，全部 worker 合计最多同时运行 TASK_MAX_BACKGROUND 个
+- 任务耗时、帧吞吐等运行指标定期累加到任务数据库，由 API 进程的 /metrics 一并导出
+"""
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+from services.metrics import flush_shared_metrics
+from services.task_manager import TaskManager, task_manager as default_task_manager
+from services.task_scheduler import BACKGROUND_KINDS
+
+
+class TaskWorker:
+    """领取并执行共享存储中的分析任务"""
+
+    def __init__(self, manager: Optional[TaskManager] = None, concurrency: int = 1,
+                 poll_interval: float = 1.0):
+        """
+        初始化分析 worker
+
+        Args:
+            manager: 任务管理器（默认为全局 task_manager，需使用共享存储）
+            concurrency: 本进程同时运行的分析数
+            poll_interval: 没有待执行任务时的轮询间隔（秒）
+        """
+        self.manager = manager or default_task_manager
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self.in_flight: Dict[str, object] = {}  # task_id -> future
+        self.background: Set[str] = set()  # in_flight 中的后台任务（不计入 concurrency）
+
+    def stop(self):
+        """请求停止（正在运行的分析会完成）"""
+        self.stop_event.set()
+
+    def run(self):
+        """运行领取循环，直到调用 stop"""
+        if not self.manager.store.shared:
+            raise RuntimeError("分析 worker 需要共享任务存储，请设置 TASK_STORE=sqlite")
+
+        print(f"🛠️ 分析 worker {self.worker_id} 已启动（并发 {self.concurrency}，"
+              f"任务存储 {self.manager.store.db_path}）")
+
+        # 后台任务另外占用线程，全部 worker 合计不超过调度器的 max_background
+        executor = ThreadPoolExecutor(
+            max_workers=self.concurrency + self.manager.scheduler.max_background)
+        try:
+            while not self.stop_event.is_set():
+                self._reap()
+                lost = self.manager.fail_stale_tasks()
+                for task_id in lost:
+                    print(f"⚠️ 任务 {task_id} 心跳超时，已标记为失败")
+                for task_id in self.manager.fail_over_quota_tasks():
+                    print(f"⚠️ 任务 {task_id} 所属设备当日配额已用完，已标记为失败")
+
+                claimed = False
+                while not self.stop_event.is_set():
+                    analysis_in_flight = len(self.in_flight) - len(self.background)
+                    task = self.manager.store.claim(
+                        self.worker_id, self.manager.scheduler,
+                        analysis=analysis_in_flight < self.concurrency)
+                    if task is None:
+                        break
+                    claimed = True
+                    if task['kind'] in BACKGROUND_KINDS:
+                        self.background.add(task['task_id'])
+                    print(f"▶ 开始任务 {task['task_id']}（{task['kind']}）")
+                    self.in_flight[task['task_id']] = executor.submit(
+                        self.manager.run_claimed_task, task)
+
+                if not claimed:
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            print("⏳ 等待正在运行的分析完成...")
+            executor.shutdown(wait=True)
+            self._reap()
+            flush_shared_metrics()
+            print("✓ 分析 worker 已停止")
+
+    def _reap(self):
+        """回收已结束的任务"""
+        for task_id, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[task_id]
+            self.background.discard(task_id)
+            task = self.manager.get_task(task_id) or {}
+            if task.get('status') == 'completed':
+                print(f"✓ 完成任务 {task_id}")
+            else:
+                print(f"❌ 任务 {task_id} 失败: {task.get('message')}")
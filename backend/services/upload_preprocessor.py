@@ -0,0 +1,368 @@
+"""
+上传后处理 - 在后台为新上传的视频提前完成分析前的准备工作
+
+上传请求只保存文件和元数据就返回，随后提交 preprocess 任务（bulk 通道，由任务系统在后台执行；
+后台任务不占用设备的分析并发名额，随后提交的分析不必等它结束）：
+1. 探测视频信息（帧率、帧数、分辨率、时长），缓存到上传元数据
+2. 生成封面缩略图 {file_id}_poster.jpg
+3. 上传时声明将使用两阶段分析时，生成低分辨率分析代理 {file_id}_proxy.mp4
+   （逐帧转码，帧率和帧号与原视频一致），预览阶段从代理解码
+4. 可选：预提取随后分析首先请求的关节点写入关节点缓存（两阶段分析为预览阶段，
+   否则按上传时声明的分析参数），/analysis/start 用相同参数分析时跳过解码和推理
+
+该视频的分析任务已经提交时，后续分析用不上代理和预提取结果，这两步直接跳过。
+处理状态和产物记录在上传元数据的 preprocess 字段中。预提取的帧不计入设备配额
+（命中缓存的正式分析仍按姿态分析帧数计入）。
+"""
+import os
+import sys
+import json
+import uuid
+import threading
+from datetime import datetime
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from core.instrumentation import StageProfiler
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from config_backend import Config
+from exceptions import VideoAnalysisError
+
+# 上传目录中由后处理生成的文件（包括写入中的临时文件），文件列表中不单独列出
+DERIVED_SUFFIXES = ('_poster.jpg', '_proxy.mp4', '.tmp.jpg', '.tmp.mp4', '.tmp.json')
+
+# 同一进程内读改写上传元数据的锁（任务状态之外的元数据只由上传请求和后处理任务写入）
+_metadata_lock = threading.Lock()
+
+
+def upload_metadata_path(video_path: str) -> str:
+    """上传元数据文件路径（{file_id}.json）"""
+    return os.path.splitext(video_path)[0] + '.json'
+
+
+def poster_path(video_path: str) -> str:
+    """封面缩略图路径"""
+    return os.path.splitext(video_path)[0] + '_poster.jpg'
+
+
+def proxy_path(video_path: str) -> str:
+    """分析代理路径"""
+    return os.path.splitext(video_path)[0] + '_proxy.mp4'
+
+
+def is_derived_file(filename: str) -> bool:
+    """是否为后处理生成的文件"""
+    return filename.endswith(DERIVED_SUFFIXES)
+
+
+def find_proxy(video_path: str) -> Optional[str]:
+    """
+    已生成的分析代理
+
+    Args:
+        video_path: 原视频路径
+
+    Returns:
+        代理路径；未生成或早于原视频（原视频被替换）时返回 None
+    """
+    path = proxy_path(video_path)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(video_path):
+            return path
+    except OSError:
+        pass
+    return None
+
+
+def read_upload_metadata(video_path: str) -> dict:
+    """读取上传元数据（不存在或损坏时返回空字典）"""
+    try:
+        with open(upload_metadata_path(video_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_upload_metadata(video_path: str, updates: dict) -> dict:
+    """
+    合并更新上传元数据（原子写入）
+
+    Args:
+        video_path: 原视频路径
+        updates: 要更新的顶层字段
+
+    Returns:
+        更新后的元数据
+    """
+    path = upload_metadata_path(video_path)
+    with _metadata_lock:
+        metadata = read_upload_metadata(video_path)
+        metadata.update(updates)
+        tmp_path = f"{os.path.splitext(path)[0]}.{uuid.uuid4().hex}.tmp.json"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    return metadata
+
+
+def get_video_info(video_path: str) -> dict:
+    """
+    获取视频信息
+
+    Args:
+        video_path: 视频文件路径
+
+    Returns:
+        dict: 视频信息（fps / frame_count / width / height / duration），无法打开时为空字典
+    """
+    import cv2
+
+    try:
+        cap = cv2.VideoCapture(video_path)
+
+        if not cap.isOpened():
+            return {}
+
+        info = {
+            'fps': int(cap.get(cv2.CAP_PROP_FPS)),
+            'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+
+        # 计算时长
+        if info['fps'] > 0:
+            info['duration'] = round(info['frame_count'] / info['fps'], 2)
+        else:
+            info['duration'] = 0
+
+        cap.release()
+        return info
+
+    except Exception as e:
+        print(f"获取视频信息失败: {e}")
+        return {}
+
+
+def _quota_exhausted(device_id: str) -> bool:
+    """设备当日配额是否已用完（随后的分析会被拒绝，预提取的关节点用不上）"""
+    from services.task_manager import task_manager
+
+    return task_manager.get_device_usage(device_id or '')['remaining'] == 0
+
+
+def _analysis_requested(video_path: str) -> bool:
+    """该视频是否已有排队中或运行中的分析任务"""
+    from services.task_manager import task_manager
+
+    video_path = os.path.abspath(video_path)
+    return any(task.get('kind') in ('analyze', 'analyze_two_stage')
+               and task['status'] in ('pending', 'processing')
+               and os.path.abspath(task.get('video_path') or '') == video_path
+               for task in task_manager.get_all_tasks())
+
+
+def _scaled_size(width: int, height: int, max_dimension: int):
+    """按最大边长等比缩小后的尺寸（取偶数，兼容常见编码器）"""
+    scale = min(1.0, max_dimension / max(width, height))
+    return (max(2, int(round(width * scale)) // 2 * 2),
+            max(2, int(round(height * scale)) // 2 * 2))
+
+
+def make_poster(video_path: str, output_path: str, max_dimension: int) -> bool:
+    """
+    生成封面缩略图（取视频中间一帧）
+
+    Args:
+        video_path: 视频文件路径
+        output_path: 输出 JPEG 路径
+        max_dimension: 缩略图最大边长（像素）
+
+    Returns:
+        是否生成成功
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if frame_count > 1:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 2)
+        ret, frame = cap.read()
+        if not ret:
+            # 部分容器不支持定位，退回第一帧
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = cap.read()
+    finally:
+        cap.release()
+    if not ret:
+        return False
+
+    height, width = frame.shape[:2]
+    size = _scaled_size(width, height, max_dimension)
+    if size != (width, height):
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    tmp_path = f"{os.path.splitext(output_path)[0]}.{uuid.uuid4().hex}.tmp.jpg"
+    if not cv2.imwrite(tmp_path, frame):
+        return False
+    os.replace(tmp_path, output_path)
+    return True
+
+
+def make_proxy(video_path: str, output_path: str, max_dimension: int) -> Optional[dict]:
+    """
+    生成低分辨率分析代理（逐帧转码，保持帧率和帧号）
+
+    Args:
+        video_path: 视频文件路径
+        output_path: 输出 MP4 路径
+        max_dimension: 代理最大边长（像素）
+
+    Returns:
+        {width, height, frames}；原视频不超过该尺寸（直接解码原视频即可）或无法读取时返回 None
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    tmp_path = f"{os.path.splitext(output_path)[0]}.{uuid.uuid4().hex}.tmp.mp4"
+    writer = None
+    frames = 0
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if fps <= 0 or max(width, height) <= max_dimension:
+            return None
+
+        size = _scaled_size(width, height, max_dimension)
+        writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        if not writer.isOpened():
+            print(f"⚠️ 无法创建分析代理: {output_path}")
+            return None
+
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            frames += 1
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+    if frames == 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, output_path)
+    return {'width': size[0], 'height': size[1], 'frames': frames}
+
+
+def preprocess_upload(video_path: str, options: dict, progress_callback=None) -> dict:
+    """
+    上传后处理（preprocess 任务的执行函数）
+
+    Args:
+        video_path: 上传的视频路径
+        options: 任务参数
+            - file_id: 上传文件ID
+            - device_id: 设备ID
+            - two_stage: 随后是否使用两阶段分析（决定是否生成分析代理、预提取哪个阶段的关节点）
+            - preextract: 是否预提取关节点
+            - analysis_options: 随后分析使用的选项（speed_profile / frame_interval 等，
+              应与随后 /analysis/start 的选项一致才能命中缓存）
+        progress_callback: 进度回调函数 callback(progress: int, message: str)
+
+    Returns:
+        dict: {status, video_info, poster, proxy, landmarks, stages}
+    """
+    profiler = StageProfiler()
+    preprocess = {
+        'status': 'processing',
+        'started_at': datetime.now().isoformat(),
+        'poster': None,
+        'proxy': None,
+        'landmarks': None
+    }
+    update_upload_metadata(video_path, {'preprocess': preprocess})
+
+    try:
+        # 1. 探测视频信息
+        with profiler.stage('upload_probe'):
+            video_info = get_video_info(video_path)
+        if not video_info:
+            raise VideoAnalysisError(f"无法打开视频文件: {video_path}",
+                                     "无法读取视频文件，请检查视频是否完整、格式是否正确。")
+        update_upload_metadata(video_path, {'video_info': video_info})
+        if progress_callback:
+            progress_callback(10, f'视频信息已缓存: {video_info["frame_count"]}帧')
+
+        # 2. 封面缩略图
+        with profiler.stage('poster'):
+            if make_poster(video_path, poster_path(video_path), Config.UPLOAD_POSTER_MAX_DIMENSION):
+                preprocess['poster'] = os.path.basename(poster_path(video_path))
+        if progress_callback:
+            progress_callback(20, '封面已生成')
+
+        # 分析已提交时代理和预提取结果都用不上（预览已从原视频解码、分析自行检测）
+        two_stage = bool(options.get('two_stage'))
+        superseded = (two_stage or options.get('preextract')) and _analysis_requested(video_path)
+        if superseded:
+            preprocess['skipped'] = '分析任务已提交'
+        elif options.get('preextract') and _quota_exhausted(options.get('device_id')):
+            # 后台任务不受配额限制，但配额用完时不再为无法提交的分析做姿态检测
+            options = {**options, 'preextract': False}
+            preprocess['skipped'] = '设备当日配额已用完'
+
+        # 3. 低分辨率分析代理（只有两阶段分析的预览阶段使用）
+        if two_stage and not superseded:
+            with profiler.stage('proxy') as stage:
+                proxy = make_proxy(video_path, proxy_path(video_path),
+                                   Config.UPLOAD_PROXY_MAX_DIMENSION)
+                stage.items = proxy['frames'] if proxy else 0
+            if proxy:
+                preprocess['proxy'] = os.path.basename(proxy_path(video_path))
+                preprocess['proxy_resolution'] = f"{proxy['width']}x{proxy['height']}"
+            if progress_callback:
+                progress_callback(50, '分析代理已生成' if proxy else '视频分辨率不高，无需分析代理')
+
+        # 4. 预提取随后分析首先请求的关节点（失败不影响前面的产物，正式分析时会重新检测）
+        if options.get('preextract') and not superseded:
+            if progress_callback:
+                progress_callback(55, '预提取关节点...')
+            from services.analysis_service import analysis_service
+            analysis_options = options.get('analysis_options') or {}
+            if two_stage:
+                analysis_options = analysis_service.preview_options(video_path, analysis_options)
+            try:
+                with profiler.stage('preextract') as stage:
+                    landmarks = analysis_service.preextract_landmarks(video_path, analysis_options)
+                    stage.items = landmarks['frames']
+                preprocess['landmarks'] = landmarks
+            except Exception as e:
+                print(f"⚠️ 预提取关节点失败: {e}")
+                preprocess['landmarks'] = {'error': str(e)}
+
+        preprocess.update({'status': 'completed', 'completed_at': datetime.now().isoformat()})
+        update_upload_metadata(video_path, {'preprocess': preprocess})
+        if progress_callback:
+            progress_callback(100, '上传后处理完成')
+
+        return {**preprocess, 'video_info': video_info, 'stages': profiler.summary()}
+
+    except Exception as e:
+        preprocess.update({'status': 'failed', 'error': str(e),
+                           'completed_at': datetime.now().isoformat()})
+        update_upload_metadata(video_path, {'preprocess': preprocess})
+        if isinstance(e, VideoAnalysisError):
+            raise
+        raise VideoAnalysisError(f'上传后处理失败: {str(e)}',
+                                 '视频预处理失败，仍可直接开始分析。')
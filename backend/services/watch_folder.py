@@ -0,0 +1,322 @@
+"""
+监视文件夹 - 自动分析放入共享目录的视频
+
+- Linux 上使用 inotify（通过 ctypes 调用 libc，无额外依赖），不可用时回退为定时轮询
+- 文件大小和修改时间在稳定期内不再变化后才入队，避免分析仍在拷贝中的文件
+- 分析流程与 Web 接口相同（AnalysisService.analyze_video），同时运行的分析数有上限
+- 与批量分析共用处理日志：开始和结束都会记录，重启后已完成（或已失败）的视频不会重复分析，
+  分析中途崩溃的视频会重新分析
+"""
+import os
+import time
+import select
+import signal
+import struct
+import ctypes
+import ctypes.util
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from services.batch_runner import (
+    BATCH_DIR, VIDEO_EXTENSIONS, IngestJournal, analysis_id_for, run_analysis_job
+)
+from core.asset_store import compute_file_hash
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """单个目录的 inotify 监视（非递归）"""
+
+    def __init__(self, directory: str):
+        """
+        初始化监视
+
+        Args:
+            directory: 监视的目录
+
+        Raises:
+            OSError: 系统不支持 inotify 或监视失败
+        """
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError('当前系统不支持 inotify')
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch 失败: {directory}')
+
+    def wait(self, timeout: float) -> Tuple[set, bool]:
+        """
+        等待文件事件
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            (有事件的文件名集合, 是否发生事件队列溢出)
+        """
+        names = set()
+        overflow = False
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return names, overflow
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names, overflow
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name:
+                names.add(os.fsdecode(name))
+
+        return names, overflow
+
+    def close(self):
+        """关闭监视"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _ignore_sigint():
+    """分析进程忽略 SIGINT：终端 Ctrl-C 会发给整个进程组，由守护进程统一停止并等待分析完成"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class WatchFolderDaemon:
+    """监视文件夹并自动分析新视频"""
+
+    def __init__(self, watch_dir: str, options: Optional[dict] = None,
+                 max_concurrent: int = 2, settle_seconds: float = 5.0,
+                 poll_interval: float = 2.0, rescan_interval: float = 60.0,
+                 journal_path: Optional[str] = None, log_dir: Optional[str] = None,
+                 use_inotify: bool = True, retry_failed: bool = False):
+        """
+        初始化监视守护进程
+
+        Args:
+            watch_dir: 监视的目录（只监视该目录本身，不含子目录）
+            options: 传给 AnalysisService.analyze_video 的分析选项
+            max_concurrent: 同时运行的分析数上限
+            settle_seconds: 文件大小和修改时间保持不变多久后视为拷贝完成
+            poll_interval: 轮询间隔（inotify 模式下为检查稳定性的间隔）
+            rescan_interval: inotify 模式下完整扫描目录的间隔（兜底遗漏的事件）
+            journal_path: 处理日志路径（默认与批量分析共用 output/batch/journal.jsonl）
+            log_dir: 每个视频的分析输出日志目录
+            use_inotify: 是否尝试使用 inotify
+            retry_failed: 重启后是否重新分析日志中失败的视频
+        """
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.options = dict(options or {})
+        self.max_concurrent = max(1, max_concurrent)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.journal = IngestJournal(journal_path or os.path.join(BATCH_DIR, 'journal.jsonl'))
+        self.log_dir = log_dir or os.path.join(BATCH_DIR, 'watch_logs')
+        self.use_inotify = use_inotify
+        self.retry_failed = retry_failed
+
+        self.stop_event = threading.Event()
+        # 路径 -> {size, mtime, stable_since}：等待稳定的文件
+        self.candidates: Dict[str, dict] = {}
+        # 路径 -> (size, mtime)：已处理（入队或跳过）的文件版本，文件被替换时重新处理
+        self.handled: Dict[str, Tuple[int, int]] = {}
+        self.queue = deque()
+        self.in_flight = {}  # future -> 记录
+        self.known_hashes = set()
+
+    def stop(self):
+        """请求停止（正在运行的分析会完成并记录）"""
+        self.stop_event.set()
+
+    def run(self):
+        """运行监视循环，直到调用 stop"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._load_journal()
+
+        watcher = None
+        if self.use_inotify:
+            try:
+                watcher = InotifyWatcher(self.watch_dir)
+                print(f"👀 使用 inotify 监视: {self.watch_dir}")
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify 不可用，改用轮询: {e}")
+        if watcher is None:
+            print(f"👀 每 {self.poll_interval:.0f} 秒轮询: {self.watch_dir}")
+
+        # spawn 避免子进程继承父进程中 OpenCV/MediaPipe 的线程状态
+        context = multiprocessing.get_context('spawn')
+        executor = ProcessPoolExecutor(max_workers=self.max_concurrent, mp_context=context,
+                                       initializer=_ignore_sigint)
+
+        # 启动时完整扫描一次，处理守护进程停止期间放入的文件
+        self._scan()
+        last_scan = time.monotonic()
+
+        try:
+            while not self.stop_event.is_set():
+                if watcher is not None:
+                    names, overflow = watcher.wait(self.poll_interval)
+                    for name in names:
+                        self._observe(os.path.join(self.watch_dir, name))
+                    if overflow or time.monotonic() - last_scan >= self.rescan_interval:
+                        self._scan()
+                        last_scan = time.monotonic()
+                else:
+                    self.stop_event.wait(self.poll_interval)
+                    self._scan()
+
+                self._check_stable()
+                self._reap()
+                self._submit(executor)
+        finally:
+            if watcher is not None:
+                watcher.close()
+            print("⏳ 等待正在运行的分析完成...")
+            executor.shutdown(wait=True)
+            self._reap()
+            # 尚未开始的文件不记录，下次启动时重新发现
+            print("✓ 监视已停止")
+
+    def _load_journal(self):
+        """从处理日志恢复已完成（和失败）的视频哈希"""
+        skip_statuses = {'completed'} if self.retry_failed else {'completed', 'failed'}
+        records = self.journal.load()
+        self.known_hashes = {video_hash for video_hash, record in records.items()
+                             if record.get('status') in skip_statuses}
+        interrupted = sum(1 for record in records.values() if record.get('status') == 'started')
+        print(f"✓ 处理日志: {len(self.known_hashes)} 个视频已处理"
+              + (f"，{interrupted} 个上次中断的视频将重新分析" if interrupted else ""))
+
+    def _scan(self):
+        """扫描目录中的全部视频"""
+        try:
+            names = os.listdir(self.watch_dir)
+        except OSError as e:
+            print(f"⚠️ 无法读取监视目录: {e}")
+            return
+        for name in names:
+            self._observe(os.path.join(self.watch_dir, name))
+
+    def _observe(self, path: str):
+        """记录文件的当前大小和修改时间（变化时重新开始稳定计时）"""
+        if not path.lower().endswith(VIDEO_EXTENSIONS):
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # 文件已被移走或删除
+            self.candidates.pop(path, None)
+            return
+
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self.handled.get(path) == signature:
+            return
+
+        candidate = self.candidates.get(path)
+        if candidate is None or (candidate['size'], candidate['mtime']) != signature:
+            self.candidates[path] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'stable_since': time.monotonic()
+            }
+
+    def _check_stable(self):
+        """将稳定期内未变化的文件入队"""
+        now = time.monotonic()
+        for path in list(self.candidates):
+            self._observe(path)
+            candidate = self.candidates.get(path)
+            if candidate is None or candidate['size'] == 0:
+                continue
+            if now - candidate['stable_since'] < self.settle_seconds:
+                continue
+
+            del self.candidates[path]
+            self.handled[path] = (candidate['size'], candidate['mtime'])
+
+            try:
+                video_hash = compute_file_hash(path)
+            except OSError as e:
+                print(f"⚠️ 无法读取 {path}: {e}")
+                continue
+
+            if video_hash in self.known_hashes:
+                print(f"↷ 跳过已处理的视频: {os.path.basename(path)}")
+                continue
+
+            self.known_hashes.add(video_hash)
+            self.queue.append({'video_path': path, 'video_hash': video_hash})
+            print(f"＋ 入队: {os.path.basename(path)}（队列 {len(self.queue)}）")
+
+    def _submit(self, executor: ProcessPoolExecutor):
+        """在并发上限内启动排队的分析（开始前记录到处理日志）"""
+        while self.queue and len(self.in_flight) < self.max_concurrent \
+                and not self.stop_event.is_set():
+            record = self.queue.popleft()
+            record.update({
+                'status': 'started',
+                'source': 'watch',
+                'analysis_id': analysis_id_for(record['video_path'], record['video_hash']),
+                'started_at': datetime.now().isoformat()
+            })
+            self.journal.append(record)
+            future = executor.submit(run_analysis_job, record['video_path'],
+                                     record['video_hash'], self.options, self.log_dir)
+            self.in_flight[future] = record
+            print(f"▶ 开始分析: {os.path.basename(record['video_path'])}")
+
+    def _reap(self):
+        """记录已结束的分析"""
+        for future in [f for f in self.in_flight if f.done()]:
+            record = self.in_flight.pop(future)
+            try:
+                record.update(future.result())
+            except BaseException as e:
+                # 工作进程中的 KeyboardInterrupt 等也只影响这一条分析，不能中断守护进程
+                if self.stop_event.is_set():
+                    # 停止时被中断的分析保持 started 状态，下次启动重新分析
+                    print(f"↺ 已中断，下次启动重新分析: {os.path.basename(record['video_path'])}")
+                    continue
+                # 工作进程异常退出
+                record.update({'status': 'failed', 'error': str(e) or type(e).__name__,
+                               'finished_at': datetime.now().isoformat()})
+            self.journal.append(record)
+
+            if record['status'] == 'completed':
+                print(f"✓ 完成: {os.path.basename(record['video_path'])} "
+                      f"({record['elapsed']:.1f}s) -> {record['output_dir']}")
+            else:
+                print(f"❌ 失败: {os.path.basename(record['video_path'])}: {record.get('error')}")
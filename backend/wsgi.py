@@ -0,0 +1,19 @@
+"""
+生产模式 WSGI 入口
+
+任务状态默认保存在共享的 SQLite 任务存储中，多个 HTTP worker 进程查询到的是同一份任务状态；
+分析任务由独立的分析 worker 进程执行（python main.py worker），两者分别扩容：
+
+    cd backend
+    gunicorn -w 4 -b 0.0.0.0:5000 wsgi:app
+    TASK_STORE=sqlite python ../main.py worker --concurrency 2
+"""
+import os
+
+# 必须在导入应用（以及任务管理器）之前设置
+os.environ.setdefault('TASK_STORE', 'sqlite')
+
+from app import create_app
+from config_backend import ProductionConfig
+
+app = create_app(ProductionConfig)
@@ -0,0 +1,216 @@
+"""
+启动耗时基准
+
+在全新的解释器中用 `python -X importtime` 测量命令行入口（main.py）和 Web API（backend/app.py）
+的启动耗时，列出累计耗时最高的模块，并检查启动后是否已加载 MediaPipe / OpenCV / pandas / Jinja2
+（这些依赖应在首次分析或生成报告时才导入）。
+
+- 每个目标运行多次取中位数（第一次运行通常包含磁盘缓存和 .pyc 编译，不计入）
+- --ref：用 git worktree 检出指定提交，在相同环境下测量后对比
+
+使用方法：
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 7 --top 15 --output import_time.json
+    python -m benchmarks.import_time --ref HEAD~1
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, List, Optional
+
+from config import PROJECT_ROOT
+
+# 启动时不应加载的重型依赖
+HEAVY_MODULES = ("mediapipe", "cv2", "pandas", "jinja2")
+
+# 测量目标：名称 -> (相对项目根目录的工作目录, 启动代码)
+IMPORT_TARGETS = {
+    "cli": (".", "import main"),
+    "api": ("backend", "import app; app.create_app()"),
+    # 从已保存的关节点重算，不需要解码和绘制
+    "reprocess": (".", "import sports.basketball.reprocessor"),
+}
+
+# 子进程输出已加载重型依赖时使用的标记行
+_MODULES_MARKER = "__IMPORT_TIME_MODULES__"
+
+
+def measure_target(name: str, root: str = PROJECT_ROOT) -> Dict:
+    """
+    在全新的解释器中测量一次启动
+
+    Args:
+        name: 目标名称（见 IMPORT_TARGETS）
+        root: 项目根目录
+
+    Returns:
+        dict: {wall_time, import_time, modules: {模块: 累计秒数}, heavy_loaded, error}
+    """
+    workdir, code = IMPORT_TARGETS[name]
+    probe = (f"{code}\n"
+             "import sys\n"
+             f"print({_MODULES_MARKER!r}, ','.join("
+             f"m for m in {HEAVY_MODULES!r} if m in sys.modules))\n")
+
+    env = dict(os.environ)
+    env.pop("PYTHONIMPORTTIME", None)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=os.path.join(root, workdir), env=env,
+        capture_output=True, text=True, encoding="utf-8", errors="replace")
+    wall_time = time.perf_counter() - start
+
+    modules = {}
+    import_time = 0.0
+    other_lines = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            other_lines.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # 表头
+        cumulative = int(parts[1]) / 1e6
+        module = parts[2][1:].rstrip()
+        # 没有缩进的是顶层导入，其累计耗时之和即启动导入总耗时
+        if not module.startswith(" "):
+            import_time += cumulative
+        modules[module.strip()] = max(modules.get(module.strip(), 0.0), cumulative)
+
+    heavy_loaded = []
+    for line in proc.stdout.splitlines():
+        if line.startswith(_MODULES_MARKER):
+            heavy_loaded = [m for m in line[len(_MODULES_MARKER):].strip().split(",") if m]
+
+    return {
+        "wall_time": wall_time,
+        "import_time": import_time,
+        "modules": modules,
+        "heavy_loaded": heavy_loaded,
+        "error": "\n".join(other_lines[-5:]) if proc.returncode != 0 else None
+    }
+
+
+def run_import_benchmark(targets: List[str], repeat: int = 5, top: int = 10,
+                         root: str = PROJECT_ROOT) -> Dict:
+    """
+    测量各目标的启动耗时
+
+    Args:
+        targets: 目标名称列表
+        repeat: 每个目标计入统计的运行次数（另有一次预热）
+        top: 保留累计耗时最高的模块数
+        root: 项目根目录
+
+    Returns:
+        dict: {目标: {wall_time, import_time, top_modules, heavy_loaded, error}}
+    """
+    results = {}
+    for name in targets:
+        measure_target(name, root)  # 预热（.pyc 编译、磁盘缓存）
+        runs = [measure_target(name, root) for _ in range(max(1, repeat))]
+
+        modules = {}
+        for run in runs:
+            for module, seconds in run["modules"].items():
+                modules.setdefault(module, []).append(seconds)
+        top_modules = sorted(((module, statistics.median(values)) for module, values in modules.items()),
+                             key=lambda item: item[1], reverse=True)[:top]
+
+        results[name] = {
+            "wall_time": statistics.median(run["wall_time"] for run in runs),
+            "import_time": statistics.median(run["import_time"] for run in runs),
+            "top_modules": [{"module": module, "cumulative": seconds}
+                            for module, seconds in top_modules],
+            "heavy_loaded": runs[-1]["heavy_loaded"],
+            "error": runs[-1]["error"]
+        }
+    return results
+
+
+def measure_ref(ref: str, targets: List[str], repeat: int, top: int) -> Dict:
+    """
+    检出指定提交到临时 worktree 并测量
+
+    Args:
+        ref: git 提交、分支或标签
+        targets / repeat / top: 同 run_import_benchmark
+
+    Returns:
+        测量结果（同 run_import_benchmark）
+    """
+    with tempfile.TemporaryDirectory(prefix="import_time_") as tmp_dir:
+        worktree = os.path.join(tmp_dir, "tree")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, ref],
+                       cwd=PROJECT_ROOT, check=True, capture_output=True)
+        try:
+            return run_import_benchmark(targets, repeat, top, root=worktree)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree],
+                           cwd=PROJECT_ROOT, capture_output=True)
+
+
+def print_results(results: Dict, baseline: Optional[Dict] = None):
+    """打印测量结果（提供 baseline 时同时显示变化）"""
+    for name, result in results.items():
+        print(f"\n【{name}】")
+        if result["error"]:
+            print(f"  ❌ 启动失败:\n{result['error']}")
+            continue
+
+        line = f"  启动 {result['wall_time'] * 1000:.0f} ms，导入 {result['import_time'] * 1000:.0f} ms"
+        base = (baseline or {}).get(name)
+        if base and not base.get("error") and base["wall_time"] > 0:
+            change = (result["wall_time"] - base["wall_time"]) / base["wall_time"]
+            line += f"（基准 {base['wall_time'] * 1000:.0f} ms，{change:+.0%}）"
+        print(line)
+
+        if result["heavy_loaded"]:
+            print(f"  ⚠️ 启动时已加载: {', '.join(result['heavy_loaded'])}")
+        else:
+            print(f"  ✓ 未加载 {', '.join(HEAVY_MODULES)}")
+
+        for item in result["top_modules"]:
+            print(f"    {item['cumulative'] * 1000:8.1f} ms  {item['module']}")
+
+
+def main() -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="启动耗时基准（python -X importtime）")
+    parser.add_argument("--target", choices=sorted(IMPORT_TARGETS), action="append",
+                        help="测量目标（可重复，默认全部）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个目标的运行次数")
+    parser.add_argument("--top", type=int, default=10, help="列出累计耗时最高的模块数")
+    parser.add_argument("--ref", help="同时测量该 git 提交作为对比基准")
+    parser.add_argument("--output", help="将结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    targets = args.target or list(IMPORT_TARGETS)
+    baseline = None
+    if args.ref:
+        print(f"测量基准提交 {args.ref} ...")
+        baseline = measure_ref(args.ref, targets, args.repeat, args.top)
+    print("测量当前代码 ...")
+    results = run_import_benchmark(targets, args.repeat, args.top)
+
+    print_results(results, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "ref": args.ref,
+                       "baseline": baseline, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已保存到: {args.output}")
+
+    return 1 if any(result["error"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,455 @@
+"""
+端到端基准
+
+在确定性的合成视频上分阶段计时分析流程（probe / decode / pose / kinematics / keyframes / annotate），
+报告各阶段耗时、帧吞吐和峰值内存，结果保存为 JSON，可在提交之间对比。
+
+- --pose stub：用合成姿态后端（core.pose_backends.SyntheticPoseBackend，轨迹与画面一致）代替
+  MediaPipe 推理，pose 阶段只包含逐帧指标计算（BasketballMetrics 的角度、重心、投篮弧度）
+- --skip-decode：不生成和解码视频，由合成后端直接生成帧，只压测下游阶段
+- --pose real：运行 MediaPipe；合成画面中的火柴人可能检测不到，后续阶段失败时仍记录已完成的阶段
+- 每次运行在独立的子进程中进行，各用例的峰值内存互不影响；重复运行时各阶段取中位数
+
+使用方法：
+    python -m benchmarks.pipeline_benchmark run --matrix quick --output bench.json
+    python -m benchmarks.pipeline_benchmark run --pose real --repeat 3 --baseline bench.json
+    python -m benchmarks.pipeline_benchmark run --matrix full --skip-decode
+    python -m benchmarks.pipeline_benchmark compare baseline.json bench.json --threshold 0.1
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import contextlib
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from importlib.metadata import version, PackageNotFoundError
+from typing import Dict, List, Optional
+
+from config import BASKETBALL_SHOT_CONFIG, OUTPUT_DIR, CACHE_DIR, PROJECT_ROOT, SPEED_PROFILES
+from core.instrumentation import StageProfiler
+from core.pose_backends import SyntheticPoseBackend
+from benchmarks.synthetic_video import ensure_video
+
+# 结果文件格式版本
+BENCHMARK_SCHEMA_VERSION = 1
+
+# 合成视频缓存目录和结果目录
+BENCHMARK_VIDEO_DIR = os.path.join(CACHE_DIR, "benchmark_videos")
+BENCHMARK_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "benchmarks")
+
+# 用例矩阵：分辨率 x 帧率 x 时长（秒）
+BENCHMARK_MATRICES = {
+    "quick": {
+        "resolutions": [(640, 360), (1280, 720)],
+        "fps": [30],
+        "durations": [4]
+    },
+    "full": {
+        "resolutions": [(640, 360), (1280, 720), (1920, 1080)],
+        "fps": [30, 60],
+        "durations": [4, 12]
+    }
+}
+
+# 对比时视为回退的默认相对变化
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+
+def build_cases(matrix: str = "quick", frame_interval: Optional[int] = None,
+                seed: int = 0) -> List[Dict]:
+    """
+    展开用例矩阵
+
+    Args:
+        matrix: 矩阵名称（quick / full）
+        frame_interval: 帧间隔，默认取配置
+        seed: 合成视频随机种子
+
+    Returns:
+        用例列表 [{name, width, height, fps, duration, frame_interval, seed}, ...]
+    """
+    spec = BENCHMARK_MATRICES[matrix]
+    frame_interval = frame_interval or BASKETBALL_SHOT_CONFIG.get("frame_interval", 5)
+    cases = []
+    for width, height in spec["resolutions"]:
+        for fps in spec["fps"]:
+            for duration in spec["durations"]:
+                cases.append({
+                    "name": f"{width}x{height}_{fps}fps_{duration}s",
+                    "width": width,
+                    "height": height,
+                    "fps": fps,
+                    "duration": duration,
+                    "frame_interval": frame_interval,
+                    "seed": seed
+                })
+    return cases
+
+
+def run_case(case: Dict, pose_mode: str = "stub", profile: Optional[str] = None,
+             video_dir: str = BENCHMARK_VIDEO_DIR, verbose: bool = False,
+             skip_decode: bool = False) -> Dict:
+    """
+    运行单个用例一次
+
+    Args:
+        case: 用例（build_cases 的元素）
+        pose_mode: stub（合成姿态后端）或 real（MediaPipe）
+        profile: 速度档位（决定推理分辨率和模型复杂度），默认使用全局配置
+        video_dir: 合成视频缓存目录
+        verbose: 是否保留分析过程的输出
+        skip_decode: 不读取视频，由合成后端直接生成帧（只适用于 stub）
+
+    Returns:
+        {status, error, video_frames, sampled_frames, stages, peak_rss_mb}
+    """
+    from core.video_processor import VideoProcessor
+    from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+    from sports.basketball.speed_profiles import apply_speed_profile
+
+    config = apply_speed_profile(BASKETBALL_SHOT_CONFIG, profile)
+    pose_backend = None
+    if pose_mode == "stub":
+        pose_backend = SyntheticPoseBackend(width=case["width"], height=case["height"])
+
+    profiler = StageProfiler()
+    result = {"status": "completed", "error": None, "video_frames": 0, "sampled_frames": 0}
+
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(sys.stdout if verbose else devnull), \
+            contextlib.redirect_stderr(sys.stderr if verbose else devnull):
+        try:
+            if skip_decode:
+                fps = case["fps"]
+                frames_data = pose_backend.generate_frames(
+                    fps, case["duration"], case["frame_interval"])
+                result["video_frames"] = int(round(fps * case["duration"]))
+            else:
+                video_path = ensure_video(video_dir, case["width"], case["height"],
+                                          case["fps"], case["duration"], case["seed"])
+                with profiler.stage("probe"):
+                    processor = VideoProcessor(
+                        video_path, max_inference_dimension=config.get("max_inference_dimension"))
+                fps = processor.fps
+                result["video_frames"] = processor.frame_count
+
+                with profiler.stage("decode") as stage:
+                    frames_data = processor.extract_frames(frame_interval=case["frame_interval"])
+                    stage.items = len(frames_data)
+            result["sampled_frames"] = len(frames_data)
+
+            analyzer = BasketballShotAnalyzer(config, profiler=profiler, pose_backend=pose_backend)
+            analyzer.analyze_frames(frames_data, fps)
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+
+    summary = profiler.summary()
+    total = summary.pop("total")
+    result["stages"] = summary
+    result["peak_rss_mb"] = total["peak_rss_mb"]
+    return result
+
+
+def run_suite(cases: List[Dict], pose_mode: str = "stub", repeat: int = 1,
+              profile: Optional[str] = None, isolate: bool = True,
+              video_dir: str = BENCHMARK_VIDEO_DIR, verbose: bool = False,
+              skip_decode: bool = False) -> Dict:
+    """
+    运行全部用例
+
+    Args:
+        cases: 用例列表
+        pose_mode: stub 或 real
+        repeat: 每个用例的运行次数（各阶段耗时取中位数）
+        profile: 速度档位
+        isolate: 每次运行是否使用独立子进程（关闭时峰值内存为整个基准进程的累计值）
+        video_dir: 合成视频缓存目录
+        verbose: 是否保留分析过程的输出
+        skip_decode: 不读取视频，由合成后端直接生成帧（只适用于 stub）
+
+    Returns:
+        基准报告（可直接保存为 JSON）
+    """
+    if skip_decode and pose_mode != "stub":
+        raise ValueError("skip_decode 只适用于 stub 模式")
+
+    # 先生成全部视频，生成时间不计入任何用例
+    if not skip_decode:
+        for case in cases:
+            ensure_video(video_dir, case["width"], case["height"], case["fps"],
+                         case["duration"], case["seed"])
+
+    executor = None
+    if isolate:
+        # 每个子进程只运行一次，spawn 避免继承父进程的内存和线程状态
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1)
+
+    started = time.perf_counter()
+    results = []
+    try:
+        for case in cases:
+            runs = []
+            for i in range(max(1, repeat)):
+                print(f"⏱️ {case['name']} ({i + 1}/{repeat}, pose={pose_mode})")
+                if executor is not None:
+                    run = executor.submit(run_case, case, pose_mode, profile,
+                                          video_dir, verbose, skip_decode).result()
+                else:
+                    run = run_case(case, pose_mode, profile, video_dir, verbose, skip_decode)
+                runs.append(run)
+                if run["status"] != "completed":
+                    print(f"  ⚠️ 未完成全部阶段: {run['error']}")
+            results.append({**case, **_aggregate_runs(runs)})
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    return {
+        "schema_version": BENCHMARK_SCHEMA_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "elapsed": round(time.perf_counter() - started, 3),
+        "environment": _environment(),
+        "settings": {
+            "pose_mode": pose_mode,
+            "repeat": repeat,
+            "profile": profile,
+            "isolated": isolate,
+            "skip_decode": skip_decode
+        },
+        "cases": results
+    }
+
+
+def _aggregate_runs(runs: List[Dict]) -> Dict:
+    """合并同一用例的多次运行：各阶段取中位数，峰值内存取最大值"""
+    stage_names = []
+    for run in runs:
+        stage_names += [name for name in run["stages"] if name not in stage_names]
+
+    stages = {}
+    for name in stage_names:
+        measurements = [run["stages"][name] for run in runs if name in run["stages"]]
+        wall_times = [m["wall_time"] for m in measurements]
+        wall_time = statistics.median(wall_times)
+        items = measurements[0]["items"]
+        stages[name] = {
+            "wall_time": round(wall_time, 4),
+            "wall_time_min": round(min(wall_times), 4),
+            "cpu_time": round(statistics.median(m["cpu_time"] for m in measurements), 4),
+            "items": items,
+            "items_per_second": round(items / wall_time, 2) if items and wall_time > 0 else None
+        }
+
+    wall_time = sum(stage["wall_time"] for stage in stages.values())
+    video_frames = runs[0]["video_frames"]
+    peaks = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+    failed = [run for run in runs if run["status"] != "completed"]
+
+    return {
+        "status": "failed" if failed else "completed",
+        "error": failed[0]["error"] if failed else None,
+        "runs": len(runs),
+        "video_frames": video_frames,
+        "sampled_frames": runs[0]["sampled_frames"],
+        "wall_time": round(wall_time, 4),
+        # 相当于每秒处理多少帧原视频
+        "video_fps_processed": round(video_frames / wall_time, 2) if wall_time > 0 else None,
+        "peak_rss_mb": max(peaks) if peaks else None,
+        "stages": stages
+    }
+
+
+def _environment() -> Dict:
+    """记录运行环境（提交、版本、硬件），便于解读对比结果"""
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True,
+                                  text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    versions = {}
+    for package in ("opencv-python", "numpy", "mediapipe"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "git_commit": git("rev-parse", "HEAD") or None,
+        "git_dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict,
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> Dict:
+    """
+    对比两次基准结果
+
+    按用例名和阶段名匹配，比较墙钟时间（中位数）和峰值内存；
+    新结果比基准慢（或内存高）超过 threshold 且绝对差超过 5ms 时记为回退。
+
+    Args:
+        baseline: 基准报告
+        current: 当前报告
+        threshold: 相对变化阈值（0.1 表示 10%）
+
+    Returns:
+        {rows: [{case, metric, baseline, current, change, regression}], regressions: 回退行数}
+    """
+    baseline_cases = {case["name"]: case for case in baseline.get("cases", [])}
+    rows = []
+
+    for case in current.get("cases", []):
+        old_case = baseline_cases.get(case["name"])
+        if old_case is None:
+            continue
+
+        metrics = [(f"{name}.wall_time", old_case["stages"][name]["wall_time"], stage["wall_time"])
+                   for name, stage in case["stages"].items() if name in old_case["stages"]]
+        metrics.append(("wall_time", old_case["wall_time"], case["wall_time"]))
+        metrics.append(("peak_rss_mb", old_case.get("peak_rss_mb"), case.get("peak_rss_mb")))
+
+        for metric, old_value, new_value in metrics:
+            if old_value is None or new_value is None:
+                continue
+            change = (new_value - old_value) / old_value if old_value > 0 else 0.0
+            # 内存绝对差小于 1MB、耗时绝对差小于 5ms 时视为噪声
+            min_delta = 1.0 if metric == "peak_rss_mb" else 0.005
+            rows.append({
+                "case": case["name"],
+                "metric": metric,
+                "baseline": old_value,
+                "current": new_value,
+                "change": round(change, 4),
+                "regression": change > threshold and new_value - old_value > min_delta
+            })
+
+    return {
+        "threshold": threshold,
+        "baseline_commit": baseline.get("environment", {}).get("git_commit"),
+        "current_commit": current.get("environment", {}).get("git_commit"),
+        "rows": rows,
+        "regressions": sum(1 for row in rows if row["regression"])
+    }
+
+
+def print_report(report: Dict):
+    """打印各用例的阶段耗时和吞吐"""
+    print("\n" + "=" * 78)
+    settings = report["settings"]
+    print(f"端到端基准（pose={settings['pose_mode']}，重复 {settings['repeat']} 次，"
+          f"提交 {(report['environment']['git_commit'] or '未知')[:8]}）")
+    print("=" * 78)
+    for case in report["cases"]:
+        status = "" if case["status"] == "completed" else f"  ⚠️ {case['error']}"
+        peak = f"{case['peak_rss_mb']:.0f}MB" if case["peak_rss_mb"] is not None else "-"
+        print(f"\n{case['name']}: {case['wall_time']:.2f}s，"
+              f"{case['video_fps_processed'] or 0:.1f} 视频帧/秒，峰值内存 {peak}{status}")
+        for name, stage in case["stages"].items():
+            rate = (f"{stage['items_per_second']:>10.1f}/s"
+                    if stage["items_per_second"] is not None else f"{'-':>12}")
+            print(f"  {name:<12}{stage['wall_time']:>10.3f}s{rate}")
+
+
+def print_comparison(comparison: Dict):
+    """打印对比结果（只列出变化超过阈值一半的项）"""
+    print("\n" + "=" * 78)
+    print(f"对比 {(comparison['baseline_commit'] or '未知')[:8]} -> "
+          f"{(comparison['current_commit'] or '未知')[:8]}"
+          f"（回退阈值 {comparison['threshold']:.0%}）")
+    print("=" * 78)
+    shown = [row for row in comparison["rows"]
+             if abs(row["change"]) >= comparison["threshold"] / 2]
+    for row in shown:
+        marker = "❌" if row["regression"] else ("✓" if row["change"] < 0 else " ")
+        print(f"{marker} {row['case']:<22}{row['metric']:<24}"
+              f"{row['baseline']:>10.3f}{row['current']:>10.3f}{row['change']:>+9.1%}")
+    if not shown:
+        print("无明显变化")
+    print(f"\n回退 {comparison['regressions']} 项")
+
+
+def main() -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="端到端基准（合成视频）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行基准并保存 JSON 结果")
+    run_parser.add_argument("--matrix", choices=sorted(BENCHMARK_MATRICES), default="quick",
+                            help="用例矩阵（默认 quick）")
+    run_parser.add_argument("--pose", choices=["stub", "real"], default="stub",
+                            help="姿态检测方式（默认 stub，不运行 MediaPipe）")
+    run_parser.add_argument("--skip-decode", action="store_true",
+                            help="不读取视频，由合成姿态后端直接生成帧（只压测下游阶段）")
+    run_parser.add_argument("--repeat", type=int, default=1, help="每个用例的运行次数")
+    run_parser.add_argument("--profile", choices=sorted(SPEED_PROFILES), help="速度档位")
+    run_parser.add_argument("--frame-interval", type=int, help="帧间隔（默认取配置）")
+    run_parser.add_argument("--seed", type=int, default=0, help="合成视频随机种子")
+    run_parser.add_argument("--in-process", action="store_true",
+                            help="在当前进程中运行（不隔离峰值内存）")
+    run_parser.add_argument("--verbose", action="store_true", help="显示分析过程的输出")
+    run_parser.add_argument("--output", help="结果 JSON 路径（默认 output/benchmarks/bench_时间戳.json）")
+    run_parser.add_argument("--baseline", help="运行后与该结果对比")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                            help="回退阈值（相对变化，默认 0.1）")
+
+    compare_parser = subparsers.add_parser("compare", help="对比两个结果文件")
+    compare_parser.add_argument("baseline", help="基准结果 JSON")
+    compare_parser.add_argument("current", help="当前结果 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                                help="回退阈值（相对变化，默认 0.1）")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, "r", encoding="utf-8") as f:
+            current = json.load(f)
+        comparison = compare_reports(baseline, current, args.threshold)
+        print_comparison(comparison)
+        return 1 if comparison["regressions"] else 0
+
+    if args.skip_decode and args.pose != "stub":
+        run_parser.error("--skip-decode 只适用于 --pose stub")
+
+    cases = build_cases(args.matrix, args.frame_interval, args.seed)
+    report = run_suite(cases, pose_mode=args.pose, repeat=args.repeat, profile=args.profile,
+                       isolate=not args.in_process, verbose=args.verbose,
+                       skip_decode=args.skip_decode)
+    print_report(report)
+
+    output_path = args.output or os.path.join(
+        BENCHMARK_OUTPUT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✓ 基准结果已保存到: {output_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare_reports(baseline, report, args.threshold)
+        print_comparison(comparison)
+        return 1 if comparison["regressions"] else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
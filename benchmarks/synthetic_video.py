@@ -0,0 +1,140 @@
+"""
+合成视频生成
+
+用 OpenCV 绘制一个反复做投篮动作的火柴人（带篮球），生成确定性的测试视频：
+同一参数（分辨率、帧率、时长、随机种子）每次生成的画面完全相同。
+动作轨迹与 core.pose_backends 的合成后端相同，合成后端返回的关节点与画面一致，
+可替代 MediaPipe 推理（stub 模式）。
+"""
+import os
+import math
+import uuid
+
+import cv2
+import numpy as np
+
+from core.pose_backends import SHOT_PERIOD, shot_phase, synthetic_pose
+
+# 生成算法版本（画面或关节点轨迹变化时递增，缓存的视频自动失效）
+SYNTHETIC_VIDEO_VERSION = 1
+
+# 绘制的骨架连线
+_BONES = [
+    ("left_shoulder", "right_shoulder"), ("left_hip", "right_hip"),
+    ("left_shoulder", "left_hip"), ("right_shoulder", "right_hip"),
+    ("left_shoulder", "left_elbow"), ("left_elbow", "left_wrist"),
+    ("right_shoulder", "right_elbow"), ("right_elbow", "right_wrist"),
+    ("left_hip", "left_knee"), ("left_knee", "left_ankle"),
+    ("right_hip", "right_knee"), ("right_knee", "right_ankle"),
+]
+
+
+def render_frame(t: float, width: int, height: int, background: np.ndarray,
+                 noise: np.ndarray) -> np.ndarray:
+    """
+    绘制时刻 t 的画面
+
+    Args:
+        t: 时间（秒）
+        width: 画面宽度
+        height: 画面高度
+        background: 背景图
+        noise: 叠加的传感器噪声（int16，形状为 (高, 宽, 1)），None 表示不加噪声
+
+    Returns:
+        BGR 图像
+    """
+    if noise is not None:
+        frame = np.clip(background.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    else:
+        frame = background.copy()
+    pose = synthetic_pose(t, width, height)["landmarks"]
+    thickness = max(2, width // 160)
+
+    def pixel(name):
+        return pose[name]["x_pixel"], pose[name]["y_pixel"]
+
+    for start, end in _BONES:
+        cv2.line(frame, pixel(start), pixel(end), (235, 235, 235), thickness, cv2.LINE_AA)
+    cv2.circle(frame, pixel("nose"), int(0.04 * height), (235, 235, 235), -1, cv2.LINE_AA)
+
+    # 篮球：持球时在右手腕，出手后沿抛物线飞出
+    _, _, holding = shot_phase(t)
+    ball_radius = int(0.025 * height)
+    if holding:
+        ball_center = pixel("right_wrist")
+    else:
+        u = (t % SHOT_PERIOD) / SHOT_PERIOD
+        flight = max(0.0, u - 0.55) * SHOT_PERIOD
+        x, y = 0.57, 0.08  # 出手点（右肩上方）
+        ball_center = (int((x + 0.35 * flight) * width),
+                       int((y - 0.9 * flight + 0.9 * flight * flight) * height))
+    cv2.circle(frame, ball_center, ball_radius, (30, 110, 230), -1, cv2.LINE_AA)
+
+    return frame
+
+
+def generate_video(output_path: str, width: int, height: int, fps: int,
+                   duration: float, seed: int = 0) -> str:
+    """
+    生成合成视频（原子写入）
+
+    Args:
+        output_path: 输出路径（.mp4）
+        width: 画面宽度
+        height: 画面高度
+        fps: 帧率
+        duration: 时长（秒）
+        seed: 背景和噪声的随机种子
+
+    Returns:
+        输出路径
+    """
+    rng = np.random.default_rng(seed)
+
+    # 球场风格背景：木地板渐变 + 固定纹理
+    gradient = np.linspace(0.6, 1.0, height, dtype=np.float32)[:, None, None]
+    floor = np.array([60, 120, 170], dtype=np.float32)[None, None, :]
+    texture = rng.normal(0, 8, size=(height, width, 1)).astype(np.float32)
+    background = np.clip(gradient * floor + texture, 0, 255).astype(np.uint8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp.mp4"
+    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"无法创建视频文件: {tmp_path}")
+
+    try:
+        frame_count = int(round(duration * fps))
+        for index in range(frame_count):
+            # 每帧噪声由 (种子, 帧号) 决定，保证可复现
+            frame_rng = np.random.default_rng((seed, index))
+            noise = frame_rng.integers(-3, 4, size=(height, width, 1), dtype=np.int16)
+            writer.write(render_frame(index / fps, width, height, background, noise))
+    finally:
+        writer.release()
+
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def ensure_video(cache_dir: str, width: int, height: int, fps: int,
+                 duration: float, seed: int = 0) -> str:
+    """
+    获取合成视频，缓存目录中不存在时生成
+
+    Args:
+        cache_dir: 视频缓存目录
+        width / height / fps / duration / seed: 同 generate_video
+
+    Returns:
+        视频路径
+    """
+    duration_ms = int(math.floor(duration * 1000))
+    filename = (f"synthetic_v{SYNTHETIC_VIDEO_VERSION}_{width}x{height}_"
+                f"{fps}fps_{duration_ms}ms_s{seed}.mp4")
+    path = os.path.join(cache_dir, filename)
+    if not os.path.exists(path):
+        print(f"🎞️ 生成合成视频: {filename}")
+        generate_video(path, width, height, fps, duration, seed)
+    return path
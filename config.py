@@ -9,10 +9,22 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 # 输出目录
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
 
+# 缓存目录（模板字节码等可重建的中间数据）
+CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache")
+
+# 共享资源存储目录（报表静态资源、视频按内容哈希只保存一份）
+ASSET_STORE_DIR = os.path.join(OUTPUT_DIR, "shared")
+
+# HTML 模板目录
+TEMPLATES_DIR = os.path.join(PROJECT_ROOT, "templates")
+
 # 篮球投篮分析配置
 BASKETBALL_SHOT_CONFIG = {
     "sport_type": "basketball_shot",
     "frame_interval": 5,  # 每5帧提取一次（可根据视频帧率调整）
+    # 推理分辨率上限（最大边长，像素）：提取的帧在解码时缩小，关节点像素坐标仍为原视频坐标；
+    # 关键帧图片按原分辨率输出。None 表示不缩小
+    "max_inference_dimension": 1280,
 
     # 关注的关节点（右侧）
     "joints_of_interest": [
@@ -141,12 +153,54 @@ BASKETBALL_SHOT_CONFIG = {
         }
     ],
 
+    # 运动自适应采样：按帧差运动量分配采样，动作快的阶段密集、静止阶段稀疏
+    # （frame_interval 作为平均间隔）
+    "adaptive_sampling": {
+        "enabled": False,
+        "min_frame_interval": 1,
+        "max_frame_interval": 15
+    },
+
+    # 训练课分段：长视频中按手腕/重心轨迹切分出每一次投篮并并行分析
+    "session_segmentation": {
+        "scan_interval_seconds": 0.1,  # 扫描采样间隔
+        "scan_width": 320,  # 扫描时缩小到的宽度（像素）
+        "raise_margin": 0.03,  # 手腕高于肩部的最小幅度（归一化坐标）
+        "merge_gap_seconds": 0.6,  # 小于该间隔的出手区间合并
+        "lead_seconds": 2.5,  # 出手前搜索投篮起点的最长时间
+        "follow_seconds": 1.0,  # 出手后保留的随球时间
+        "padding_seconds": 0.3,  # 窗口起点额外保留的时间
+        "max_workers": 4  # 并行分析的投篮数
+    },
+
+    # 关键帧精细化（两遍检测）：先按粗间隔检测，再只在候选关键帧附近逐帧重新解码和评分
+    "keyframe_refinement": {
+        "enabled": False,
+        "coarse_frame_interval": 6  # 启用时第一遍使用的帧间隔
+    },
+
+    # 关节点缓存：按视频内容哈希、采样参数和 MediaPipe 配置保存逐帧检测结果，
+    # 只调整下游算法后重新分析同一视频时跳过解码和推理
+    "landmark_cache": {
+        "enabled": True
+    },
+
+    # 姿态检测后端：mediapipe / replay（回放已保存的关节点）/ synthetic（合成投篮动作），
+    # 见 core.pose_backends；非 mediapipe 后端的参数放在 pose_backend_options 中
+    "pose_backend": "mediapipe",
+    "pose_backend_options": {},
+
     # MediaPipe 配置
     "mediapipe": {
         "model_complexity": 2,
         "min_detection_confidence": 0.5,
         "min_tracking_confidence": 0.5,
-        "smooth_landmarks": True
+        "smooth_landmarks": True,
+        # ROI 裁剪：按上一帧人物位置只检测裁剪区域（高分辨率视频可显著加速），
+        # 置信度不足时自动回退整帧检测
+        "roi_tracking": False,
+        "roi_margin": 0.3,
+        "roi_min_confidence": 0.5
     },
 
     # 可视化配置
@@ -159,6 +213,41 @@ BASKETBALL_SHOT_CONFIG = {
     }
 }
 
+# 速度档位：对 BASKETBALL_SHOT_CONFIG 的覆盖项（模型复杂度、推理分辨率、采样密度）
+# 通过 sports.basketball.speed_profiles.apply_speed_profile 应用
+SPEED_PROFILES = {
+    "fast": {
+        "description": "快速预览：轻量模型、低分辨率、稀疏采样",
+        "overrides": {
+            "frame_interval": 6,
+            "max_inference_dimension": 640,
+            "mediapipe": {"model_complexity": 0},
+            "adaptive_sampling": {"enabled": False},
+            "keyframe_refinement": {"enabled": False}
+        }
+    },
+    "balanced": {
+        "description": "均衡：中等模型，按运动量自适应采样",
+        "overrides": {
+            "frame_interval": 4,
+            "max_inference_dimension": 960,
+            "mediapipe": {"model_complexity": 1},
+            "adaptive_sampling": {"enabled": True},
+            "keyframe_refinement": {"enabled": False}
+        }
+    },
+    "precise": {
+        "description": "高精度：最高精度模型、密集采样",
+        "overrides": {
+            "frame_interval": 2,
+            "max_inference_dimension": 1280,
+            "mediapipe": {"model_complexity": 2},
+            "adaptive_sampling": {"enabled": False},
+            "keyframe_refinement": {"enabled": False}
+        }
+    }
+}
+
 # MediaPipe 关节点索引映射
 MEDIAPIPE_POSE_LANDMARKS = {
     "nose": 0,
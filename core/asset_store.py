@@ -0,0 +1,193 @@
+"""
+共享资源存储模块
+按内容哈希保存报表静态资源和视频文件，多个报表共享同一份数据
+"""
+import os
+import shutil
+import hashlib
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+from config import ASSET_STORE_DIR
+from core.metrics import cache_lookups
+
+# 文件哈希缓存：(绝对路径, 文件大小, 修改时间) -> 哈希值
+_hash_cache: Dict[Tuple[str, int, int], str] = {}
+_hash_cache_lock = threading.Lock()
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path: str) -> str:
+    """
+    计算文件内容的 SHA-256 哈希（同一文件未修改时直接返回缓存结果）
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        十六进制哈希字符串
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    cache_key = (file_path, stat.st_size, stat.st_mtime_ns)
+
+    with _hash_cache_lock:
+        cached = _hash_cache.get(cache_key)
+    if cached:
+        return cached
+
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    with _hash_cache_lock:
+        _hash_cache[cache_key] = digest
+    return digest
+
+
+class AssetStore:
+    """按内容寻址的共享资源存储"""
+
+    def __init__(self, root_dir: str = ASSET_STORE_DIR):
+        """
+        初始化资源存储
+
+        Args:
+            root_dir: 存储根目录
+        """
+        self.root_dir = os.path.abspath(root_dir)
+        self.media_dir = os.path.join(self.root_dir, "media")
+        self.assets_dir = os.path.join(self.root_dir, "assets")
+
+    def put_file(self, file_path: str) -> str:
+        """
+        将文件存入共享存储（内容相同的文件只保存一份）
+
+        优先使用硬链接，跨文件系统时才复制数据。
+
+        Args:
+            file_path: 源文件路径
+
+        Returns:
+            存储中的文件路径
+        """
+        digest = compute_file_hash(file_path)
+        extension = os.path.splitext(file_path)[1].lower()
+        stored_path = os.path.join(
+            self.media_dir, digest[:2], f"{digest}{extension}")
+
+        if os.path.exists(stored_path):
+            cache_lookups.labels("asset", "hit").inc()
+            return stored_path
+        cache_lookups.labels("asset", "miss").inc()
+
+        os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+        tmp_path = f"{stored_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(file_path, tmp_path)
+        except OSError:
+            shutil.copy2(file_path, tmp_path)
+        os.replace(tmp_path, stored_path)
+
+        return stored_path
+
+    def put_directory(self, source_dir: str) -> str:
+        """
+        将目录（如 CSS/JS 静态资源）存入共享存储
+
+        Args:
+            source_dir: 源目录
+
+        Returns:
+            存储中的目录路径
+        """
+        digest = self._hash_directory(source_dir)
+        stored_dir = os.path.join(self.assets_dir, digest[:16])
+
+        if os.path.isdir(stored_dir):
+            cache_lookups.labels("asset", "hit").inc()
+            return stored_dir
+        cache_lookups.labels("asset", "miss").inc()
+
+        os.makedirs(self.assets_dir, exist_ok=True)
+        tmp_dir = f"{stored_dir}.{uuid.uuid4().hex}.tmp"
+        shutil.copytree(source_dir, tmp_dir)
+        try:
+            os.rename(tmp_dir, stored_dir)
+        except OSError:
+            # 其他进程已写入相同内容
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return stored_dir
+
+    @staticmethod
+    def link_file(stored_path: str, dest_path: str) -> bool:
+        """
+        在目标位置创建指向存储文件的硬链接（不复制数据）
+
+        目标已是同一文件时直接返回；已存在的其他文件（旧报表复制的图片等）被替换：
+        先链接到临时路径再原子替换，不会写入目标原有的数据。
+
+        Args:
+            stored_path: 存储中的文件路径
+            dest_path: 目标路径
+
+        Returns:
+            是否成功（跨文件系统等情况返回 False）
+        """
+        if os.path.exists(dest_path) and os.path.samefile(stored_path, dest_path):
+            return True
+
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(stored_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return True
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    @staticmethod
+    def relative_url(target_path: str, from_dir: str) -> str:
+        """
+        计算从报表目录访问存储内容的相对 URL
+
+        Args:
+            target_path: 存储中的文件或目录
+            from_dir: 报表所在目录
+
+        Returns:
+            使用 / 分隔的相对路径
+        """
+        rel_path = os.path.relpath(target_path, os.path.abspath(from_dir))
+        return rel_path.replace(os.sep, '/')
+
+    @staticmethod
+    def _hash_directory(source_dir: str) -> str:
+        """按相对路径和文件内容计算目录哈希"""
+        sha256 = hashlib.sha256()
+        for root, dirs, files in os.walk(source_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                file_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(file_path, source_dir)
+                sha256.update(rel_path.replace(os.sep, '/').encode('utf-8'))
+                sha256.update(compute_file_hash(file_path).encode('ascii'))
+        return sha256.hexdigest()
+
+
+_default_store: Optional[AssetStore] = None
+
+
+def get_asset_store() -> AssetStore:
+    """获取默认的共享资源存储"""
+    global _default_store
+    if _default_store is None:
+        _default_store = AssetStore()
+    return _default_store
@@ -2,10 +2,31 @@
 数据管理模块
 使用 pandas 管理和导出分析数据
 """
-import pandas as pd
+import numpy as np
 import json
 import os
-from typing import Dict, List
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# analysis_data.json 的数据格式版本
+ANALYSIS_SCHEMA_VERSION = 2
+
+
+def _json_default(obj: Any):
+    """将 numpy 标量转换为原生类型；其他无法序列化的对象直接报错"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"无法序列化的对象类型: {type(obj).__name__}")
+
+
+def _write_csv(df: "pd.DataFrame", path: str):
+    """写入 CSV（先写临时文件再替换，读取方不会看到写了一半的文件）"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
 
 
 class DataManager:
@@ -18,72 +39,91 @@ class DataManager:
         self.velocities_df = None
         self.keyframes_df = None
 
-    def create_dataframes(self, analysis_results: Dict) -> Dict[str, pd.DataFrame]:
+    def create_dataframes(self, analysis_results: Dict,
+                          time_series: Optional[Dict] = None) -> Dict[str, "pd.DataFrame"]:
         """
         从分析结果创建数据表
 
         Args:
             analysis_results: 分析结果字典
+            time_series: 分析器输出的列式时序数组（见
+                BasketballShotAnalyzer.get_time_series），提供时直接按列构建，
+                否则从 frames 单次遍历收集
 
         Returns:
             包含各种数据表的字典
         """
-        frames = analysis_results["frames"]
-        keyframes = analysis_results.get("keyframes", {})
+        if time_series is None:
+            time_series = self.series_from_frames(analysis_results["frames"])
 
-        # 创建帧基本信息表
-        frames_data = []
-        for frame in frames:
-            frame_info = {
-                "frame_number": frame["frame_number"],
-                "timestamp": frame["timestamp"],
-                "pose_detected": frame["pose_detected"]
-            }
-
-            # 添加重心信息
-            if frame.get("center_of_mass"):
-                frame_info["com_x"] = frame["center_of_mass"]["x"]
-                frame_info["com_y"] = frame["center_of_mass"]["y"]
-                frame_info["com_height"] = frame.get("com_height", 0)
+        return self.create_dataframes_from_series(
+            time_series, analysis_results.get("keyframes", {}))
 
-            # 添加投篮弧度
-            if frame.get("shooting_arc") is not None:
-                frame_info["shooting_arc"] = frame["shooting_arc"]
+    def create_dataframes_from_series(self, time_series: Dict,
+                                      keyframes: Optional[Dict] = None) -> Dict[str, "pd.DataFrame"]:
+        """
+        从列式时序数组直接创建数据表（不逐行构建字典）
 
-            frames_data.append(frame_info)
+        Args:
+            time_series: 列式时序数据
+                - frame_number / timestamp / pose_detected: 每帧一个值
+                - com_x / com_y / com_height / shooting_arc: 缺失处为 NaN
+                - angles: {角度名: 数组}
+                - velocities: {关节名: 数组}
+            keyframes: 关键帧字典
 
-        self.frames_df = pd.DataFrame(frames_data)
+        Returns:
+            包含各种数据表的字典
+        """
+        # pandas 只在导出数据表时需要，首次使用时才导入
+        import pandas as pd
 
-        # 创建角度数据表
-        angles_data = []
-        for frame in frames:
-            if frame.get("angles"):
-                angle_row = {
-                    "frame_number": frame["frame_number"],
-                    "timestamp": frame["timestamp"]
-                }
-                angle_row.update(frame["angles"])
-                angles_data.append(angle_row)
+        keyframes = keyframes or {}
+        frame_number = np.asarray(time_series["frame_number"])
+        timestamp = np.asarray(time_series["timestamp"], dtype=float)
+        pose_detected = np.asarray(time_series["pose_detected"], dtype=bool)
 
-        self.angles_df = pd.DataFrame(
-            angles_data) if angles_data else pd.DataFrame()
+        # 创建帧基本信息表
+        frame_columns = {
+            "frame_number": frame_number,
+            "timestamp": timestamp,
+            "pose_detected": pose_detected
+        }
+        for column in ("com_x", "com_y", "com_height", "shooting_arc"):
+            values = time_series.get(column)
+            if values is not None and np.isfinite(values).any():
+                frame_columns[column] = np.asarray(values, dtype=float)
+        self.frames_df = pd.DataFrame(frame_columns)
+
+        # 创建角度数据表（仅包含检测到姿态的帧）
+        angles = time_series.get("angles", {})
+        if angles and pose_detected.any():
+            angle_columns = {
+                "frame_number": frame_number[pose_detected],
+                "timestamp": timestamp[pose_detected]
+            }
+            for angle_name, values in angles.items():
+                angle_columns[angle_name] = np.asarray(
+                    values, dtype=float)[pose_detected]
+            self.angles_df = pd.DataFrame(angle_columns)
+        else:
+            self.angles_df = pd.DataFrame()
 
         # 创建速度数据表
-        velocities_data = []
-        for frame in frames:
-            if frame.get("velocities"):
-                vel_row = {
-                    "frame_number": frame["frame_number"],
-                    "timestamp": frame["timestamp"]
-                }
-                for joint, velocity in frame["velocities"].items():
-                    vel_row[f"{joint}_velocity"] = velocity
-                velocities_data.append(vel_row)
-
-        self.velocities_df = pd.DataFrame(
-            velocities_data) if velocities_data else pd.DataFrame()
-
-        # 创建关键帧数据表
+        velocities = time_series.get("velocities", {})
+        if velocities and len(frame_number):
+            vel_columns = {
+                "frame_number": frame_number,
+                "timestamp": timestamp
+            }
+            for joint, values in velocities.items():
+                vel_columns[f"{joint}_velocity"] = np.asarray(
+                    values, dtype=float)
+            self.velocities_df = pd.DataFrame(vel_columns)
+        else:
+            self.velocities_df = pd.DataFrame()
+
+        # 创建关键帧数据表（关键帧数量很少，逐行构建即可）
         keyframes_data = []
         for kf_name, kf_info in keyframes.items():
             kf_row = {
@@ -95,8 +135,7 @@ class DataManager:
 
             # 添加该关键帧的角度信息
             if kf_info["frame_data"].get("angles"):
-                for angle_name, angle_value in kf_info["frame_data"]["angles"].items():
-                    kf_row[angle_name] = angle_value
+                kf_row.update(kf_info["frame_data"]["angles"])
 
             keyframes_data.append(kf_row)
 
@@ -110,49 +149,119 @@ class DataManager:
             "keyframes": self.keyframes_df
         }
 
+    @staticmethod
+    def series_from_frames(frames: List[Dict]) -> Dict:
+        """
+        单次遍历帧列表，收集列式时序数组
+
+        Args:
+            frames: 帧数据列表
+
+        Returns:
+            列式时序数据（结构同 create_dataframes_from_series 的输入）
+        """
+        n = len(frames)
+        frame_number = np.zeros(n, dtype=np.int64)
+        timestamp = np.zeros(n, dtype=float)
+        pose_detected = np.zeros(n, dtype=bool)
+        com_x = np.full(n, np.nan)
+        com_y = np.full(n, np.nan)
+        com_height = np.full(n, np.nan)
+        shooting_arc = np.full(n, np.nan)
+        angles: Dict[str, np.ndarray] = {}
+        velocities: Dict[str, np.ndarray] = {}
+
+        for i, frame in enumerate(frames):
+            frame_number[i] = frame["frame_number"]
+            timestamp[i] = frame["timestamp"]
+            pose_detected[i] = bool(frame.get("pose_detected"))
+
+            center_of_mass = frame.get("center_of_mass")
+            if center_of_mass:
+                com_x[i] = center_of_mass["x"]
+                com_y[i] = center_of_mass["y"]
+                com_height[i] = frame.get("com_height", 0)
+
+            if frame.get("shooting_arc") is not None:
+                shooting_arc[i] = frame["shooting_arc"]
+
+            for angle_name, value in (frame.get("angles") or {}).items():
+                if angle_name not in angles:
+                    angles[angle_name] = np.full(n, np.nan)
+                angles[angle_name][i] = np.nan if value is None else value
+
+            for joint, value in (frame.get("velocities") or {}).items():
+                if joint not in velocities:
+                    velocities[joint] = np.full(n, np.nan)
+                velocities[joint][i] = value
+
+        return {
+            "frame_number": frame_number,
+            "timestamp": timestamp,
+            "pose_detected": pose_detected,
+            "com_x": com_x,
+            "com_y": com_y,
+            "com_height": com_height,
+            "shooting_arc": shooting_arc,
+            "angles": angles,
+            "velocities": velocities
+        }
+
     def export_to_csv(self, output_dir: str):
         """
         导出数据到CSV文件
 
+        两阶段分析的精确阶段会覆盖预览阶段的文件，每个文件都原子替换。
+
         Args:
             output_dir: 输出目录
         """
         os.makedirs(output_dir, exist_ok=True)
 
         if self.frames_df is not None:
-            self.frames_df.to_csv(os.path.join(
-                output_dir, "frames.csv"), index=False)
+            _write_csv(self.frames_df, os.path.join(output_dir, "frames.csv"))
 
         if self.angles_df is not None and not self.angles_df.empty:
-            self.angles_df.to_csv(os.path.join(
-                output_dir, "angles.csv"), index=False)
+            _write_csv(self.angles_df, os.path.join(output_dir, "angles.csv"))
 
         if self.velocities_df is not None and not self.velocities_df.empty:
-            self.velocities_df.to_csv(os.path.join(
-                output_dir, "velocities.csv"), index=False)
+            _write_csv(self.velocities_df, os.path.join(output_dir, "velocities.csv"))
 
         if self.keyframes_df is not None and not self.keyframes_df.empty:
-            self.keyframes_df.to_csv(os.path.join(
-                output_dir, "keyframes.csv"), index=False)
+            _write_csv(self.keyframes_df, os.path.join(output_dir, "keyframes.csv"))
 
         print(f"✓ 数据已导出到 CSV: {output_dir}")
 
     def export_to_json(self, analysis_results: Dict, output_path: str):
         """
-        导出完整分析结果到JSON（用于HTML报表）
+        导出分析结果到JSON（每次分析唯一的规范数据文件）
+
+        帧数据只保存一份；关键帧只记录帧索引等少量字段，角度等逐帧数据
+        读取时通过 hydrate_keyframes 从 frames 中还原。不包含任何图像数据。
 
         Args:
             analysis_results: 分析结果字典
             output_path: 输出文件路径
         """
-        # 准备JSON数据（去除图像数据）
         json_data = {
+            "schema_version": ANALYSIS_SCHEMA_VERSION,
             "fps": analysis_results["fps"],
             "total_frames": analysis_results["total_frames"],
             "frames": [],
-            "keyframes": {}
+            "keyframes": {},
+            "rhythm_analysis": analysis_results.get("rhythm_analysis", {}),
+            "force_sequence": analysis_results.get("force_sequence", {}),
+            "energy_transfer": analysis_results.get("energy_transfer", {}),
+            "analysis_range": analysis_results.get("analysis_range", {})
         }
 
+        # 关节点像素坐标所在的帧尺寸（从已保存的关节点重算指标时用于还原归一化坐标）
+        for frame in analysis_results["frames"]:
+            pose_result = frame.get("pose_result")
+            if frame.get("pose_detected") and pose_result:
+                json_data["frame_size"] = [pose_result["image_width"], pose_result["image_height"]]
+                break
+
         # 处理帧数据
         for frame in analysis_results["frames"]:
             frame_json = {
@@ -178,26 +287,88 @@ class DataManager:
 
             json_data["frames"].append(frame_json)
 
-        # 处理关键帧数据
+        # 处理关键帧数据（按帧索引引用，不重复保存帧内容）
         for kf_name, kf_info in analysis_results.get("keyframes", {}).items():
             json_data["keyframes"][kf_name] = {
                 "index": kf_info["index"],
                 "description": kf_info.get("description", ""),
                 "timestamp": kf_info["frame_data"]["timestamp"],
-                "angles": kf_info["frame_data"].get("angles", {}),
-                "image_path": kf_info.get("image_path", "")
+                "image_path": kf_info.get("image_path", ""),
+                "filename": kf_info.get("filename", "")
             }
 
-        # 写入JSON文件
+            # 精细化的关键帧不在粗采样帧序列中，单独保存其帧号和角度
+            if kf_info.get("refined"):
+                json_data["keyframes"][kf_name].update({
+                    "refined": True,
+                    "frame_number": kf_info["frame_data"]["frame_number"],
+                    "angles": kf_info["frame_data"].get("angles", {})
+                })
+
+        # 写入JSON文件（先写临时文件再替换：两阶段分析覆盖预览结果时，读取方只会看到完整的旧文件或新文件）
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
+        tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(json_data, f, ensure_ascii=False,
+                      separators=(',', ':'), default=_json_default)
+        os.replace(tmp_path, output_path)
 
         print(f"✓ 分析数据已导出到 JSON: {output_path}")
 
+    @staticmethod
+    def load_analysis_json(json_path: str) -> Dict:
+        """
+        读取分析数据JSON，并还原关键帧的逐帧字段
+
+        Args:
+            json_path: analysis_data.json 路径
+
+        Returns:
+            分析数据字典
+        """
+        with open(json_path, 'r', encoding='utf-8') as f:
+            json_data = json.load(f)
+
+        return DataManager.hydrate_keyframes(json_data)
+
+    @staticmethod
+    def hydrate_keyframes(json_data: Dict) -> Dict:
+        """
+        按帧索引为关键帧补全 timestamp、angles 和 frame_data
+
+        兼容旧格式（关键帧中已包含 angles）的数据文件。
+
+        Args:
+            json_data: export_to_json 写出的数据
+
+        Returns:
+            补全后的数据（原地修改）
+        """
+        frames = json_data.get("frames", [])
+
+        for kf_info in json_data.get("keyframes", {}).values():
+            index = kf_info.get("index")
+            if not isinstance(index, int) or not 0 <= index < len(frames):
+                continue
+
+            frame = frames[index]
+            if kf_info.get("refined"):
+                # 精细化的关键帧：以最近的粗采样帧为基础，覆盖为自身的帧号、时间和角度
+                frame = {
+                    **frame,
+                    "frame_number": kf_info.get("frame_number", frame.get("frame_number")),
+                    "timestamp": kf_info.get("timestamp", frame.get("timestamp", 0)),
+                    "angles": kf_info.get("angles", frame.get("angles", {}))
+                }
+            kf_info.setdefault("timestamp", frame.get("timestamp", 0))
+            kf_info.setdefault("angles", frame.get("angles", {}))
+            kf_info.setdefault("frame_data", frame)
+
+        return json_data
+
     def get_summary_statistics(self) -> Dict:
         """
-        获取数据统计摘要
+        获取数据统计摘要（按列一次性向量化聚合）
 
         Returns:
             统计摘要字典
@@ -205,27 +376,22 @@ class DataManager:
         summary = {}
 
         if self.angles_df is not None and not self.angles_df.empty:
-            summary["angles"] = {}
             angle_columns = [col for col in self.angles_df.columns
                              if col not in ["frame_number", "timestamp"]]
-
-            for col in angle_columns:
-                summary["angles"][col] = {
-                    "mean": float(self.angles_df[col].mean()),
-                    "std": float(self.angles_df[col].std()),
-                    "min": float(self.angles_df[col].min()),
-                    "max": float(self.angles_df[col].max())
-                }
+            stats = self.angles_df[angle_columns].agg(
+                ["mean", "std", "min", "max"])
+            summary["angles"] = {
+                col: {stat: float(value) for stat, value in values.items()}
+                for col, values in stats.to_dict().items()
+            }
 
         if self.velocities_df is not None and not self.velocities_df.empty:
-            summary["velocities"] = {}
             vel_columns = [col for col in self.velocities_df.columns
                            if col not in ["frame_number", "timestamp"]]
-
-            for col in vel_columns:
-                summary["velocities"][col] = {
-                    "mean": float(self.velocities_df[col].mean()),
-                    "max": float(self.velocities_df[col].max())
-                }
+            stats = self.velocities_df[vel_columns].agg(["mean", "max"])
+            summary["velocities"] = {
+                col: {stat: float(value) for stat, value in values.items()}
+                for col, values in stats.to_dict().items()
+            }
 
         return summary
@@ -0,0 +1,156 @@
+"""
+阶段性能记录模块
+按阶段记录墙钟时间、CPU 时间、内存和处理数量，开销只有每个阶段几次系统调用，可在生产环境常开
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前进程常驻内存（MB），不支持的系统返回 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程启动以来的峰值常驻内存（MB），不支持的系统返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    divisor = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+    return peak / divisor
+
+
+class StageRecord:
+    """单个阶段的测量结果（阶段内可通过 items 记录处理数量）"""
+
+    __slots__ = ("name", "wall_time", "cpu_time", "process_cpu_time",
+                 "rss_mb", "peak_rss_mb", "items", "calls")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.process_cpu_time = 0.0
+        self.rss_mb = None
+        self.peak_rss_mb = None
+        self.items = None
+        self.calls = 0
+
+    def to_dict(self) -> Dict:
+        """转换为可序列化的字典"""
+        return {
+            "wall_time": round(self.wall_time, 4),
+            "cpu_time": round(self.cpu_time, 4),
+            "process_cpu_time": round(self.process_cpu_time, 4),
+            "rss_mb": round(self.rss_mb, 1) if self.rss_mb is not None else None,
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            "items": self.items,
+            "calls": self.calls
+        }
+
+
+class StageProfiler:
+    """
+    分阶段性能记录器（每个任务一个实例）
+
+    - wall_time: 墙钟时间（秒）
+    - cpu_time: 当前线程的 CPU 时间，并发任务互不干扰
+    - process_cpu_time: 整个进程的 CPU 时间（包含 MediaPipe 等库的内部线程，并发时包含其他任务）
+    - rss_mb / peak_rss_mb: 阶段结束时的常驻内存和进程峰值内存
+    - items: 阶段处理的数量（帧数、关键帧数等）
+
+    同名阶段多次进入时累加时间和数量。
+
+    示例：
+        profiler = StageProfiler()
+        with profiler.stage("decode") as stage:
+            frames = extract()
+            stage.items = len(frames)
+        profiler.summary()
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, StageRecord] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, items: Optional[int] = None) -> Iterator[StageRecord]:
+        """
+        测量一个阶段
+
+        Args:
+            name: 阶段名称
+            items: 处理数量（也可在阶段内设置 record.items）
+
+        Yields:
+            阶段记录
+        """
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = StageRecord(name)
+        previous_items = record.items
+        record.items = None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        process_cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_time += time.perf_counter() - wall_start
+            record.cpu_time += time.thread_time() - cpu_start
+            record.process_cpu_time += time.process_time() - process_cpu_start
+            record.rss_mb = current_rss_mb()
+            record.peak_rss_mb = peak_rss_mb()
+            record.calls += 1
+
+            if record.items is None:
+                record.items = items
+            if previous_items is not None:
+                record.items = previous_items + (record.items or 0)
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        汇总各阶段测量结果
+
+        Returns:
+            {阶段名: 测量字典, ..., "total": {wall_time, peak_rss_mb}}，按首次进入的顺序排列
+        """
+        result = {name: record.to_dict() for name, record in self.stages.items()}
+        peak = peak_rss_mb()
+        result["total"] = {
+            "wall_time": round(time.perf_counter() - self._started, 4),
+            "peak_rss_mb": round(peak, 1) if peak is not None else None
+        }
+        return result
+
+
+class _NullStage:
+    """未启用性能记录时使用的空阶段"""
+
+    items = None
+
+
+@contextmanager
+def maybe_stage(profiler: Optional[StageProfiler], name: str,
+                items: Optional[int] = None) -> Iterator:
+    """profiler 为 None 时不做任何测量的 stage 包装"""
+    if profiler is None:
+        yield _NullStage()
+    else:
+        with profiler.stage(name, items) as record:
+            yield record
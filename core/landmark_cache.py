@@ -0,0 +1,269 @@
+"""
+关节点缓存模块
+按视频内容哈希、采样参数和 MediaPipe 配置持久化逐帧姿态检测结果，
+调整下游算法（关键帧阈值、角度指标、评分权重等）后重新分析时无需再次解码和推理
+"""
+import os
+import json
+import hashlib
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import CACHE_DIR, MEDIAPIPE_POSE_LANDMARKS
+from core.asset_store import compute_file_hash
+from core.metrics import cache_lookups
+
+# 默认缓存目录
+LANDMARK_CACHE_DIR = os.path.join(CACHE_DIR, "landmarks")
+
+# 缓存格式版本（存储结构或检测结果含义变化时递增，旧缓存自动失效）
+LANDMARK_CACHE_VERSION = 1
+
+# 每个关节点保存的分量: x, y, z, visibility
+_LANDMARK_FIELDS = 4
+_LANDMARK_COUNT = max(MEDIAPIPE_POSE_LANDMARKS.values()) + 1
+
+
+class LandmarkCache:
+    """按视频和检测参数寻址的关节点缓存（每个键一个压缩 .npz 文件）"""
+
+    def __init__(self, root_dir: str = LANDMARK_CACHE_DIR):
+        """
+        初始化关节点缓存
+
+        Args:
+            root_dir: 缓存根目录
+        """
+        self.root_dir = os.path.abspath(root_dir)
+
+    @staticmethod
+    def make_key(video_path: str, config: Dict, frame_interval: int,
+                 adaptive: bool = False) -> str:
+        """
+        计算缓存键：视频内容哈希 + 帧采样参数 + 推理分辨率 + MediaPipe 配置（或其他姿态检测后端及其参数）
+
+        Args:
+            video_path: 视频文件路径
+            config: 分析配置（读取 max_inference_dimension、adaptive_sampling、mediapipe）
+            frame_interval: 帧间隔
+            adaptive: 是否运动自适应采样
+
+        Returns:
+            十六进制缓存键
+        """
+        sampling_config = config.get("adaptive_sampling", {})
+        key_data = {
+            "version": LANDMARK_CACHE_VERSION,
+            "video": compute_file_hash(video_path),
+            "frame_interval": frame_interval,
+            "adaptive": bool(adaptive),
+            "min_interval": sampling_config.get("min_frame_interval", 1) if adaptive else None,
+            "max_interval": sampling_config.get("max_frame_interval") if adaptive else None,
+            "max_inference_dimension": config.get("max_inference_dimension"),
+            "mediapipe": config.get("mediapipe", {})
+        }
+        # 非默认后端的结果与 MediaPipe 不同，单独寻址（默认后端不加该字段，已有缓存保持有效）
+        backend = config.get("pose_backend", "mediapipe")
+        if backend != "mediapipe":
+            key_data["pose_backend"] = {"name": backend,
+                                        "options": config.get("pose_backend_options", {})}
+        encoded = json.dumps(key_data, sort_keys=True, ensure_ascii=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key[:2], f"{key}.npz")
+
+    def contains(self, key: str) -> bool:
+        """是否已有该键的缓存（不读取内容）"""
+        return os.path.exists(self._path(key))
+
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        读取缓存的检测结果
+
+        返回的帧不含图像，带有 cached_pose 字段（检测结果或 None），
+        BasketballShotAnalyzer 遇到该字段时直接使用而不再推理。
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            {"frames": 采样帧列表, "dense_frames": 帧号 -> 精细化用的逐帧信息}；
+            未命中或文件损坏时返回 None
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            cache_lookups.labels("landmark", "miss").inc()
+            return None
+
+        try:
+            with np.load(path) as data:
+                frame_numbers = data["frame_number"]
+                timestamps = data["timestamp"]
+                sampled = data["sampled"]
+                detected = data["detected"]
+                landmarks = data["landmarks"]
+                image_width, image_height = (int(v) for v in data["image_size"])
+                downscaled = bool(data["downscaled"])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️ 关节点缓存读取失败，将重新检测: {e}")
+            cache_lookups.labels("landmark", "miss").inc()
+            return None
+
+        cache_lookups.labels("landmark", "hit").inc()
+
+        frames = []
+        dense_frames = {}
+        for i in range(len(frame_numbers)):
+            frame_info = self._build_frame_info(
+                int(frame_numbers[i]), float(timestamps[i]),
+                landmarks[i] if detected[i] else None,
+                image_width, image_height, downscaled)
+            if sampled[i]:
+                frames.append(frame_info)
+            else:
+                dense_frames[frame_info["frame_number"]] = frame_info
+
+        return {"frames": frames, "dense_frames": dense_frames}
+
+    def save(self, key: str, frames_data: List[Dict],
+             dense_frames: Optional[List[Dict]] = None,
+             previous: Optional[Dict] = None) -> bool:
+        """
+        保存检测结果（原子写入，覆盖同键的旧缓存）
+
+        Args:
+            key: 缓存键
+            frames_data: 已分析的采样帧（BasketballShotAnalyzer.frames_data）
+            dense_frames: 关键帧精细化时额外检测的逐帧结果
+            previous: 本次分析读取的缓存（load 的返回值）；其中的逐帧结果会被保留，
+                没有新增检测结果时不重写文件
+
+        Returns:
+            是否写入了缓存文件
+        """
+        dense_by_number = dict(previous["dense_frames"]) if previous else {}
+        new_dense = [frame for frame in (dense_frames or [])
+                     if frame["frame_number"] not in dense_by_number]
+        if previous and not new_dense:
+            return False
+        for frame in new_dense:
+            dense_by_number[frame["frame_number"]] = frame
+
+        records = [(frame, True) for frame in frames_data]
+        records += [(dense_by_number[n], False) for n in sorted(dense_by_number)]
+        if not records:
+            return False
+
+        count = len(records)
+        frame_number = np.zeros(count, dtype=np.int64)
+        timestamp = np.zeros(count, dtype=np.float64)
+        sampled = np.zeros(count, dtype=bool)
+        detected = np.zeros(count, dtype=bool)
+        landmarks = np.full((count, _LANDMARK_COUNT, _LANDMARK_FIELDS), np.nan, dtype=np.float32)
+        image_size = (0, 0)
+        downscaled = False
+
+        for i, (frame, is_sampled) in enumerate(records):
+            frame_number[i] = frame["frame_number"]
+            timestamp[i] = frame["timestamp"]
+            sampled[i] = is_sampled
+            downscaled = downscaled or "original_size" in frame
+
+            if "cached_pose" in frame:
+                pose_result = frame["cached_pose"]
+            else:
+                pose_result = frame.get("pose_result") if frame.get("pose_detected") else None
+            if not pose_result:
+                continue
+
+            detected[i] = True
+            image_size = (pose_result["image_width"], pose_result["image_height"])
+            for name, idx in MEDIAPIPE_POSE_LANDMARKS.items():
+                landmark = pose_result["landmarks"].get(name)
+                if landmark:
+                    landmarks[i, idx] = (landmark["x"], landmark["y"],
+                                         landmark["z"], landmark["visibility"])
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            frame_number=frame_number,
+            timestamp=timestamp,
+            sampled=sampled,
+            detected=detected,
+            landmarks=landmarks,
+            image_size=np.asarray(image_size, dtype=np.int64),
+            downscaled=np.asarray(downscaled)
+        )
+        os.replace(tmp_path, path)
+        return True
+
+    def clear(self) -> int:
+        """
+        删除全部缓存文件
+
+        Returns:
+            删除的文件数
+        """
+        removed = 0
+        if not os.path.isdir(self.root_dir):
+            return removed
+        for root, _, files in os.walk(self.root_dir):
+            for filename in files:
+                if filename.endswith(".npz"):
+                    os.remove(os.path.join(root, filename))
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _build_frame_info(frame_number: int, timestamp: float,
+                          landmark_array: Optional[np.ndarray],
+                          image_width: int, image_height: int,
+                          downscaled: bool) -> Dict:
+        """由缓存数组还原帧信息和检测结果（字段与 PoseDetector 输出一致）"""
+        frame_info = {
+            "frame_number": frame_number,
+            "timestamp": timestamp,
+            "timestamp_formatted": f"{int(timestamp // 60):02d}:{timestamp % 60:06.3f}",
+            "cached_pose": None
+        }
+        if downscaled:
+            frame_info["original_size"] = (image_width, image_height)
+
+        if landmark_array is None:
+            return frame_info
+
+        landmarks = {}
+        for name, idx in MEDIAPIPE_POSE_LANDMARKS.items():
+            x, y, z, visibility = (float(v) for v in landmark_array[idx])
+            landmarks[name] = {
+                "x": x,
+                "y": y,
+                "z": z,
+                "visibility": visibility,
+                "x_pixel": int(x * image_width),
+                "y_pixel": int(y * image_height)
+            }
+
+        frame_info["cached_pose"] = {
+            "landmarks": landmarks,
+            "image_width": image_width,
+            "image_height": image_height
+        }
+        return frame_info
+
+
+_default_cache: Optional[LandmarkCache] = None
+
+
+def get_landmark_cache() -> LandmarkCache:
+    """获取默认的关节点缓存"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LandmarkCache()
+    return _default_cache
@@ -0,0 +1,348 @@
+"""
+运行指标模块
+进程内计数器、仪表和直方图，按 Prometheus 文本格式导出
+
+计数写入当前线程自己的分片，热路径不加锁（只有线程第一次写入某个指标时登记分片）；
+导出时汇总各分片，已结束线程的分片合并到基数后释放，每个任务一个线程也不会无限增长。
+
+多进程部署时可设置跨进程汇总（MetricsRegistry.set_aggregator）：计数器和直方图导出
+全部进程的合计值，仪表仍由回调读取。
+"""
+import json
+import math
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 默认耗时分桶（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class _ShardedValues:
+    """按线程分片的一组累加值（每个线程只写自己的分片）"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * size
+
+    def shard(self) -> List[float]:
+        """当前线程的分片"""
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = [0.0] * self.size
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            self._local.values = values
+        return values
+
+    def snapshot(self) -> List[float]:
+        """汇总全部分片（顺带合并已结束线程的分片）"""
+        with self._lock:
+            totals = list(self._retired)
+            alive = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, values))
+                else:
+                    for i, value in enumerate(values):
+                        self._retired[i] += value
+                for i, value in enumerate(values):
+                    totals[i] += value
+            self._shards = alive
+        return totals
+
+
+class _CounterChild:
+    """单组标签的计数器"""
+
+    def __init__(self):
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1):
+        """增加计数（amount 必须非负）"""
+        self._values.shard()[0] += amount
+
+    def samples(self, name: str) -> List[Tuple[str, Dict[str, str], float]]:
+        return [(name, {}, self._values.snapshot()[0])]
+
+
+class _HistogramChild:
+    """单组标签的直方图（各桶计数、总数、总和）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # 布局: 各桶计数..., 总数, 总和
+        self._values = _ShardedValues(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        """记录一次观测值"""
+        values = self._values.shard()
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            values[index] += 1
+        values[-2] += 1
+        values[-1] += value
+
+    def samples(self, name: str) -> List[Tuple[str, Dict[str, str], float]]:
+        values = self._values.snapshot()
+        result = []
+        cumulative = 0.0
+        for bound, count in zip(self.buckets, values):
+            cumulative += count
+            result.append((f"{name}_bucket", {"le": _format_value(bound)}, cumulative))
+        result.append((f"{name}_bucket", {"le": "+Inf"}, values[-2]))
+        result.append((f"{name}_count", {}, values[-2]))
+        result.append((f"{name}_sum", {}, values[-1]))
+        return result
+
+
+class _Metric:
+    """带标签的指标（每组标签值一个子指标）"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """
+        获取一组标签值对应的子指标
+
+        Args:
+            values / kwargs: 按位置或名称给出的标签值
+
+        Returns:
+            子指标
+        """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+        key = tuple(str(value) for value in values)
+
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """导出全部样本 [(样本名, 标签, 值), ...]"""
+        samples = []
+        for key, child in list(self._children.items()):
+            base_labels = dict(zip(self.labelnames, key))
+            for sample_name, labels, value in child.samples(self.name):
+                samples.append((sample_name, {**base_labels, **labels}, value))
+        return samples
+
+    def sample_names(self) -> Tuple[str, ...]:
+        """导出的样本名（按输出顺序）"""
+        return (self.name,)
+
+    def samples_from(self, totals: Dict[Tuple[str, str], float]) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        从跨进程合计中取出本指标的样本
+
+        Args:
+            totals: {(样本名, 标签JSON): 值}
+
+        Returns:
+            样本列表（同 collect，按标签和样本名排序）
+        """
+        names = self.sample_names()
+        samples = [(sample_name, json.loads(labels), value)
+                   for (sample_name, labels), value in totals.items() if sample_name in names]
+
+        def order(sample):
+            sample_name, labels, _ = sample
+            base = json.dumps({k: v for k, v in labels.items() if k != "le"})
+            le = labels.get("le")
+            return (base, names.index(sample_name),
+                    math.inf if le in (None, "+Inf") else float(le))
+
+        return sorted(samples, key=order)
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        """增加计数（无标签指标）"""
+        self.labels().inc(amount)
+
+
+class Histogram(_Metric):
+    """直方图"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def sample_names(self) -> Tuple[str, ...]:
+        return (f"{self.name}_bucket", f"{self.name}_count", f"{self.name}_sum")
+
+    def observe(self, value: float):
+        """记录一次观测值（无标签指标）"""
+        self.labels().observe(value)
+
+
+class Gauge(_Metric):
+    """
+    回调式仪表：导出时调用函数读取当前值
+
+    回调返回数值（无标签），或 {标签值元组: 数值} 字典（有标签）。
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> List[Tuple[str, Dict[str, str], float]]:
+        if self.callback is None:
+            return []
+        value = self.callback()
+        if not self.labelnames:
+            return [(self.name, {}, value)]
+        return [(self.name, dict(zip(self.labelnames, (str(v) for v in key))), item)
+                for key, item in value.items()]
+
+
+class MetricsRegistry:
+    """指标注册表（同名指标只注册一次，模块重复导入时返回已有指标）"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._aggregator: Optional[Callable[[Dict], Dict]] = None
+
+    def set_aggregator(self, aggregator: Optional[Callable[[Dict], Dict]]):
+        """
+        设置跨进程汇总
+
+        Args:
+            aggregator: aggregator(local) 接收本进程计数器和直方图的累计样本
+                {(样本名, 标签JSON): 值}，返回全部进程的合计（结构相同）；None 表示只导出本进程
+        """
+        self._aggregator = aggregator
+
+    def local_samples(self) -> Dict[Tuple[str, str], float]:
+        """本进程计数器和直方图的累计样本 {(样本名, 标签JSON): 值}"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        samples = {}
+        for metric in metrics:
+            if isinstance(metric, (Counter, Histogram)):
+                for sample_name, labels, value in metric.collect():
+                    samples[(sample_name, json.dumps(labels))] = value
+        return samples
+
+    def register(self, metric: _Metric) -> _Metric:
+        """注册指标，已存在同名指标时返回已有的"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def render(self) -> str:
+        """
+        按 Prometheus 文本格式（0.0.4）导出全部指标
+
+        Returns:
+            文本内容
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        totals = None
+        if self._aggregator is not None:
+            try:
+                totals = self._aggregator(self.local_samples())
+            except Exception as e:
+                lines.append(f"# 跨进程汇总失败，以下计数只包含本进程: {e}")
+
+        for metric in metrics:
+            try:
+                if totals is not None and isinstance(metric, (Counter, Histogram)):
+                    samples = metric.samples_from(totals)
+                else:
+                    samples = metric.collect()
+            except Exception as e:
+                # 单个回调失败不影响其他指标
+                lines.append(f"# {metric.name} 采集失败: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+# 缓存命中率（cache: landmark 关节点缓存 / asset 共享资源存储；result: hit / miss）
+cache_lookups = registry.counter(
+    "aimotionmind_cache_lookups_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"])
@@ -0,0 +1,431 @@
+"""
+姿态检测后端
+统一的后端接口和注册表，分析器按配置中的 pose_backend 名称创建后端：
+
+- mediapipe: MediaPipe Pose（core.pose_detector.PoseDetector，首次使用时才导入 mediapipe）
+- replay: 回放已保存的关节点（关节点缓存、分析数据文件还原的帧），按帧号返回
+- synthetic: 按时间生成确定性的投篮动作关节点，不需要图像，可脱离视频解码和推理
+  单独压测下游阶段（指标、关键帧、节奏、发力顺序）
+
+检测结果字段与 PoseDetector.detect 一致：{landmarks, image_width, image_height}。
+"""
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import MEDIAPIPE_POSE_LANDMARKS
+
+# 后端名称 -> 工厂函数 factory(config) -> PoseBackend
+_POSE_BACKENDS: Dict[str, Callable[[Dict], "PoseBackend"]] = {}
+
+# 默认后端
+DEFAULT_POSE_BACKEND = "mediapipe"
+
+
+class PoseBackend:
+    """姿态检测后端基类"""
+
+    name = ""
+
+    def detect(self, image: Optional[np.ndarray],
+               original_size: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
+        """
+        检测单张图像
+
+        Args:
+            image: BGR 图像（不需要图像的后端可为 None）
+            original_size: 图像为缩小后的推理帧时，原视频的 (宽, 高)
+
+        Returns:
+            检测结果字典；未检测到时返回 None
+        """
+        raise NotImplementedError
+
+    def detect_frame(self, frame_info: Dict) -> Optional[Dict]:
+        """
+        检测一帧（VideoProcessor 输出的帧信息，回放和合成后端使用其中的帧号和时间戳）
+
+        Args:
+            frame_info: 帧信息字典
+
+        Returns:
+            检测结果字典；未检测到时返回 None
+        """
+        return self.detect(frame_info.get("image"), frame_info.get("original_size"))
+
+    def reset(self):
+        """清除帧间状态（处理不连续的帧之前调用）"""
+
+    def close(self):
+        """释放资源"""
+
+
+def register_pose_backend(name: str):
+    """
+    注册姿态检测后端的装饰器
+
+    示例：
+        @register_pose_backend("my_backend")
+        def _create_my_backend(config):
+            return MyBackend(**config.get("pose_backend_options", {}))
+    """
+    def decorator(factory: Callable[[Dict], PoseBackend]):
+        _POSE_BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def available_pose_backends() -> List[str]:
+    """已注册的后端名称"""
+    return sorted(_POSE_BACKENDS)
+
+
+def create_pose_backend(config: Dict, name: Optional[str] = None) -> PoseBackend:
+    """
+    按配置创建姿态检测后端
+
+    Args:
+        config: 分析配置（pose_backend 为后端名称，mediapipe 读取 mediapipe 配置，
+            其他后端读取 pose_backend_options）
+        name: 后端名称，默认取 config["pose_backend"]
+
+    Returns:
+        后端实例
+
+    Raises:
+        ValueError: 未知的后端名称
+    """
+    name = name or config.get("pose_backend", DEFAULT_POSE_BACKEND)
+    if name not in _POSE_BACKENDS:
+        raise ValueError(
+            f"未知的姿态检测后端: {name}（可选: {', '.join(available_pose_backends())}）")
+    return _POSE_BACKENDS[name](config)
+
+
+@register_pose_backend("mediapipe")
+def _create_mediapipe_backend(config: Dict) -> PoseBackend:
+    from core.pose_detector import PoseDetector
+    return PoseDetector(**config.get("mediapipe", {}))
+
+
+class ReplayPoseBackend(PoseBackend):
+    """按帧号回放已保存的关节点（帧号不在记录中时视为未检测到）"""
+
+    name = "replay"
+
+    def __init__(self, poses: Dict[int, Optional[Dict]]):
+        """
+        初始化回放后端
+
+        Args:
+            poses: 帧号 -> 检测结果（None 表示该帧未检测到）
+        """
+        self.poses = poses
+
+    @classmethod
+    def from_frames(cls, frames: Iterable[Dict]) -> "ReplayPoseBackend":
+        """
+        由带 cached_pose 的帧创建（LandmarkCache.load 或
+        reprocessor.frames_from_analysis_data 的结果）
+        """
+        return cls({frame["frame_number"]: frame.get("cached_pose") for frame in frames})
+
+    @classmethod
+    def from_landmark_cache(cls, key: str, cache=None) -> "ReplayPoseBackend":
+        """
+        由关节点缓存创建（包含采样帧和精细化时检测的逐帧结果）
+
+        Raises:
+            KeyError: 缓存不存在
+        """
+        from core.landmark_cache import get_landmark_cache
+        cached = (cache or get_landmark_cache()).load(key)
+        if cached is None:
+            raise KeyError(f"关节点缓存不存在: {key}")
+        return cls.from_frames(list(cached["frames"]) + list(cached["dense_frames"].values()))
+
+    def detect(self, image, original_size=None) -> Optional[Dict]:
+        raise ValueError("回放后端按帧号返回结果，请使用 detect_frame")
+
+    def detect_frame(self, frame_info: Dict) -> Optional[Dict]:
+        return self.poses.get(frame_info["frame_number"])
+
+
+@register_pose_backend("replay")
+def _create_replay_backend(config: Dict) -> PoseBackend:
+    options = config.get("pose_backend_options", {})
+    if options.get("landmark_cache_key"):
+        return ReplayPoseBackend.from_landmark_cache(options["landmark_cache_key"])
+    if options.get("frames") is not None:
+        return ReplayPoseBackend.from_frames(options["frames"])
+    raise ValueError("replay 后端需要 pose_backend_options.landmark_cache_key 或 frames")
+
+
+# ---------------------------------------------------------------------------
+# 合成投篮动作
+# ---------------------------------------------------------------------------
+
+# 一次投篮动作的默认时长（秒）
+SHOT_PERIOD = 2.0
+
+# 站立姿态的关节点（归一化坐标，人物面向镜头，画面右侧为人物右手）
+_STANCE = {
+    "nose": (0.50, 0.22),
+    "left_shoulder": (0.45, 0.32), "right_shoulder": (0.55, 0.32),
+    "left_hip": (0.46, 0.55), "right_hip": (0.54, 0.55),
+    "left_knee": (0.46, 0.70), "right_knee": (0.54, 0.70),
+    "left_ankle": (0.46, 0.86), "right_ankle": (0.54, 0.86),
+}
+
+
+def _smooth(u: float) -> float:
+    """0-1 区间的平滑插值"""
+    u = min(max(u, 0.0), 1.0)
+    return u * u * (3 - 2 * u)
+
+
+def _lerp(a: Tuple[float, float], b: Tuple[float, float], u: float) -> Tuple[float, float]:
+    return a[0] + (b[0] - a[0]) * u, a[1] + (b[1] - a[1]) * u
+
+
+def shot_phase(t: float, period: float = SHOT_PERIOD) -> Tuple[float, Tuple[float, float], bool]:
+    """
+    合成投篮动作在时刻 t 的状态（动作按 period 循环）
+
+    Returns:
+        (下蹲深度 0-1, 右手腕相对右肩的偏移, 球是否仍在手中)
+    """
+    u = (t % period) / period
+    chest, waist = (-0.03, 0.10), (-0.02, 0.20)
+    forehead, release = (0.00, -0.12), (0.02, -0.24)
+
+    if u < 0.25:  # 持球下蹲，球降到腰部
+        k = _smooth(u / 0.25)
+        return k, _lerp(chest, waist, k), True
+    if u < 0.50:  # 蹬伸，球举到额前
+        k = _smooth((u - 0.25) / 0.25)
+        return 1 - k, _lerp(waist, forehead, k), True
+    if u < 0.62:  # 伸臂出手
+        k = _smooth((u - 0.50) / 0.12)
+        return 0.0, _lerp(forehead, release, k), k < 0.8
+    if u < 0.80:  # 跟随动作
+        return 0.0, release, False
+    k = _smooth((u - 0.80) / 0.20)  # 还原到胸前持球
+    return 0.0, _lerp(release, chest, k), k > 0.9
+
+
+def synthetic_pose(t: float, width: int, height: int, period: float = SHOT_PERIOD,
+                   jitter: float = 0.0, rng: Optional[random.Random] = None) -> Dict:
+    """
+    合成投篮动作在时刻 t 的关节点
+
+    Args:
+        t: 时间（秒）
+        width: 画面宽度（像素坐标换算用）
+        height: 画面高度
+        period: 一次投篮动作的时长（秒）
+        jitter: 关节点随机抖动的标准差（归一化坐标），模拟检测噪声
+        rng: 抖动使用的随机数生成器
+
+    Returns:
+        检测结果字典 {landmarks, image_width, image_height}
+    """
+    squat, wrist_offset, _ = shot_phase(t, period)
+    drop = 0.06 * squat
+
+    points = {}
+    for name, (x, y) in _STANCE.items():
+        if "ankle" in name:
+            points[name] = (x, y)
+        elif "knee" in name:
+            # 下蹲时膝盖前移（画面中表现为向外），髋部下降
+            points[name] = (x + (0.04 if name.startswith("right") else -0.04) * squat, y + drop * 0.4)
+        else:
+            points[name] = (x, y + drop)
+
+    # 左臂自然下垂；右臂由手腕位置反推肘部（肘部在肩和腕之间并向外侧弯曲）
+    left_shoulder, right_shoulder = points["left_shoulder"], points["right_shoulder"]
+    points["left_elbow"] = (left_shoulder[0] - 0.02, left_shoulder[1] + 0.11)
+    points["left_wrist"] = (left_shoulder[0] - 0.02, left_shoulder[1] + 0.21)
+    right_wrist = (right_shoulder[0] + wrist_offset[0], right_shoulder[1] + wrist_offset[1])
+    bend = 0.05 * (1 - _smooth(-wrist_offset[1] / 0.24))
+    points["right_wrist"] = right_wrist
+    points["right_elbow"] = ((right_shoulder[0] + right_wrist[0]) / 2 + bend,
+                             (right_shoulder[1] + right_wrist[1]) / 2)
+
+    if jitter > 0 and rng is not None:
+        points = {name: (x + rng.gauss(0, jitter), y + rng.gauss(0, jitter))
+                  for name, (x, y) in points.items()}
+
+    landmarks = {}
+    nose = points["nose"]
+    for name in MEDIAPIPE_POSE_LANDMARKS:
+        if name in points:
+            x, y = points[name]
+        elif name.startswith(("left_eye", "right_eye", "left_ear", "right_ear", "mouth")):
+            x, y = nose
+        else:
+            # 手指、脚跟、脚尖取所属的手腕或脚踝
+            side = "left" if name.startswith("left") else "right"
+            x, y = points[f"{side}_wrist" if name.split("_")[1] in ("pinky", "index", "thumb")
+                          else f"{side}_ankle"]
+        landmarks[name] = {
+            "x": x,
+            "y": y,
+            "z": 0.0,
+            "visibility": 1.0,
+            "x_pixel": int(x * width),
+            "y_pixel": int(y * height)
+        }
+
+    return {"landmarks": landmarks, "image_width": width, "image_height": height}
+
+
+class SyntheticPoseBackend(PoseBackend):
+    """按帧时间戳生成确定性的投篮动作关节点（不读取图像）"""
+
+    name = "synthetic"
+
+    def __init__(self, width: int = 1280, height: int = 720, period: float = SHOT_PERIOD,
+                 jitter: float = 0.0, seed: int = 0):
+        """
+        初始化合成后端
+
+        Args:
+            width: 帧不含图像和原视频尺寸时使用的画面宽度
+            height: 同上，画面高度
+            period: 一次投篮动作的时长（秒）
+            jitter: 关节点随机抖动的标准差（归一化坐标），同一帧号每次结果相同
+            seed: 抖动的随机种子
+        """
+        self.width = width
+        self.height = height
+        self.period = period
+        self.jitter = jitter
+        self.seed = seed
+
+    def detect(self, image, original_size=None) -> Optional[Dict]:
+        raise ValueError("合成后端按时间戳生成结果，请使用 detect_frame")
+
+    def detect_frame(self, frame_info: Dict) -> Optional[Dict]:
+        width, height = self.width, self.height
+        if frame_info.get("original_size"):
+            width, height = frame_info["original_size"]
+        elif frame_info.get("image") is not None:
+            height, width = frame_info["image"].shape[:2]
+
+        rng = random.Random(self.seed * 1_000_003 + frame_info["frame_number"]) if self.jitter else None
+        return synthetic_pose(frame_info["timestamp"], width, height,
+                              self.period, self.jitter, rng)
+
+    def generate_frames(self, fps: float, duration: float, frame_interval: int = 1) -> List[Dict]:
+        """
+        生成不含图像的帧信息（可直接传给 BasketballShotAnalyzer.analyze_frames，不需要视频）
+
+        Args:
+            fps: 模拟的视频帧率
+            duration: 模拟的视频时长（秒）
+            frame_interval: 采样间隔
+
+        Returns:
+            帧信息列表（帧号、时间戳和原视频尺寸）
+        """
+        frames = []
+        for frame_number in range(0, int(round(fps * duration)), max(1, frame_interval)):
+            timestamp = frame_number / fps
+            frames.append({
+                "frame_number": frame_number,
+                "timestamp": timestamp,
+                "timestamp_formatted": f"{int(timestamp // 60):02d}:{timestamp % 60:06.3f}",
+                "original_size": (self.width, self.height)
+            })
+        return frames
+
+
+@register_pose_backend("synthetic")
+def _create_synthetic_backend(config: Dict) -> PoseBackend:
+    return SyntheticPoseBackend(**config.get("pose_backend_options", {}))
+
+
+# ---------------------------------------------------------------------------
+# 绘制
+# ---------------------------------------------------------------------------
+
+# 自定义绘制的骨架连线
+_CUSTOM_CONNECTIONS = [
+    ("right_shoulder", "right_elbow"),
+    ("right_elbow", "right_wrist"),
+    ("right_wrist", "right_index"),
+    ("right_shoulder", "right_hip"),
+    ("right_hip", "right_knee"),
+    ("right_knee", "right_ankle"),
+    ("left_shoulder", "right_shoulder"),
+    ("left_hip", "right_hip")
+]
+
+
+def draw_custom_landmarks(image: np.ndarray, pose_results: Dict,
+                          joints_to_draw: List[str],
+                          color: tuple = (0, 255, 0),
+                          thickness: int = 2,
+                          radius: int = 5) -> np.ndarray:
+    """
+    自定义绘制指定关节点（与检测后端无关，只使用检测结果中的像素坐标）
+
+    Args:
+        image: 输入图像
+        pose_results: 姿态检测结果
+        joints_to_draw: 要绘制的关节点名称列表
+        color: 颜色 (B, G, R)
+        thickness: 线条粗细
+        radius: 关节点半径
+
+    Returns:
+        绘制后的图像
+    """
+    import cv2
+
+    annotated_image = image.copy()
+
+    if not pose_results or "landmarks" not in pose_results:
+        return annotated_image
+
+    landmarks = pose_results["landmarks"]
+
+    # 绘制关节点
+    for joint_name in joints_to_draw:
+        if joint_name in landmarks:
+            joint = landmarks[joint_name]
+            if joint["visibility"] > 0.5:  # 只绘制可见度高的关节点
+                cv2.circle(
+                    annotated_image,
+                    (joint["x_pixel"], joint["y_pixel"]),
+                    radius,
+                    color,
+                    -1
+                )
+                # 添加标签
+                cv2.putText(
+                    annotated_image,
+                    joint_name.replace("_", " ").title(),
+                    (joint["x_pixel"] + 10, joint["y_pixel"] - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.4,
+                    color,
+                    1
+                )
+
+    # 绘制连接线
+    for start_joint, end_joint in _CUSTOM_CONNECTIONS:
+        if start_joint in landmarks and end_joint in landmarks:
+            if (landmarks[start_joint]["visibility"] > 0.5 and
+                    landmarks[end_joint]["visibility"] > 0.5):
+                start_point = (landmarks[start_joint]["x_pixel"],
+                               landmarks[start_joint]["y_pixel"])
+                end_point = (landmarks[end_joint]["x_pixel"],
+                             landmarks[end_joint]["y_pixel"])
+                cv2.line(annotated_image, start_point,
+                         end_point, color, thickness)
+
+    return annotated_image
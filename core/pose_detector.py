@@ -5,17 +5,26 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from config import MEDIAPIPE_POSE_LANDMARKS
+from core.pose_backends import PoseBackend, draw_custom_landmarks
 
+# ROI 模式下用于判断检测置信度的躯干关节点
+ROI_CONFIDENCE_LANDMARKS = ("left_shoulder", "right_shoulder", "left_hip", "right_hip")
 
-class PoseDetector:
-    """姿态检测器"""
+
+class PoseDetector(PoseBackend):
+    """姿态检测器（MediaPipe 后端）"""
+
+    name = "mediapipe"
 
     def __init__(self, model_complexity: int = 2,
                  min_detection_confidence: float = 0.5,
                  min_tracking_confidence: float = 0.5,
-                 smooth_landmarks: bool = True):
+                 smooth_landmarks: bool = True,
+                 roi_tracking: bool = False,
+                 roi_margin: float = 0.3,
+                 roi_min_confidence: float = 0.5):
         """
         初始化姿态检测器
 
@@ -24,6 +33,11 @@ class PoseDetector:
             min_detection_confidence: 最小检测置信度
             min_tracking_confidence: 最小跟踪置信度
             smooth_landmarks: 是否平滑关节点
+            roi_tracking: 是否启用 ROI 裁剪模式（根据上一帧的关节点只检测人物所在区域，
+                适合高分辨率视频；用于连续帧，跳转时应调用 reset_roi）
+            roi_margin: ROI 相对人物边界框的外扩比例
+            roi_min_confidence: 裁剪检测的最低置信度（躯干关节点平均可见度），
+                低于该值时回退到整帧检测
         """
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
@@ -38,31 +52,141 @@ class PoseDetector:
 
         self.landmark_names = MEDIAPIPE_POSE_LANDMARKS
 
-    def detect(self, image: np.ndarray) -> Optional[Dict]:
+        self.roi_tracking = roi_tracking
+        self.roi_margin = roi_margin
+        self.roi_min_confidence = roi_min_confidence
+        self._roi: Optional[Tuple[int, int, int, int]] = None  # (x0, y0, x1, y1) 像素
+
+    def detect(self, image: np.ndarray,
+               original_size: Optional[Tuple[int, int]] = None) -> Optional[Dict]:
         """
         检测图像中的人体姿态
 
+        ROI 模式下优先在上一帧人物区域的裁剪图上检测，关节点映射回整帧坐标；
+        没有可用区域或置信度不足时回退到整帧检测。
+
+        MediaPipe 的帧间跟踪和平滑使用上一次输入图像的坐标系，区域改变或回退整帧时
+        都会重置图（见 _set_roi），否则之后几帧会按错误的位置跟踪和平滑，
+        回退时同一帧也会被跟踪器处理两次。
+
         Args:
             image: 输入图像 (BGR格式)
+            original_size: 图像为缩小后的推理帧时，原视频的 (宽, 高)；
+                像素坐标按原视频尺寸输出
 
         Returns:
             检测结果字典，包含关节点信息；如果检测失败返回None
         """
-        # 转换为RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image_height, image_width = image.shape[:2]
+
+        if self.roi_tracking and self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            pose_landmarks = self._process(image[y0:y1, x0:x1])
+
+            if pose_landmarks is not None:
+                # 裁剪图归一化坐标 -> 整帧归一化坐标（z 与 x 同尺度）
+                crop_width, crop_height = x1 - x0, y1 - y0
+                for landmark in pose_landmarks.landmark:
+                    landmark.x = (x0 + landmark.x * crop_width) / image_width
+                    landmark.y = (y0 + landmark.y * crop_height) / image_height
+                    landmark.z = landmark.z * crop_width / image_width
+
+                if self._confidence(pose_landmarks) < self.roi_min_confidence:
+                    pose_landmarks = None
+
+            if pose_landmarks is None:
+                self._set_roi(None)
+                pose_landmarks = self._process(image)
+        else:
+            pose_landmarks = self._process(image)
+
+        if pose_landmarks is None:
+            self._set_roi(None)
+            return None
 
-        # 处理图像
+        if self.roi_tracking:
+            self._update_roi(pose_landmarks, image_width, image_height)
+
+        if original_size is not None:
+            image_width, image_height = original_size
+
+        return self._build_result(pose_landmarks, image_width, image_height)
+
+    def reset_roi(self):
+        """清除跟踪的人物区域（处理不连续的帧之前调用）"""
+        self._roi = None
+
+    def _set_roi(self, roi: Optional[Tuple[int, int, int, int]]):
+        """切换检测区域；输入坐标系改变时重置 MediaPipe 的跟踪和平滑状态"""
+        if roi != self._roi:
+            self._roi = roi
+            self.pose.reset()
+
+    def reset(self):
+        """
+        清除帧间状态：ROI 以及 MediaPipe 视频模式的跟踪和关节点平滑状态
+
+        不重置图时，不连续窗口的前几帧会沿用很久之前那一帧的人物位置进行跟踪和平滑。
+        """
+        self.reset_roi()
+        self.pose.reset()
+
+    def _process(self, image: np.ndarray):
+        """对 BGR 图像运行 MediaPipe，返回 pose_landmarks（未检测到时为None）"""
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         results = self.pose.process(image_rgb)
+        return results.pose_landmarks
 
-        if not results.pose_landmarks:
-            return None
+    def _confidence(self, pose_landmarks) -> float:
+        """躯干关节点的平均可见度"""
+        visibilities = [pose_landmarks.landmark[self.landmark_names[name]].visibility
+                        for name in ROI_CONFIDENCE_LANDMARKS]
+        return float(np.mean(visibilities))
+
+    def _update_roi(self, pose_landmarks, image_width: int, image_height: int):
+        """
+        根据关节点更新人物区域
 
+        人物仍在当前区域内部时保持区域不变，使 MediaPipe 的帧间跟踪在稳定的输入坐标系中进行；
+        人物接近边缘时重新以人物为中心外扩。区域接近整帧时不再裁剪。
+        """
+        points = np.array([(lm.x * image_width, lm.y * image_height)
+                           for lm in pose_landmarks.landmark if lm.visibility > 0.5])
+        if len(points) == 0:
+            self._set_roi(None)
+            return
+
+        bx0, by0 = points.min(axis=0)
+        bx1, by1 = points.max(axis=0)
+
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            inner_x = (x1 - x0) * self.roi_margin / (1 + 2 * self.roi_margin) / 2
+            inner_y = (y1 - y0) * self.roi_margin / (1 + 2 * self.roi_margin) / 2
+            if (bx0 >= x0 + inner_x and bx1 <= x1 - inner_x and
+                    by0 >= y0 + inner_y and by1 <= y1 - inner_y):
+                return
+
+        # 以人物为中心的正方形区域（MediaPipe 输入为正方形，避免过度变形）
+        size = max(bx1 - bx0, by1 - by0) * (1 + 2 * self.roi_margin)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        x0 = int(max(0, cx - size / 2))
+        y0 = int(max(0, cy - size / 2))
+        x1 = int(min(image_width, cx + size / 2))
+        y1 = int(min(image_height, cy + size / 2))
+
+        if (x1 - x0) * (y1 - y0) >= 0.8 * image_width * image_height:
+            self._set_roi(None)
+        else:
+            self._set_roi((x0, y0, x1, y1))
+
+    def _build_result(self, pose_landmarks, image_width: int, image_height: int) -> Dict:
+        """将 MediaPipe 关节点转换为检测结果字典"""
         # 提取关节点信息
         landmarks_dict = {}
-        image_height, image_width = image.shape[:2]
 
         for name, idx in self.landmark_names.items():
-            landmark = results.pose_landmarks.landmark[idx]
+            landmark = pose_landmarks.landmark[idx]
             landmarks_dict[name] = {
                 "x": landmark.x,  # 归一化坐标 [0, 1]
                 "y": landmark.y,
@@ -74,7 +198,7 @@ class PoseDetector:
 
         return {
             "landmarks": landmarks_dict,
-            "raw_landmarks": results.pose_landmarks,
+            "raw_landmarks": pose_landmarks,
             "image_width": image_width,
             "image_height": image_height
         }
@@ -133,60 +257,8 @@ class PoseDetector:
         Returns:
             绘制后的图像
         """
-        annotated_image = image.copy()
-
-        if not pose_results or "landmarks" not in pose_results:
-            return annotated_image
-
-        landmarks = pose_results["landmarks"]
-
-        # 绘制关节点
-        for joint_name in joints_to_draw:
-            if joint_name in landmarks:
-                joint = landmarks[joint_name]
-                if joint["visibility"] > 0.5:  # 只绘制可见度高的关节点
-                    cv2.circle(
-                        annotated_image,
-                        (joint["x_pixel"], joint["y_pixel"]),
-                        radius,
-                        color,
-                        -1
-                    )
-                    # 添加标签
-                    cv2.putText(
-                        annotated_image,
-                        joint_name.replace("_", " ").title(),
-                        (joint["x_pixel"] + 10, joint["y_pixel"] - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.4,
-                        color,
-                        1
-                    )
-
-        # 绘制连接线
-        connections = [
-            ("right_shoulder", "right_elbow"),
-            ("right_elbow", "right_wrist"),
-            ("right_wrist", "right_index"),
-            ("right_shoulder", "right_hip"),
-            ("right_hip", "right_knee"),
-            ("right_knee", "right_ankle"),
-            ("left_shoulder", "right_shoulder"),
-            ("left_hip", "right_hip")
-        ]
-
-        for start_joint, end_joint in connections:
-            if start_joint in landmarks and end_joint in landmarks:
-                if (landmarks[start_joint]["visibility"] > 0.5 and
-                        landmarks[end_joint]["visibility"] > 0.5):
-                    start_point = (landmarks[start_joint]["x_pixel"],
-                                   landmarks[start_joint]["y_pixel"])
-                    end_point = (landmarks[end_joint]["x_pixel"],
-                                 landmarks[end_joint]["y_pixel"])
-                    cv2.line(annotated_image, start_point,
-                             end_point, color, thickness)
-
-        return annotated_image
+        return draw_custom_landmarks(image, pose_results, joints_to_draw,
+                                     color, thickness, radius)
 
     def get_joint_position(self, pose_results: Dict, joint_name: str) -> Optional[Dict]:
         """
@@ -220,7 +292,12 @@ class PoseDetector:
             results.append(result)
         return results
 
-    def __del__(self):
+    def close(self):
         """释放资源"""
         if hasattr(self, 'pose'):
             self.pose.close()
+            del self.pose
+
+    def __del__(self):
+        """释放资源"""
+        self.close()
@@ -5,30 +5,102 @@ HTML 报表生成器
 import os
 import json
 import shutil
+import threading
+import uuid
 from datetime import datetime
-from jinja2 import Template
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Optional
+
+from config import CACHE_DIR, TEMPLATES_DIR
+from core.asset_store import AssetStore, get_asset_store
+
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
+# external 数据模式下逐帧数据文件所在的子目录和每个文件的帧数
+REPORT_SERIES_DIR = "series"
+REPORT_SERIES_CHUNK_SIZE = 300
+
+# 每个模板目录共享一个 Environment（进程级缓存）：
+# 已编译的模板在内存中复用，字节码缓存在磁盘上跨进程复用
+_environments: Dict[str, "Environment"] = {}
+_environments_lock = threading.Lock()
+
+
+def get_template_environment(template_dir: str = TEMPLATES_DIR) -> "Environment":
+    """
+    获取模板目录对应的 Jinja2 Environment（首次调用时创建）
+
+    Args:
+        template_dir: 模板目录
+
+    Returns:
+        共享的 Environment 实例
+    """
+    # Jinja2 在首次生成报告时才导入
+    from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+    template_dir = os.path.abspath(template_dir)
+
+    with _environments_lock:
+        env = _environments.get(template_dir)
+        if env is None:
+            bytecode_dir = os.path.join(CACHE_DIR, "jinja2")
+            os.makedirs(bytecode_dir, exist_ok=True)
+            env = Environment(
+                loader=FileSystemLoader(template_dir, encoding='utf-8'),
+                bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+                auto_reload=True  # 模板文件修改后自动重新编译
+            )
+            _environments[template_dir] = env
+
+    return env
+
+
+def _round_value(value, digits: int = 2):
+    """数值保留指定小数位（缩小数据文件），None 原样返回"""
+    if value is None:
+        return None
+    return round(float(value), digits)
 
 
 class ReportGenerator:
     """报表生成器"""
 
-    def __init__(self, template_path: str = None):
+    def __init__(self, template_path: str = None, asset_mode: str = "shared",
+                 asset_store: AssetStore = None, data_mode: str = "inline",
+                 series_chunk_size: int = REPORT_SERIES_CHUNK_SIZE):
         """
         初始化报表生成器
 
         Args:
             template_path: 模板文件路径
+            asset_mode: 静态资源和视频的处理方式
+                - "shared": 存入共享资源存储，报表通过硬链接或相对路径引用（默认）
+                - "copy": 复制到每个报表目录（报表目录可独立分发）
+            asset_store: 共享资源存储，默认使用全局存储
+            data_mode: 逐帧数据的嵌入方式
+                - "inline": 直接嵌入 HTML（可通过 file:// 直接打开，默认）
+                - "external": 写入分块数据文件，由页面按需加载（需通过 HTTP 访问）
+            series_chunk_size: external 模式下每个数据文件包含的帧数
         """
+        if asset_mode not in ("shared", "copy"):
+            raise ValueError(f"不支持的资源模式: {asset_mode}")
+        if data_mode not in ("inline", "external"):
+            raise ValueError(f"不支持的数据模式: {data_mode}")
+
         if template_path is None:
             # 使用默认模板
-            project_root = os.path.dirname(
-                os.path.dirname(os.path.abspath(__file__)))
             template_path = os.path.join(
-                project_root, "templates", "basketball_report.html")
+                TEMPLATES_DIR, "basketball_report.html")
 
         self.template_path = template_path
         self.template_dir = os.path.dirname(template_path)
+        self.template_name = os.path.basename(template_path)
+        self.environment = get_template_environment(self.template_dir)
+        self.asset_mode = asset_mode
+        self.asset_store = asset_store or get_asset_store()
+        self.data_mode = data_mode
+        self.series_chunk_size = max(1, series_chunk_size)
 
     def generate_report(self, analysis_results: Dict, video_path: str,
                         output_dir: str, report_name: str = "basketball_analysis_report.html"):
@@ -45,35 +117,34 @@ class ReportGenerator:
 
         # 创建输出目录结构
         os.makedirs(output_dir, exist_ok=True)
-        assets_dir = os.path.join(output_dir, "assets")
         keyframes_dir = os.path.join(output_dir, "keyframes")
-        os.makedirs(assets_dir, exist_ok=True)
         os.makedirs(keyframes_dir, exist_ok=True)
 
-        # 复制静态资源
-        self._copy_assets(assets_dir)
+        # 准备静态资源
+        assets_base = self._prepare_assets(output_dir)
 
-        # 复制视频文件
-        video_filename = os.path.basename(video_path)
-        video_dest = os.path.join(output_dir, video_filename)
-        if not os.path.exists(video_dest):
-            shutil.copy2(video_path, video_dest)
-            print("✓ 视频已复制到报表目录")
+        # 准备视频文件
+        video_url = self._prepare_video(video_path, output_dir)
 
         # 复制关键帧图片
         self._copy_keyframe_images(analysis_results, keyframes_dir)
 
+        # 逐帧数据写入独立文件（页面只嵌入与视频长度无关的摘要）
+        series_manifest = None
+        if self.data_mode == "external":
+            series_manifest = self._write_series_files(
+                analysis_results, output_dir)
+
         # 准备模板数据
         template_data = self._prepare_template_data(
             analysis_results,
-            video_filename
+            video_url,
+            series_manifest
         )
+        template_data["assets_base"] = assets_base
 
-        # 读取模板
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-
-        template = Template(template_content)
+        # 获取已编译的模板（跨报表复用）
+        template = self.environment.get_template(self.template_name)
 
         # 渲染模板
         html_content = template.render(**template_data)
@@ -86,6 +157,59 @@ class ReportGenerator:
         print(f"✓ HTML 报表已生成: {report_path}")
         return report_path
 
+    def _prepare_assets(self, output_dir: str) -> str:
+        """
+        准备报表静态资源
+
+        Args:
+            output_dir: 报表目录
+
+        Returns:
+            模板中引用静态资源的基础 URL
+        """
+        source_assets = os.path.join(self.template_dir, "assets")
+
+        if self.asset_mode == "shared" and os.path.isdir(source_assets):
+            shared_dir = self.asset_store.put_directory(source_assets)
+            print("✓ 静态资源使用共享存储")
+            return self.asset_store.relative_url(shared_dir, output_dir)
+
+        assets_dir = os.path.join(output_dir, "assets")
+        os.makedirs(assets_dir, exist_ok=True)
+        self._copy_assets(assets_dir)
+        return "assets"
+
+    def _prepare_video(self, video_path: str, output_dir: str) -> str:
+        """
+        准备报表视频文件
+
+        共享模式下视频只在存储中保存一份，报表目录中创建硬链接；
+        无法创建硬链接时通过相对路径引用存储中的文件。
+
+        Args:
+            video_path: 视频文件路径
+            output_dir: 报表目录
+
+        Returns:
+            模板中引用视频的 URL
+        """
+        video_filename = os.path.basename(video_path)
+        video_dest = os.path.join(output_dir, video_filename)
+
+        if self.asset_mode == "copy":
+            if not os.path.exists(video_dest):
+                shutil.copy2(video_path, video_dest)
+                print("✓ 视频已复制到报表目录")
+            return video_filename
+
+        stored_path = self.asset_store.put_file(video_path)
+        if self.asset_store.link_file(stored_path, video_dest):
+            print("✓ 视频已链接到报表目录")
+            return video_filename
+
+        print("✓ 视频使用共享存储")
+        return self.asset_store.relative_url(stored_path, output_dir)
+
     def _copy_assets(self, assets_dir: str):
         """复制静态资源文件"""
         source_assets = os.path.join(self.template_dir, "assets")
@@ -123,14 +247,21 @@ class ReportGenerator:
             if "image_path" in kf_info and os.path.exists(kf_info["image_path"]):
                 dest_path = os.path.join(
                     keyframes_dir, f"keyframe_{kf_name}.jpg")
-                shutil.copy2(kf_info["image_path"], dest_path)
+                if self.asset_mode == "copy" or \
+                        not self.asset_store.link_file(kf_info["image_path"], dest_path):
+                    # 重新生成报表时目标可能是指向其他文件的硬链接，复制到临时文件再替换
+                    tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+                    shutil.copy2(kf_info["image_path"], tmp_path)
+                    os.replace(tmp_path, dest_path)
 
         print(f"✓ {len(keyframes)} 张关键帧图片已复制")
 
-    def _prepare_template_data(self, analysis_results: Dict, video_filename: str) -> Dict:
+    def _prepare_template_data(self, analysis_results: Dict, video_url: str,
+                               series_manifest: Optional[Dict] = None) -> Dict:
         """准备模板渲染数据"""
         # 准备分析数据 JSON（用于前端 JavaScript）
-        analysis_data_json = self._prepare_analysis_json(analysis_results)
+        analysis_data_json = self._prepare_analysis_json(
+            analysis_results, series_manifest)
 
         # 角度名称映射（中文）
         angle_name_map = {
@@ -152,7 +283,7 @@ class ReportGenerator:
         analysis_range = analysis_results.get("analysis_range", {})
 
         template_data = {
-            "video_path": video_filename,
+            "video_path": video_url,
             "fps": analysis_results["fps"],
             "total_frames": analysis_results["total_frames"],
             "duration": f"{duration:.2f}",
@@ -168,8 +299,13 @@ class ReportGenerator:
 
         return template_data
 
-    def _prepare_analysis_json(self, analysis_results: Dict) -> str:
-        """准备用于前端的分析数据 JSON"""
+    def _prepare_analysis_json(self, analysis_results: Dict,
+                               series_manifest: Optional[Dict] = None) -> str:
+        """
+        准备用于前端的分析数据 JSON
+
+        提供 series_manifest 时不嵌入逐帧数据，页面通过清单中的数据文件加载。
+        """
         json_data = {
             "fps": analysis_results["fps"],
             "total_frames": len(analysis_results["frames"]),
@@ -180,8 +316,11 @@ class ReportGenerator:
             "energy_transfer": analysis_results.get("energy_transfer", {})
         }
 
+        if series_manifest is not None:
+            json_data["series"] = series_manifest
+
         # 处理帧数据
-        for frame in analysis_results["frames"]:
+        for frame in ([] if series_manifest is not None else analysis_results["frames"]):
             frame_json = {
                 "frame_number": frame["frame_number"],
                 "timestamp": frame["timestamp"],
@@ -203,6 +342,72 @@ class ReportGenerator:
 
         return json.dumps(json_data, ensure_ascii=False)
 
+    def _write_series_files(self, analysis_results: Dict, output_dir: str) -> Dict:
+        """
+        将逐帧角度、速度、加速度按列写入分块数据文件
+
+        Args:
+            analysis_results: 分析结果字典
+            output_dir: 报表目录
+
+        Returns:
+            数据清单（嵌入页面，供前端按顺序加载各分块）
+        """
+        frames = analysis_results["frames"]
+        series_dir = os.path.join(output_dir, REPORT_SERIES_DIR)
+        os.makedirs(series_dir, exist_ok=True)
+
+        # 各分块使用统一的列名，缺失值写为 null
+        angle_names = []
+        joint_names = []
+        for frame in frames:
+            for name in frame.get("angles") or {}:
+                if name not in angle_names:
+                    angle_names.append(name)
+            for name in frame.get("velocities") or {}:
+                if name not in joint_names:
+                    joint_names.append(name)
+
+        chunks = []
+        for chunk_index, start in enumerate(range(0, len(frames), self.series_chunk_size)):
+            chunk_frames = frames[start:start + self.series_chunk_size]
+            chunk = {
+                "start": start,
+                "frame_number": [f["frame_number"] for f in chunk_frames],
+                "timestamp": [_round_value(f["timestamp"], 4) for f in chunk_frames],
+                "pose_detected": [1 if f["pose_detected"] else 0 for f in chunk_frames],
+                "angles": {
+                    name: [_round_value((f.get("angles") or {}).get(name))
+                           for f in chunk_frames]
+                    for name in angle_names
+                },
+                "velocities": {
+                    name: [_round_value((f.get("velocities") or {}).get(name))
+                           for f in chunk_frames]
+                    for name in joint_names
+                },
+                "accelerations": {
+                    name: [_round_value((f.get("accelerations") or {}).get(name))
+                           for f in chunk_frames]
+                    for name in joint_names
+                }
+            }
+
+            chunk_filename = f"series_{chunk_index:04d}.json"
+            with open(os.path.join(series_dir, chunk_filename), 'w', encoding='utf-8') as f:
+                json.dump(chunk, f, ensure_ascii=False, separators=(',', ':'))
+            chunks.append(f"{REPORT_SERIES_DIR}/{chunk_filename}")
+
+        print(f"✓ 逐帧数据已写入 {len(chunks)} 个数据文件")
+
+        return {
+            "frame_count": len(frames),
+            "chunk_size": self.series_chunk_size,
+            "angles": angle_names,
+            "joints": joint_names,
+            "chunks": chunks
+        }
+
     def generate_comparison_report(self, comparison_data: Dict,
                                    output_dir: str,
                                    report_name: str = "comparison_report.html"):
@@ -221,11 +426,9 @@ class ReportGenerator:
 
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
-        assets_dir = os.path.join(output_dir, "assets")
-        os.makedirs(assets_dir, exist_ok=True)
 
-        # 复制静态资源
-        self._copy_assets(assets_dir)
+        # 准备静态资源
+        self._prepare_assets(output_dir)
 
         # 准备对比报告的模板数据
         template_data = {
@@ -597,25 +800,17 @@ class ReportGenerator:
 
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
-        assets_dir = os.path.join(output_dir, "assets")
-        os.makedirs(assets_dir, exist_ok=True)
 
-        # 复制静态资源
-        self._copy_assets(assets_dir)
+        # 准备静态资源
+        assets_base = self._prepare_assets(output_dir)
 
         # 准备模板数据
         template_data = self._prepare_keyframe_comparison_data(comparison_data)
+        template_data["assets_base"] = assets_base
 
-        # 读取关键帧对比模板
-        project_root = os.path.dirname(
-            os.path.dirname(os.path.abspath(__file__)))
-        template_path = os.path.join(
-            project_root, "templates", "keyframe_comparison_report.html")
-
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-
-        template = Template(template_content)
+        # 获取已编译的关键帧对比模板
+        template = get_template_environment().get_template(
+            "keyframe_comparison_report.html")
 
         # 渲染模板
         html_content = template.render(**template_data)
@@ -4,20 +4,28 @@
 """
 import cv2
 import os
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 import numpy as np
 from tqdm import tqdm
 
+# 自适应采样时计算运动量所用的缩略灰度图宽度
+MOTION_PROBE_WIDTH = 96
+
 
 class VideoProcessor:
     """视频处理器"""
 
-    def __init__(self, video_path: str):
+    def __init__(self, video_path: str, max_inference_dimension: Optional[int] = None,
+                 source_size: Optional[Tuple[int, int]] = None):
         """
         初始化视频处理器
 
         Args:
             video_path: 视频文件路径
+            max_inference_dimension: 推理用帧的最大边长（像素）；提取的帧在解码时一次性缩小到
+                该尺寸以内，None 表示保持原分辨率
+            source_size: 视频为低分辨率分析代理时原视频的 (宽, 高)；提取的帧以它作为
+                original_size，关节点像素坐标换算到原视频空间
         """
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"视频文件不存在: {video_path}")
@@ -34,6 +42,14 @@ class VideoProcessor:
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.duration = self.frame_count / self.fps if self.fps > 0 else 0
+        self.source_size = tuple(source_size) if source_size else None
+
+        # 推理分辨率（只缩小不放大）
+        self.inference_width, self.inference_height = self.width, self.height
+        if max_inference_dimension and max(self.width, self.height) > max_inference_dimension:
+            scale = max_inference_dimension / max(self.width, self.height)
+            self.inference_width = max(1, int(round(self.width * scale)))
+            self.inference_height = max(1, int(round(self.height * scale)))
 
     def get_video_info(self) -> dict:
         """
@@ -52,13 +68,23 @@ class VideoProcessor:
             "duration_formatted": f"{int(self.duration // 60)}:{int(self.duration % 60):02d}"
         }
 
-    def extract_frames(self, frame_interval: int = 5, output_dir: Optional[str] = None) -> List[dict]:
+    def extract_frames(self, frame_interval: int = 5, output_dir: Optional[str] = None,
+                       adaptive: bool = False, min_interval: int = 1,
+                       max_interval: Optional[int] = None) -> List[dict]:
         """
         按指定间隔提取视频帧
 
+        自适应模式下按运动量分配采样：在缩略灰度图上做帧差得到运动量，
+        累计运动量达到 frame_interval 倍的平均运动量时采样一帧。
+        动作快的阶段（如出手）采样密集，静止或运球阶段采样稀疏，
+        总采样数与固定间隔大致相同。帧号和时间戳始终为原视频中的精确值。
+
         Args:
-            frame_interval: 帧间隔（每N帧提取一次）
+            frame_interval: 帧间隔（每N帧提取一次；自适应模式下为平均间隔）
             output_dir: 输出目录（如果提供，则保存帧图片）
+            adaptive: 是否按运动量自适应采样
+            min_interval: 自适应模式下的最小帧间隔
+            max_interval: 自适应模式下的最大帧间隔（默认 frame_interval 的3倍）
 
         Returns:
             帧信息列表，每个元素包含帧号、时间戳、图像数据等
@@ -66,6 +92,15 @@ class VideoProcessor:
         frames_data = []
         frame_idx = 0
 
+        if max_interval is None:
+            max_interval = frame_interval * 3
+
+        # 自适应采样状态
+        prev_probe = None
+        total_motion = 0.0
+        accumulated_motion = 0.0
+        last_sampled = None
+
         # 重置视频到开头
         self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
 
@@ -73,7 +108,8 @@ class VideoProcessor:
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
 
-        print(f"开始提取视频帧... (总帧数: {self.frame_count}, 间隔: {frame_interval})")
+        mode = "运动自适应" if adaptive else "固定间隔"
+        print(f"开始提取视频帧... (总帧数: {self.frame_count}, 间隔: {frame_interval}, 模式: {mode})")
 
         with tqdm(total=self.frame_count, desc="提取帧") as pbar:
             while True:
@@ -82,23 +118,32 @@ class VideoProcessor:
                 if not ret:
                     break
 
-                # 按间隔提取帧
-                if frame_idx % frame_interval == 0:
-                    timestamp = frame_idx / self.fps
-
-                    frame_info = {
-                        "frame_number": frame_idx,
-                        "timestamp": timestamp,
-                        "timestamp_formatted": f"{int(timestamp // 60):02d}:{timestamp % 60:06.3f}",
-                        "image": frame.copy()
-                    }
-
-                    # 保存帧图片
-                    if output_dir:
-                        frame_filename = f"frame_{frame_idx:06d}.jpg"
-                        frame_path = os.path.join(output_dir, frame_filename)
-                        cv2.imwrite(frame_path, frame)
-                        frame_info["image_path"] = frame_path
+                if adaptive:
+                    probe = self._motion_probe(frame)
+                    motion = float(cv2.absdiff(probe, prev_probe).mean()) if prev_probe is not None else 0.0
+                    prev_probe = probe
+
+                    total_motion += motion
+                    accumulated_motion += motion
+                    mean_motion = total_motion / frame_idx if frame_idx > 0 else 0.0
+
+                    gap = frame_idx - last_sampled if last_sampled is not None else None
+                    should_sample = (
+                        gap is None
+                        or gap >= max_interval
+                        or (gap >= min_interval and accumulated_motion > 0
+                            and accumulated_motion >= frame_interval * mean_motion)
+                    )
+                else:
+                    motion = None
+                    should_sample = frame_idx % frame_interval == 0
+
+                if should_sample:
+                    frame_info = self._build_frame_info(frame_idx, frame.copy(), output_dir)
+                    if motion is not None:
+                        frame_info["motion"] = motion
+                        accumulated_motion = 0.0
+                        last_sampled = frame_idx
 
                     frames_data.append(frame_info)
 
@@ -108,6 +153,70 @@ class VideoProcessor:
         print(f"✓ 提取完成! 共提取 {len(frames_data)} 帧")
         return frames_data
 
+    def _build_frame_info(self, frame_idx: int, frame: np.ndarray,
+                          output_dir: Optional[str] = None) -> dict:
+        """
+        构建帧信息字典（帧号和时间戳取自原视频），可选保存帧图片
+
+        超过推理分辨率的帧在此一次性缩小，只保留缩小后的图像；
+        original_size 记录原视频尺寸（解码分析代理时为 source_size），用于把关节点像素坐标换算回原视频空间。
+        """
+        timestamp = frame_idx / self.fps
+
+        frame_info = {
+            "frame_number": frame_idx,
+            "timestamp": timestamp,
+            "timestamp_formatted": f"{int(timestamp // 60):02d}:{timestamp % 60:06.3f}",
+            "image": frame
+        }
+
+        # 保存帧图片（原分辨率）
+        if output_dir:
+            frame_filename = f"frame_{frame_idx:06d}.jpg"
+            frame_path = os.path.join(output_dir, frame_filename)
+            cv2.imwrite(frame_path, frame)
+            frame_info["image_path"] = frame_path
+
+        if self.is_downscaled:
+            frame_info["image"] = self.resize_frame(
+                frame, self.inference_width, self.inference_height,
+                interpolation=cv2.INTER_AREA)
+        if self.is_downscaled or self.source_size:
+            frame_info["original_size"] = self.source_size or (self.width, self.height)
+
+        return frame_info
+
+    @property
+    def is_downscaled(self) -> bool:
+        """提取的帧是否被缩小到推理分辨率"""
+        return (self.inference_width, self.inference_height) != (self.width, self.height)
+
+    def get_full_resolution_image(self, frame_info: dict) -> Optional[np.ndarray]:
+        """
+        获取帧的原分辨率图像（用于输出关键帧图片）
+
+        帧未缩小时直接返回其图像，否则（或帧不含图像，如关节点缓存还原的帧）按帧号重新解码，
+        不在内存中长期保留原分辨率帧。
+
+        Args:
+            frame_info: 帧信息字典
+
+        Returns:
+            原分辨率帧图像，失败返回None
+        """
+        if "original_size" not in frame_info and frame_info.get("image") is not None:
+            return frame_info["image"]
+        return self.get_frame_at_index(frame_info["frame_number"])
+
+    @staticmethod
+    def _motion_probe(frame: np.ndarray) -> np.ndarray:
+        """缩小并转为灰度图，用于低成本计算帧差"""
+        height, width = frame.shape[:2]
+        probe_height = max(1, int(height * MOTION_PROBE_WIDTH / width))
+        small = cv2.resize(frame, (MOTION_PROBE_WIDTH, probe_height),
+                           interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
     def get_frame_at_time(self, timestamp: float) -> Optional[np.ndarray]:
         """
         获取指定时间点的帧
@@ -139,6 +248,66 @@ class VideoProcessor:
 
         return frame if ret else None
 
+    def iter_frames(self, frame_interval: int = 1) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        按间隔顺序遍历视频帧，不在内存中保留（用于长视频的低成本扫描）
+
+        Args:
+            frame_interval: 帧间隔
+
+        Yields:
+            (帧号, 帧图像)
+        """
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        frame_idx = 0
+
+        while True:
+            if frame_idx % frame_interval == 0:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                yield frame_idx, frame
+            elif not self.cap.grab():
+                # 跳过的帧只解复用，不转换图像
+                break
+            frame_idx += 1
+
+    def read_frame_range(self, start_frame: int, end_frame: int,
+                         step: int = 1) -> List[dict]:
+        """
+        逐帧读取指定区间内的帧（只定位一次，之后顺序解码）
+
+        Args:
+            start_frame: 起始帧号（包含）
+            end_frame: 结束帧号（包含）
+            step: 保留帧的间隔（从 start_frame 起每 step 帧保留一帧）
+
+        Returns:
+            帧信息列表，格式与 extract_frames 一致（不保存图片）
+        """
+        start_frame = max(0, start_frame)
+        end_frame = min(end_frame, self.frame_count - 1)
+        frames_data = []
+
+        frame = self.get_frame_at_index(start_frame) if start_frame <= end_frame else None
+        frame_idx = start_frame
+
+        while frame is not None:
+            if (frame_idx - start_frame) % step == 0:
+                frames_data.append(self._build_frame_info(frame_idx, frame))
+
+            frame_idx += 1
+            if frame_idx > end_frame:
+                break
+            if (frame_idx - start_frame) % step == 0:
+                ret, frame = self.cap.read()
+            else:
+                ret = self.cap.grab()
+            if not ret:
+                break
+
+        return frames_data
+
     def save_frame(self, frame: np.ndarray, output_path: str):
         """
         保存帧图片
@@ -150,7 +319,8 @@ class VideoProcessor:
         cv2.imwrite(output_path, frame)
 
     def resize_frame(self, frame: np.ndarray, width: Optional[int] = None,
-                     height: Optional[int] = None) -> np.ndarray:
+                     height: Optional[int] = None,
+                     interpolation: int = cv2.INTER_LINEAR) -> np.ndarray:
         """
         调整帧大小
 
@@ -158,6 +328,7 @@ class VideoProcessor:
             frame: 帧图像数据
             width: 目标宽度
             height: 目标高度
+            interpolation: 插值方式（缩小时 INTER_AREA 质量更好）
 
         Returns:
             调整大小后的帧
@@ -172,7 +343,7 @@ class VideoProcessor:
             aspect_ratio = frame.shape[0] / frame.shape[1]
             height = int(width * aspect_ratio)
 
-        return cv2.resize(frame, (width, height))
+        return cv2.resize(frame, (width, height), interpolation=interpolation)
 
     def copy_video_to_output(self, output_path: str):
         """
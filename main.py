@@ -1,16 +1,24 @@
 """
 篮球投篮分析系统 - 主程序入口
 交互式界面，支持分析和对比功能
+
+子命令：
+    python main.py reprocess [分析目录 ...] [--all] [--workers N] [--no-report]
+        基于已保存的关节点重算历史分析的指标（不读取视频）
+    python main.py batch <目录|通配符|视频 ...> [--workers N] [--profile P] [--summary 路径]
+        无交互批量分析，按内容哈希跳过已分析的视频，中断后重新运行即可继续
+    python main.py watch <目录> [--concurrency N] [--settle 秒] [--polling]
+        监视目录，自动分析放入的新视频
+    python main.py worker [--concurrency N] [--db 路径]
+        分析 worker：执行 Web 接口（生产模式）写入共享任务存储的分析任务
 """
 import os
 import sys
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from core.video_processor import VideoProcessor
-from core.data_manager import DataManager
-from core.report_generator import ReportGenerator
-from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+# 分析管线（MediaPipe / OpenCV / pandas / Jinja2）在各功能函数中按需导入，
+# 菜单和子命令的参数解析不等待这些依赖加载
 from sports.basketball.keyframe_comparison import KeyframeComparison
 from config import BASKETBALL_SHOT_CONFIG, OUTPUT_DIR
 
@@ -169,6 +177,7 @@ def perform_keyframe_comparison() -> None:
         KeyframeComparison.save_comparison_data(comparison, output_dir)
 
         # 生成HTML报告
+        from core.report_generator import ReportGenerator
         report_gen = ReportGenerator()
         report_path = report_gen.generate_keyframe_comparison_report(
             comparison,
@@ -189,6 +198,12 @@ def perform_keyframe_comparison() -> None:
 
 def perform_analysis() -> Optional[str]:
     """执行视频分析"""
+    from core.video_processor import VideoProcessor
+    from core.data_manager import DataManager
+    from core.report_generator import ReportGenerator
+    from core.landmark_cache import LandmarkCache, get_landmark_cache
+    from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+
     print("\n【视频分析模式】")
     print("-" * 70)
 
@@ -210,6 +225,20 @@ def perform_analysis() -> Optional[str]:
         frame_interval = 5
         print(f"使用默认间隔: {frame_interval}")
 
+    # 运动自适应采样：动作快的阶段密集采样，静止阶段稀疏采样
+    adaptive_sampling = get_user_choice(
+        "是否按运动量自适应采样（帧间隔作为平均间隔）？(y/n)",
+        options=['y', 'n', 'yes', 'no'],
+        default='n'
+    ).lower() in ['y', 'yes']
+
+    # 精细化模式：粗间隔检测 + 候选关键帧附近逐帧重检
+    refine_keyframes = get_user_choice(
+        "是否启用关键帧精细化（粗间隔检测后只在关键帧附近逐帧重检）？(y/n)",
+        options=['y', 'n', 'yes', 'no'],
+        default='n'
+    ).lower() in ['y', 'yes']
+
     # 3. 获取输出目录名称
     output_name = get_user_choice(
         "请输入输出目录名称（留空使用时间戳）",
@@ -246,6 +275,8 @@ def perform_analysis() -> Optional[str]:
     print(f"  📹 视频文件: {video_path}")
     print(f"  📁 输出目录: {output_dir}")
     print(f"  🔢 帧间隔: {frame_interval}")
+    print(f"  🏃 自适应采样: {'是' if adaptive_sampling else '否'}")
+    print(f"  🎯 关键帧精细化: {'是' if refine_keyframes else '否'}")
     print(f"  📄 生成报告: {'是' if generate_report else '否'}")
     print("=" * 70)
 
@@ -253,7 +284,9 @@ def perform_analysis() -> Optional[str]:
         # 1. 视频处理
         print("\n【步骤 1/5】视频处理")
         print("-" * 70)
-        video_processor = VideoProcessor(video_path)
+        video_processor = VideoProcessor(
+            video_path,
+            max_inference_dimension=BASKETBALL_SHOT_CONFIG.get("max_inference_dimension"))
         video_info = video_processor.get_video_info()
 
         print("✓ 视频信息:")
@@ -262,27 +295,56 @@ def perform_analysis() -> Optional[str]:
         print(f"  总帧数: {video_info['frame_count']}")
         print(f"  时长: {video_info['duration_formatted']}")
 
-        # 提取帧
-        frames_data = video_processor.extract_frames(
-            frame_interval=frame_interval,
-            output_dir=frames_dir
-        )
+        # 提取帧（命中关节点缓存时跳过解码和推理）
+        sampling_config = BASKETBALL_SHOT_CONFIG.get("adaptive_sampling", {})
+        landmark_cache = None
+        cache_key = None
+        cached = None
+        if BASKETBALL_SHOT_CONFIG.get("landmark_cache", {}).get("enabled", False):
+            landmark_cache = get_landmark_cache()
+            cache_key = LandmarkCache.make_key(
+                video_path, BASKETBALL_SHOT_CONFIG, frame_interval, adaptive_sampling)
+            cached = landmark_cache.load(cache_key)
+
+        if cached is not None:
+            frames_data = cached["frames"]
+            print(f"✓ 命中关节点缓存: {len(frames_data)} 帧，跳过解码和姿态检测")
+        else:
+            frames_data = video_processor.extract_frames(
+                frame_interval=frame_interval,
+                output_dir=frames_dir,
+                adaptive=adaptive_sampling,
+                min_interval=sampling_config.get("min_frame_interval", 1),
+                max_interval=sampling_config.get("max_frame_interval")
+            )
 
         # 2. 姿态分析
         print("\n【步骤 2/5】姿态分析与运动学计算")
         print("-" * 70)
         analyzer = BasketballShotAnalyzer(BASKETBALL_SHOT_CONFIG)
         analysis_results = analyzer.analyze_frames(
-            frames_data, video_info['fps'])
+            frames_data, video_info['fps'],
+            video_processor=video_processor if refine_keyframes else None,
+            dense_frames=cached["dense_frames"] if cached else None)
+
+        if landmark_cache is not None:
+            try:
+                if landmark_cache.save(cache_key, analyzer.frames_data,
+                                       analyzer.dense_frames, previous=cached):
+                    print("✓ 关节点检测结果已缓存")
+            except OSError as e:
+                print(f"⚠️ 关节点缓存写入失败: {e}")
 
         # 保存关键帧图片
         analyzer.save_keyframe_images(
-            keyframes_dir, analysis_results["keyframes"])
+            keyframes_dir, analysis_results["keyframes"], video_processor)
 
         # 3. 数据管理
         print("\n【步骤 3/5】数据处理与导出")
         print("-" * 70)
         data_manager = DataManager()
+        data_manager.create_dataframes(
+            analysis_results, analyzer.get_time_series())
 
         # 导出 CSV
         data_manager.export_to_csv(data_dir)
@@ -350,6 +412,282 @@ def perform_analysis() -> Optional[str]:
         return None
 
 
+def perform_session_analysis() -> Optional[str]:
+    """执行训练课分析（一段视频包含多次投篮）"""
+    from sports.basketball.session_analyzer import SessionAnalyzer
+
+    print("\n【训练课分析模式】")
+    print("-" * 70)
+
+    while True:
+        video_path = get_user_choice("请输入视频文件路径")
+        if os.path.exists(video_path):
+            break
+        print(f"❌ 文件不存在: {video_path}")
+
+    frame_interval = get_user_choice(
+        "请输入单次投篮分析的帧间隔（每N帧提取一次）",
+        default="5"
+    )
+    try:
+        frame_interval = int(frame_interval)
+    except ValueError:
+        frame_interval = 5
+        print(f"使用默认间隔: {frame_interval}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = os.path.join(OUTPUT_DIR, "basketball", f"session_{timestamp}")
+
+    try:
+        session_analyzer = SessionAnalyzer(BASKETBALL_SHOT_CONFIG)
+        result = session_analyzer.analyze(
+            video_path, frame_interval=frame_interval, output_dir=output_dir)
+    except (IOError, ValueError, RuntimeError) as e:
+        print(f"\n❌ 错误: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+    session = result["session"]
+    print("\n" + "=" * 70)
+    print("✅ 训练课分析完成!")
+    print("=" * 70)
+    print(f"  投篮次数: {session['shot_count']}（成功分析 {session['analyzed_count']} 次）")
+    print(f"  每分钟投篮: {session['shots_per_minute']:.1f}")
+    for name in ("shooting_duration", "release_elbow_angle", "squat_deepest_knee_angle"):
+        stats = session["metrics"].get(name)
+        if stats:
+            print(f"  {name}: 平均 {stats['mean']:.2f}，标准差 {stats['std']:.2f}")
+    print(f"\n📁 输出目录: {output_dir}")
+
+    return output_dir
+
+
+def run_reprocess_command(argv: List[str]) -> int:
+    """
+    reprocess 子命令：用进程池批量重算分析目录
+
+    Args:
+        argv: 子命令参数
+
+    Returns:
+        退出码（有失败的目录时为1）
+    """
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        prog="main.py reprocess",
+        description="基于已保存的关节点重新计算角度、运动学、关键帧、节奏、发力顺序和能量传递")
+    parser.add_argument("analysis_dirs", nargs="*", help="分析输出目录（包含 data/analysis_data.json）")
+    parser.add_argument("--all", action="store_true", help=f"重算 {OUTPUT_DIR} 下的全部分析")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认为 CPU 核数）")
+    parser.add_argument("--no-report", action="store_true", help="不重新生成 HTML 报表")
+    parser.add_argument("--summary", help="将重算汇总写入该 JSON 文件")
+    args = parser.parse_args(argv)
+
+    from sports.basketball.reprocessor import reprocess_all, find_analysis_dirs
+
+    analysis_dirs = find_analysis_dirs(OUTPUT_DIR) if args.all else args.analysis_dirs
+    if not analysis_dirs:
+        parser.error("请指定分析目录或使用 --all")
+
+    print(f"🔁 开始重算 {len(analysis_dirs)} 个分析...")
+    summary = reprocess_all(analysis_dirs, max_workers=args.workers,
+                            regenerate_report=not args.no_report)
+
+    for item in summary["results"]:
+        if item["status"] == "completed":
+            moved = item["moved_keyframes"]
+            print(f"  ✓ {item['analysis_dir']} ({item['elapsed']:.2f}s"
+                  f"{'，关键帧变化: ' + ', '.join(moved) if moved else ''})")
+        else:
+            print(f"  ❌ {item['analysis_dir']}: {item['error']}")
+
+    print(f"\n完成 {summary['completed']}/{summary['total']}，"
+          f"失败 {summary['failed']}，耗时 {summary['elapsed']:.1f}s")
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    return 1 if summary["failed"] else 0
+
+
+def run_batch_command(argv: List[str]) -> int:
+    """
+    batch 子命令：多进程批量分析目录或通配符匹配的视频
+
+    Args:
+        argv: 子命令参数
+
+    Returns:
+        退出码（有失败或中断时为1）
+    """
+    import argparse
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from services.batch_runner import run_batch
+    from config import SPEED_PROFILES
+
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="无交互批量分析视频（与 Web 接口使用相同的分析流程和输出结构）")
+    parser.add_argument("inputs", nargs="+", help="视频目录、通配符（如 'clips/**/*.mp4'）或视频文件")
+    parser.add_argument("--workers", type=int, default=2, help="并行分析的进程数（默认2）")
+    parser.add_argument("--profile", choices=sorted(SPEED_PROFILES), help="速度档位")
+    parser.add_argument("--frame-interval", type=int, help="帧间隔（默认取配置）")
+    parser.add_argument("--device-id", help="输出到该设备的用户文件夹")
+    parser.add_argument("--no-report", action="store_true", help="不生成 HTML 报表")
+    parser.add_argument("--no-recursive", action="store_true", help="不递归搜索子目录")
+    parser.add_argument("--reanalyze", action="store_true",
+                        help="只按处理日志跳过，不跳过其他方式分析过的视频")
+    parser.add_argument("--journal", help="处理日志路径（默认 output/batch/journal.jsonl）")
+    parser.add_argument("--summary", help="运行汇总 JSON 路径（默认 output/batch/run_时间戳.json）")
+    args = parser.parse_args(argv)
+
+    options = {"save_frames": False}
+    if args.profile:
+        options["speed_profile"] = args.profile
+    if args.frame_interval:
+        options["frame_interval"] = args.frame_interval
+    if args.device_id:
+        options["device_id"] = args.device_id
+    if args.no_report:
+        options["generate_report"] = False
+
+    summary = run_batch(
+        args.inputs,
+        workers=args.workers,
+        options=options,
+        journal_path=args.journal,
+        summary_path=args.summary,
+        skip_existing=not args.reanalyze,
+        recursive=not args.no_recursive
+    )
+
+    totals = summary["totals"]
+    print(f"\n完成 {totals['completed']}，失败 {totals['failed']}，"
+          f"跳过 {totals['skipped']}，耗时 {summary['elapsed']:.1f}s")
+    for stage, stats in summary["stage_timings"].items():
+        print(f"  {stage}: 平均 {stats['mean']:.2f}s，合计 {stats['total']:.1f}s")
+    for record in summary["videos"]:
+        if record["status"] == "failed":
+            print(f"  ❌ {record['video_path']}: {record.get('error')}")
+    print(f"\n📄 运行汇总: {summary['summary_path']}")
+
+    return 1 if totals["failed"] or summary["interrupted"] else 0
+
+
+def run_watch_command(argv: List[str]) -> int:
+    """
+    watch 子命令：监视目录并自动分析新视频，收到 SIGINT/SIGTERM 后等待正在运行的分析完成再退出
+
+    Args:
+        argv: 子命令参数
+
+    Returns:
+        退出码
+    """
+    import argparse
+    import signal
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from services.watch_folder import WatchFolderDaemon
+    from config import SPEED_PROFILES
+
+    parser = argparse.ArgumentParser(
+        prog="main.py watch",
+        description="监视目录，文件拷贝完成后自动分析（与 Web 接口使用相同的分析流程）")
+    parser.add_argument("directory", help="监视的目录")
+    parser.add_argument("--concurrency", type=int, default=2, help="同时运行的分析数（默认2）")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="文件大小保持不变多少秒后开始分析（默认5）")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="轮询间隔秒数（默认2）")
+    parser.add_argument("--polling", action="store_true", help="不使用 inotify，只轮询")
+    parser.add_argument("--retry-failed", action="store_true", help="重新分析处理日志中失败的视频")
+    parser.add_argument("--profile", choices=sorted(SPEED_PROFILES), help="速度档位")
+    parser.add_argument("--device-id", help="输出到该设备的用户文件夹")
+    parser.add_argument("--no-report", action="store_true", help="不生成 HTML 报表")
+    parser.add_argument("--journal", help="处理日志路径（默认与批量分析共用 output/batch/journal.jsonl）")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"目录不存在: {args.directory}")
+
+    options = {"save_frames": False}
+    if args.profile:
+        options["speed_profile"] = args.profile
+    if args.device_id:
+        options["device_id"] = args.device_id
+    if args.no_report:
+        options["generate_report"] = False
+
+    daemon = WatchFolderDaemon(
+        args.directory,
+        options=options,
+        max_concurrent=args.concurrency,
+        settle_seconds=args.settle,
+        poll_interval=args.poll_interval,
+        journal_path=args.journal,
+        use_inotify=not args.polling,
+        retry_failed=args.retry_failed
+    )
+
+    def handle_signal(signum, frame):
+        print("\n收到停止信号")
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    daemon.run()
+    return 0
+
+
+def run_worker_command(argv: List[str]) -> int:
+    """
+    worker 子命令：从共享任务存储领取并执行 Web 接口提交的分析任务，
+    收到 SIGINT/SIGTERM 后等待正在运行的分析完成再退出
+
+    Args:
+        argv: 子命令参数
+
+    Returns:
+        退出码
+    """
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(
+        prog="main.py worker",
+        description="分析 worker：执行 Web 接口写入共享任务存储（SQLite）的分析任务，可启动多个")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时运行的分析数（默认1）")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="轮询间隔秒数（默认1）")
+    parser.add_argument("--db", help="任务数据库路径（默认取 TASK_DB_PATH 或 output/.cache/tasks.sqlite3）")
+    args = parser.parse_args(argv)
+
+    # 任务存储在导入任务管理器时创建，需先设置环境变量
+    os.environ.setdefault("TASK_STORE", "sqlite")
+    if args.db:
+        os.environ["TASK_DB_PATH"] = os.path.abspath(args.db)
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from services.task_worker import TaskWorker
+
+    worker = TaskWorker(concurrency=args.concurrency, poll_interval=args.poll_interval)
+
+    def handle_signal(signum, frame):
+        print("\n收到停止信号")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    worker.run()
+    return 0
+
+
 def main_menu() -> None:
     """主菜单"""
     while True:
@@ -359,10 +697,11 @@ def main_menu() -> None:
         print("  [1] 分析新视频")
         print("  [2] 关键帧对比分析")
         print("  [3] 查看历史记录")
+        print("  [4] 训练课分析（多次投篮）")
         print("  [0] 退出程序")
         print()
 
-        choice = get_user_choice("请输入选项", options=['0', '1', '2', '3'])
+        choice = get_user_choice("请输入选项", options=['0', '1', '2', '3', '4'])
 
         if choice == '0':
             print("\n👋 再见!")
@@ -373,6 +712,8 @@ def main_menu() -> None:
             perform_keyframe_comparison()
         elif choice == '3':
             list_available_analyses()
+        elif choice == '4':
+            perform_session_analysis()
 
         print("\n" + "=" * 70)
         input("按 Enter 键继续...")
@@ -380,6 +721,15 @@ def main_menu() -> None:
 
 def main() -> None:
     """主函数"""
+    if len(sys.argv) > 1 and sys.argv[1] == "reprocess":
+        sys.exit(run_reprocess_command(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(run_batch_command(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "watch":
+        sys.exit(run_watch_command(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        sys.exit(run_worker_command(sys.argv[2:]))
+
     try:
         main_menu()
     except KeyboardInterrupt:
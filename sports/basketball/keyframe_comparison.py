@@ -1,8 +1,9 @@
 """
 关键帧对比模块
-用于两次篮球投篮分析报告之间的关键帧对比
+用于两次篮球投篮分析报告之间的关键帧对比，以及一批分析的汇总对比
 """
 import json
+import statistics
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 import shutil
@@ -99,9 +100,11 @@ class KeyframeComparison:
         Returns:
             分析数据字典，失败返回None
         """
+        from core.data_manager import DataManager
+
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # 关键帧只保存帧索引，角度等数据按索引从 frames 还原
+            return DataManager.load_analysis_json(json_path)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             print(f"加载数据失败: {e}")
             return None
@@ -212,6 +215,85 @@ class KeyframeComparison:
 
         return comparison
 
+    @staticmethod
+    def compare_many(
+        datas: List[Dict[str, Any]],
+        labels: List[str],
+        analysis_paths: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        汇总对比多组关键帧数据（批量分析）
+
+        每种关键帧的时间和各角度给出逐组数值和组间统计（均值、标准差、最小、最大），
+        并列出组间差异最大的角度。
+
+        Args:
+            datas: 各组分析数据
+            labels: 各组标签
+            analysis_paths: 各组分析路径
+
+        Returns:
+            汇总对比结果字典
+        """
+        analysis_paths = analysis_paths or [''] * len(datas)
+        keyframe_sets = [data.get('keyframes', {}) for data in datas]
+
+        comparison = {
+            'labels': labels,
+            'items': [
+                {'label': label, 'analysis_path': path, 'keyframe_count': len(keyframes)}
+                for label, path, keyframes in zip(labels, analysis_paths, keyframe_sets)
+            ],
+            'keyframes': {},
+            'summary': {
+                'count': len(datas),
+                'common_keyframes': sorted(set.intersection(*(set(k) for k in keyframe_sets)))
+                if keyframe_sets else [],
+                'most_variable_angles': []
+            }
+        }
+
+        variability = []
+        for kf_type in sorted(set().union(*(set(k) for k in keyframe_sets))):
+            entries = [keyframes.get(kf_type) for keyframes in keyframe_sets]
+            angle_names = sorted(set().union(*((entry or {}).get('angles', {}) for entry in entries)))
+
+            kf_comparison = {
+                'type': kf_type,
+                'name': KeyframeComparison.KEYFRAME_TYPE_MAP.get(kf_type, kf_type),
+                'present_in': [i for i, entry in enumerate(entries) if entry],
+                'timestamp': KeyframeComparison._spread(
+                    [entry.get('timestamp') if entry else None for entry in entries]),
+                'angles': {}
+            }
+            for angle_name in angle_names:
+                spread = KeyframeComparison._spread(
+                    [(entry or {}).get('angles', {}).get(angle_name) for entry in entries])
+                spread['name'] = KeyframeComparison.ANGLE_NAME_MAP.get(angle_name, angle_name)
+                kf_comparison['angles'][angle_name] = spread
+                if spread['std'] is not None and spread['count'] >= 2:
+                    variability.append({'keyframe': kf_type, 'angle': angle_name,
+                                        'std': spread['std'], 'range': spread['max'] - spread['min']})
+
+            comparison['keyframes'][kf_type] = kf_comparison
+
+        variability.sort(key=lambda item: item['std'], reverse=True)
+        comparison['summary']['most_variable_angles'] = variability[:5]
+        return comparison
+
+    @staticmethod
+    def _spread(values: List[Optional[float]]) -> Dict[str, Any]:
+        """逐组数值及组间统计（缺失的组为 None，不参与统计）"""
+        present = [float(value) for value in values if value is not None]
+        return {
+            'values': values,
+            'count': len(present),
+            'mean': statistics.fmean(present) if present else None,
+            'std': statistics.pstdev(present) if present else None,
+            'min': min(present) if present else None,
+            'max': max(present) if present else None
+        }
+
     @staticmethod
     def generate_text_summary(comparison: Dict[str, Any]) -> str:
         """
@@ -28,6 +28,19 @@ from typing import Dict, List, Optional
 from collections import OrderedDict
 
 
+# 可在局部窗口内重新评分的关键帧（中点类关键帧由两端关键帧推导，不单独精细化）
+REFINABLE_KEYFRAMES = (
+    'ball_lowest', 'squat_deepest', 'lift_start', 'ball_at_chest',
+    'ball_at_shoulder', 'elbow_max_bend', 'elbow_extension_max',
+    'wrist_snap', 'arm_full_extension', 'leg_power_start', 'release',
+    'follow_through'
+)
+
+# 角速度按相邻采样的实际时间间隔计算（度/秒），自适应采样和局部逐帧精细化时采样间隔不均匀；
+# 评分系数按参考采样间隔（默认每 5 帧采样一次、30fps）换算，默认参数下与按"度/采样"计算时一致
+REFERENCE_SAMPLE_INTERVAL = 5 / 30
+
+
 class KeyframeDetector:
     """篮球投篮关键帧检测器"""
     
@@ -44,6 +57,27 @@ class KeyframeDetector:
         """
         landmarks = frame_data.get("landmarks")
         return landmarks if landmarks is not None else None
+
+    @staticmethod
+    def _angular_velocities(frames_data: List[Dict], angles: List[float]) -> List[float]:
+        """
+        逐帧角速度（度/秒），第一帧为0
+
+        Args:
+            frames_data: 帧数据列表（使用其中的 timestamp）
+            angles: 与帧对应的角度序列
+
+        Returns:
+            角速度列表；缺少时间戳时按参考采样间隔计算
+        """
+        velocities = [0.0]
+        for i in range(1, len(angles)):
+            dt = frames_data[i].get("timestamp", 0) - frames_data[i-1].get("timestamp", 0)
+            if dt <= 0:
+                dt = REFERENCE_SAMPLE_INTERVAL
+            velocities.append((angles[i] - angles[i-1]) / dt)
+        return velocities
+
     """篮球投篮关键帧检测器"""
 
     @staticmethod
@@ -244,6 +278,49 @@ class KeyframeDetector:
 
         return sorted_keyframes
 
+    @staticmethod
+    def rescore_keyframe(name: str, window_frames: List[Dict]) -> Optional[Dict]:
+        """
+        在候选关键帧附近的逐帧窗口内，用与整段检测相同的规则重新评分
+
+        Args:
+            name: 关键帧名称（见 REFINABLE_KEYFRAMES）
+            window_frames: 按时间排序的窗口帧数据（已完成姿态分析）
+
+        Returns:
+            关键帧字典，index 为窗口内索引；无法评分时返回None
+        """
+        if not window_frames:
+            return None
+
+        if name == 'ball_lowest':
+            return KeyframeDetector._detect_ball_lowest(window_frames)
+        if name == 'squat_deepest':
+            return KeyframeDetector._detect_squat_deepest(window_frames)
+        if name == 'lift_start':
+            return KeyframeDetector._detect_lift_start(window_frames, 0)
+        if name == 'ball_at_chest':
+            return KeyframeDetector._detect_ball_at_height(window_frames, 'chest', 0)
+        if name == 'ball_at_shoulder':
+            return KeyframeDetector._detect_ball_at_height(window_frames, 'shoulder', 0)
+        if name == 'elbow_max_bend':
+            return KeyframeDetector._detect_elbow_max_bend(window_frames)
+        if name == 'elbow_extension_max':
+            return KeyframeDetector._detect_elbow_extension_max(window_frames)
+        if name == 'wrist_snap':
+            # 窗口已限定在候选附近，不再只搜索后半段
+            return KeyframeDetector._detect_wrist_snap(window_frames, search_start=0)
+        if name == 'arm_full_extension':
+            return KeyframeDetector._detect_arm_full_extension(window_frames)
+        if name == 'leg_power_start':
+            return KeyframeDetector._detect_leg_power_start(window_frames)
+        if name == 'release':
+            return KeyframeDetector._detect_release(window_frames, 0)
+        if name == 'follow_through':
+            return KeyframeDetector._detect_follow_through(window_frames)
+
+        return None
+
     @staticmethod
     def _sort_by_time(keyframes: Dict[str, Dict]) -> Dict[str, Dict]:
         """
@@ -487,8 +564,8 @@ class KeyframeDetector:
             elbow_angles.append(f.get("angles", {}).get("elbow_angle", 180))
             velocities.append(f.get("velocities", {}).get("right_wrist", 0))
 
-        angle_changes = [0] + [abs(elbow_angles[i] - elbow_angles[i-1])
-                               for i in range(1, len(elbow_angles))]
+        angle_changes = [abs(v) for v in
+                         KeyframeDetector._angular_velocities(frames_data, elbow_angles)]
 
         for i in range(search_after, len(frames_data)):
             score = 0
@@ -507,7 +584,7 @@ class KeyframeDetector:
             score += max(0, 20 - abs(velocities[i]) * 100)
 
             # 角度变化小
-            score += max(0, 20 - angle_changes[i] * 2)
+            score += max(0, 20 - angle_changes[i] * 2 * REFERENCE_SAMPLE_INTERVAL)
 
             scores.append(score)
 
@@ -530,8 +607,7 @@ class KeyframeDetector:
         elbow_angles = [f.get("angles", {}).get(
             "elbow_angle", 180) for f in frames_data]
 
-        angular_velocities = [0] + [elbow_angles[i] - elbow_angles[i-1]
-                                    for i in range(1, len(elbow_angles))]
+        angular_velocities = KeyframeDetector._angular_velocities(frames_data, elbow_angles)
         positive_velocities = [max(0, v) for v in angular_velocities]
 
         if not positive_velocities or max(positive_velocities) == 0:
@@ -542,11 +618,11 @@ class KeyframeDetector:
         return {
             "index": idx,
             "frame_data": frames_data[idx],
-            "description": f"肘关节伸展最快（{positive_velocities[idx]:.1f}°/帧）"
+            "description": f"肘关节伸展最快（{positive_velocities[idx]:.1f}°/秒）"
         }
 
     @staticmethod
-    def _detect_wrist_snap(frames_data: List[Dict]) -> Optional[Dict]:
+    def _detect_wrist_snap(frames_data: List[Dict], search_start: Optional[int] = None) -> Optional[Dict]:
         """检测手腕下压（snap）的时刻"""
         wrist_elbow_diffs = []
 
@@ -564,8 +640,9 @@ class KeyframeDetector:
         if not wrist_elbow_diffs or max(wrist_elbow_diffs) <= 0:
             return None
 
-        # 从后半段开始搜索
-        search_start = len(frames_data) // 2
+        # 默认从后半段开始搜索
+        if search_start is None:
+            search_start = len(frames_data) // 2
         max_idx = search_start + \
             int(np.argmax(wrist_elbow_diffs[search_start:]))
 
@@ -605,8 +682,7 @@ class KeyframeDetector:
         knee_angles = [f.get("angles", {}).get("knee_angle", 180)
                        for f in frames_data]
 
-        angle_velocities = [0] + [knee_angles[i] - knee_angles[i-1]
-                                  for i in range(1, len(knee_angles))]
+        angle_velocities = KeyframeDetector._angular_velocities(frames_data, knee_angles)
 
         # 找到从负到正的转折点
         for i in range(1, len(angle_velocities) - 1):
@@ -625,7 +701,7 @@ class KeyframeDetector:
             return {
                 "index": idx,
                 "frame_data": frames_data[idx],
-                "description": f"腿部伸展最快（{positive_velocities[idx]:.1f}°/帧）"
+                "description": f"腿部伸展最快（{positive_velocities[idx]:.1f}°/秒）"
             }
 
         return None
@@ -647,8 +723,7 @@ class KeyframeDetector:
             wrist_velocities.append(
                 f.get("velocities", {}).get("right_wrist", 0))
 
-        elbow_velocities = [0] + [elbow_angles[i] - elbow_angles[i-1]
-                                  for i in range(1, len(elbow_angles))]
+        elbow_velocities = KeyframeDetector._angular_velocities(frames_data, elbow_angles)
 
         for i in range(search_after, len(frames_data)):
             score = 0
@@ -657,7 +732,7 @@ class KeyframeDetector:
             score += (1 - wrist_heights[i]) * 40
 
             # 肘关节快速伸展
-            elbow_extension_score = max(0, elbow_velocities[i] * 3.5)
+            elbow_extension_score = max(0, elbow_velocities[i] * 3.5 * REFERENCE_SAMPLE_INTERVAL)
             score += min(elbow_extension_score, 35)
 
             # 手腕仍在上升
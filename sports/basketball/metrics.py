@@ -46,7 +46,8 @@ class BasketballMetrics:
         return float(angle_deg)
 
     @staticmethod
-    def calculate_velocity(positions: List[Dict], fps: float, smoothing: int = 3) -> List[float]:
+    def calculate_velocity(positions: List[Dict], fps: float, smoothing: int = 3,
+                           timestamps: Optional[List[float]] = None) -> List[float]:
         """
         计算关节点的速度
 
@@ -54,6 +55,8 @@ class BasketballMetrics:
             positions: 关节点位置列表（每帧的位置）
             fps: 视频帧率
             smoothing: 平滑窗口大小
+            timestamps: 各位置对应的时间戳（秒）；提供时按实际时间间隔计算，
+                适用于按间隔或非均匀采样的帧
 
         Returns:
             速度列表（像素/秒）
@@ -69,7 +72,8 @@ class BasketballMetrics:
                     dx = positions[i]["x_pixel"] - positions[i-1]["x_pixel"]
                     dy = positions[i]["y_pixel"] - positions[i-1]["y_pixel"]
                     distance = np.sqrt(dx**2 + dy**2)
-                    velocity = distance * fps  # 像素/秒
+                    velocity = distance / BasketballMetrics._time_step(
+                        timestamps, i, fps)  # 像素/秒
                     velocities.append(velocity)
                 except (KeyError, TypeError):
                     velocities.append(0.0)
@@ -84,13 +88,15 @@ class BasketballMetrics:
         return velocities
 
     @staticmethod
-    def calculate_acceleration(velocities: List[float], fps: float) -> List[float]:
+    def calculate_acceleration(velocities: List[float], fps: float,
+                               timestamps: Optional[List[float]] = None) -> List[float]:
         """
         计算加速度
 
         Args:
             velocities: 速度列表
             fps: 视频帧率
+            timestamps: 各速度对应的时间戳（秒）；提供时按实际时间间隔计算
 
         Returns:
             加速度列表（像素/秒²）
@@ -102,11 +108,20 @@ class BasketballMetrics:
 
         for i in range(1, len(velocities)):
             dv = velocities[i] - velocities[i-1]
-            acceleration = dv * fps
+            acceleration = dv / BasketballMetrics._time_step(timestamps, i, fps)
             accelerations.append(acceleration)
 
         return accelerations
 
+    @staticmethod
+    def _time_step(timestamps: Optional[List[float]], i: int, fps: float) -> float:
+        """第 i-1 帧到第 i 帧的时间间隔（秒），无时间戳时按相邻视频帧计算"""
+        if timestamps is not None:
+            dt = timestamps[i] - timestamps[i-1]
+            if dt > 0:
+                return dt
+        return 1.0 / fps if fps > 0 else 1.0
+
     @staticmethod
     def calculate_center_of_mass(landmarks: Dict) -> Optional[Dict]:
         """
@@ -321,7 +336,8 @@ class BasketballMetrics:
             next_frame = next_kf.get('index', 0)
 
             duration_frames = next_frame - current_frame
-            duration_seconds = duration_frames / fps if fps > 0 else 0
+            duration_seconds = (BasketballMetrics._keyframe_time(next_kf, fps) -
+                                BasketballMetrics._keyframe_time(current_kf, fps))
 
             phase_name = f"{current_name}_to_{next_name}"
             phase_durations[phase_name] = {
@@ -335,9 +351,8 @@ class BasketballMetrics:
 
         # 计算总时长
         if sorted_keyframes:
-            first_frame = sorted_keyframes[0][1].get('index', 0)
-            last_frame = sorted_keyframes[-1][1].get('index', 0)
-            total_duration = (last_frame - first_frame) / fps if fps > 0 else 0
+            total_duration = (BasketballMetrics._keyframe_time(sorted_keyframes[-1][1], fps) -
+                              BasketballMetrics._keyframe_time(sorted_keyframes[0][1], fps))
         else:
             total_duration = 0
 
@@ -358,27 +373,27 @@ class BasketballMetrics:
 
         # 预备阶段：从球最低点到下蹲最深
         if ball_lowest_kf and squat_kf:
-            prep_duration = (squat_kf['index'] - ball_lowest_kf['index']) / fps
+            prep_duration = (BasketballMetrics._keyframe_time(squat_kf, fps) -
+                             BasketballMetrics._keyframe_time(ball_lowest_kf, fps))
             key_phases['preparation'] = prep_duration
 
         # 发力阶段：从下蹲最深到出手瞬间
         if squat_kf and release_kf:
-            power_duration = (release_kf['index'] - squat_kf['index']) / fps
+            power_duration = (BasketballMetrics._keyframe_time(release_kf, fps) -
+                              BasketballMetrics._keyframe_time(squat_kf, fps))
             key_phases['power_phase'] = power_duration
 
         # 跟随阶段：从出手瞬间到随球完成
         if release_kf and followthrough_kf:
-            follow_duration = (
-                followthrough_kf['index'] - release_kf['index']) / fps
+            follow_duration = (BasketballMetrics._keyframe_time(followthrough_kf, fps) -
+                               BasketballMetrics._keyframe_time(release_kf, fps))
             key_phases['follow_through'] = follow_duration
 
         # 计算从球最低点开始的总时长
         shooting_duration = 0
         if ball_lowest_kf and sorted_keyframes:
-            ball_lowest_frame = ball_lowest_kf.get('index', 0)
-            last_frame = sorted_keyframes[-1][1].get('index', 0)
-            shooting_duration = (
-                last_frame - ball_lowest_frame) / fps if fps > 0 else 0
+            shooting_duration = (BasketballMetrics._keyframe_time(sorted_keyframes[-1][1], fps) -
+                                 BasketballMetrics._keyframe_time(ball_lowest_kf, fps))
 
         return {
             'phase_durations': phase_durations,
@@ -391,6 +406,21 @@ class BasketballMetrics:
             'analysis_start': 'ball_lowest' if ball_lowest_kf else 'first_keyframe'
         }
 
+    @staticmethod
+    def _keyframe_time(keyframe: Dict, fps: float) -> float:
+        """
+        关键帧在原视频中的时间（秒）
+
+        帧序列可能按间隔或非均匀采样，优先使用帧数据中的精确时间戳，
+        缺失时才按帧索引和帧率估算。
+        """
+        frame_data = keyframe.get('frame_data') or {}
+        if 'timestamp' in frame_data:
+            return frame_data['timestamp']
+        if 'timestamp' in keyframe:
+            return keyframe['timestamp']
+        return keyframe.get('index', 0) / fps if fps > 0 else 0
+
     @staticmethod
     def detect_force_sequence(frames_data: List[Dict], fps: float, keyframes: Dict = None) -> Dict:
         """
@@ -428,10 +458,12 @@ class BasketballMetrics:
             end_frame = keyframes['release_point'].get(
                 'index', len(frames_data))
 
-        # 定义"显著运动"的速度阈值（像素/帧）
+        # 定义"显著运动"的阈值：速度为像素/秒，加速度为按实际采样间隔计算的 dv/dt（像素/秒²）
         # 改用加速度来检测运动启动：当加速度首次显著增加时
-        movement_threshold = 20.0  # 速度阈值
-        acceleration_threshold = 50.0  # 加速度阈值
+        # （与改为按实际时间间隔计算速度之前的阈值 20 / 50 在默认参数下等价：
+        #   旧速度按"每个采样间隔 = 1 帧"计算，放大了 frame_interval=5 倍；30fps 时采样间隔为 1/6 秒）
+        movement_threshold = 4.0  # 速度阈值
+        acceleration_threshold = 60.0  # 加速度阈值
 
         # 检测每个关节的首次显著运动时刻
         # 策略：检测速度从相对静止状态开始显著增加的时刻
@@ -456,16 +488,20 @@ class BasketballMetrics:
                 frame_idx, current_vel = velocities[idx]
                 prev_frame_idx, prev_vel = velocities[idx - 1]
 
-                # 计算速度增量（加速度的近似）
-                vel_increase = current_vel - prev_vel
+                # 按两个采样的实际时间间隔计算加速度（自适应采样时间隔不均匀）
+                dt = BasketballMetrics._time_step(
+                    [frames_data[prev_frame_idx].get('timestamp', prev_frame_idx / fps if fps > 0 else 0),
+                     frames_data[frame_idx].get('timestamp', frame_idx / fps if fps > 0 else 0)],
+                    1, fps)
+                acceleration = (current_vel - prev_vel) / dt
 
                 # 如果速度显著增加（加速），且当前速度超过基本阈值
-                if vel_increase >= acceleration_threshold and current_vel >= movement_threshold:
+                if acceleration >= acceleration_threshold and current_vel >= movement_threshold:
                     initiation_times[joint] = {
                         'frame': frame_idx,
-                        'time': frame_idx / fps if fps > 0 else 0,
+                        'time': frames_data[frame_idx].get('timestamp', frame_idx / fps if fps > 0 else 0),
                         'velocity': current_vel,
-                        'acceleration': vel_increase
+                        'acceleration': acceleration
                     }
                     break  # 找到首次显著加速，停止搜索该关节
 
@@ -485,7 +521,7 @@ class BasketballMetrics:
                     if vel >= threshold_vel:
                         initiation_times[joint] = {
                             'frame': frame_idx,
-                            'time': frame_idx / fps if fps > 0 else 0,
+                            'time': frames_data[frame_idx].get('timestamp', frame_idx / fps if fps > 0 else 0),
                             'velocity': vel,
                             'acceleration': 0.0  # 备用方案，没有加速度数据
                         }
@@ -518,15 +554,15 @@ class BasketballMetrics:
                 current_joint = actual_sequence[i]
                 next_joint = actual_sequence[i + 1]
 
-                current_time = initiation_times[current_joint]['frame']
-                next_time = initiation_times[next_joint]['frame']
+                current_time = initiation_times[current_joint]['time']
+                next_time = initiation_times[next_joint]['time']
 
-                time_diff = (next_time - current_time) / fps if fps > 0 else 0
                 time_intervals.append({
                     'from': current_joint,
                     'to': next_joint,
-                    'time_diff_seconds': time_diff,
-                    'frame_diff': next_time - current_time
+                    'time_diff_seconds': next_time - current_time,
+                    'frame_diff': (initiation_times[next_joint]['frame'] -
+                                   initiation_times[current_joint]['frame'])
                 })
 
         return {
@@ -600,7 +636,7 @@ class BasketballMetrics:
                 frame2 = initiation_times[j2]['frame']
 
                 frame_diff = frame2 - frame1
-                time_diff = frame_diff / fps if fps > 0 else 0
+                time_diff = initiation_times[j2]['time'] - initiation_times[j1]['time']
 
                 # 判断谁先启动
                 if frame_diff > 0:
@@ -0,0 +1,348 @@
+"""
+分析重算模块
+基于 analysis_data.json 中保存的逐帧关节点，重新计算角度、运动学、关键帧、节奏、
+发力顺序和能量传递，不读取视频、不运行姿态检测。算法或配置升级后可用进程池
+批量更新全部历史分析。
+
+说明：
+- 数据文件只保存关节点像素坐标，归一化坐标按 frame_size（旧文件取 metadata.json
+  中的视频尺寸）还原；可见度和深度未保存，分别按 1.0 和 0.0 处理（指标计算不使用这两项）
+- 不做关键帧逐帧精细化（需要解码视频）；位置未变的关键帧沿用原图片，位置变化的关键帧
+  从报表目录中的视频重新截取图片，没有视频时删除过期图片并标记 image_missing
+"""
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.data_manager import DataManager, ANALYSIS_SCHEMA_VERSION
+from core.report_generator import ReportGenerator
+from core.instrumentation import StageProfiler
+from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+from config import BASKETBALL_SHOT_CONFIG, OUTPUT_DIR, CACHE_DIR, ASSET_STORE_DIR
+
+# 报表目录中可作为报表视频的文件扩展名
+_VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+
+def frames_from_analysis_data(json_data: Dict, frame_width: int, frame_height: int) -> List[Dict]:
+    """
+    由 analysis_data.json 的帧数据还原分析器输入
+
+    返回的帧带 cached_pose 字段，BasketballShotAnalyzer 直接使用而不再推理。
+
+    Args:
+        json_data: 分析数据
+        frame_width: 关节点像素坐标所在的帧宽度
+        frame_height: 关节点像素坐标所在的帧高度
+
+    Returns:
+        帧信息列表
+    """
+    frames = []
+    for frame in json_data.get("frames", []):
+        timestamp = frame.get("timestamp", 0.0)
+        frame_info = {
+            "frame_number": frame["frame_number"],
+            "timestamp": timestamp,
+            "timestamp_formatted": f"{int(timestamp // 60):02d}:{timestamp % 60:06.3f}",
+            "cached_pose": None
+        }
+
+        if frame.get("pose_detected") and frame.get("landmarks"):
+            landmarks = {}
+            for name, point in frame["landmarks"].items():
+                if point.get("x") is None or point.get("y") is None:
+                    continue
+                landmarks[name] = {
+                    "x": point["x"] / frame_width,
+                    "y": point["y"] / frame_height,
+                    "z": 0.0,
+                    "visibility": 1.0,
+                    "x_pixel": point["x"],
+                    "y_pixel": point["y"]
+                }
+            frame_info["cached_pose"] = {
+                "landmarks": landmarks,
+                "image_width": frame_width,
+                "image_height": frame_height
+            }
+
+        frames.append(frame_info)
+
+    return frames
+
+
+def reprocess_analysis(analysis_dir: str, config: Dict = None,
+                       regenerate_report: bool = True) -> Dict:
+    """
+    重新计算单个分析目录的全部指标，原地覆盖数据文件
+
+    Args:
+        analysis_dir: 分析输出目录（包含 data/analysis_data.json）
+        config: 配置字典，默认使用全局配置
+        regenerate_report: 报表目录存在时是否重新生成报表
+
+    Returns:
+        重算摘要 {analysis_dir, status, frames, keyframe_count, moved_keyframes, report_path,
+        elapsed, stages}
+    """
+    start_time = time.perf_counter()
+    config = config or BASKETBALL_SHOT_CONFIG
+
+    data_path = os.path.join(analysis_dir, "data", "analysis_data.json")
+    metadata_path = os.path.join(analysis_dir, "metadata.json")
+
+    with open(data_path, "r", encoding="utf-8") as f:
+        json_data = json.load(f)
+
+    metadata = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    frame_size = _frame_size(json_data, metadata)
+    if frame_size is None:
+        raise ValueError(f"缺少帧尺寸信息，无法还原归一化坐标: {analysis_dir}")
+
+    frames = frames_from_analysis_data(json_data, *frame_size)
+
+    # 重新计算（全部帧来自已保存的关节点，不加载姿态模型）
+    profiler = StageProfiler()
+    analyzer = BasketballShotAnalyzer(config, profiler=profiler)
+    analysis_results = analyzer.analyze_frames(frames, json_data["fps"])
+    keyframes = analysis_results["keyframes"]
+
+    # 位置未变的关键帧沿用原图片，位置变化的重新截取
+    old_keyframes = json_data.get("keyframes", {})
+    moved_keyframes = []
+    for kf_name, kf_info in keyframes.items():
+        old_info = old_keyframes.get(kf_name)
+        old_number = _keyframe_frame_number(old_info, json_data.get("frames", []))
+        if old_info is not None and old_number == kf_info["frame_data"]["frame_number"]:
+            kf_info["filename"] = old_info.get("filename", "")
+            kf_info["image_path"] = old_info.get("image_path", "")
+        else:
+            moved_keyframes.append(kf_name)
+    if moved_keyframes:
+        with profiler.stage("keyframe_images", len(moved_keyframes)):
+            _update_moved_keyframe_images(analysis_dir, metadata, keyframes, moved_keyframes)
+
+    # 覆盖数据文件
+    with profiler.stage("export", len(frames)):
+        data_manager = DataManager()
+        data_manager.create_dataframes(analysis_results, analyzer.get_time_series())
+        data_manager.export_to_csv(os.path.join(analysis_dir, "data"))
+        data_manager.export_to_json(analysis_results, data_path)
+
+    if metadata:
+        metadata.update({
+            "keyframe_count": len(keyframes),
+            "refine_keyframes": False,
+            "reprocessed_at": datetime.now().isoformat(),
+            "schema_version": ANALYSIS_SCHEMA_VERSION
+        })
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    report_path = None
+    if regenerate_report:
+        with profiler.stage("report"):
+            report_path = _regenerate_report(analysis_results, analysis_dir, metadata)
+
+    return {
+        "analysis_dir": analysis_dir,
+        "analysis_id": metadata.get("analysis_id", os.path.basename(analysis_dir)),
+        "status": "completed",
+        "frames": len(frames),
+        "keyframe_count": len(keyframes),
+        "moved_keyframes": moved_keyframes,
+        "report_path": report_path,
+        "elapsed": round(time.perf_counter() - start_time, 3),
+        "stages": profiler.summary()
+    }
+
+
+def find_analysis_dirs(root_dir: str = OUTPUT_DIR) -> List[str]:
+    """
+    查找根目录下所有可重算的分析目录（包含 data/analysis_data.json）
+
+    Args:
+        root_dir: 搜索根目录
+
+    Returns:
+        按路径排序的分析目录列表
+    """
+    skip_dirs = {os.path.abspath(CACHE_DIR), os.path.abspath(ASSET_STORE_DIR)}
+    analysis_dirs = []
+
+    for current_dir, dirs, _ in os.walk(root_dir):
+        dirs[:] = [d for d in dirs
+                   if os.path.abspath(os.path.join(current_dir, d)) not in skip_dirs]
+        if os.path.exists(os.path.join(current_dir, "data", "analysis_data.json")):
+            analysis_dirs.append(current_dir)
+            # 分析目录下的 data/keyframes 等子目录不再搜索（训练课的 shot_NN 除外）
+            dirs[:] = [d for d in dirs if d.startswith("shot_")]
+
+    return sorted(analysis_dirs)
+
+
+def reprocess_all(analysis_dirs: List[str], max_workers: Optional[int] = None,
+                  regenerate_report: bool = True,
+                  progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict:
+    """
+    用进程池批量重算多个分析目录（单个目录失败不影响其他目录）
+
+    Args:
+        analysis_dirs: 分析目录列表
+        max_workers: 进程数，默认为 CPU 核数
+        regenerate_report: 是否重新生成报表
+        progress_callback: 进度回调函数 callback(progress: int, message: str)
+
+    Returns:
+        汇总 {total, completed, failed, elapsed, results}
+    """
+    start_time = time.perf_counter()
+    results = []
+
+    if analysis_dirs:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_reprocess_worker, analysis_dir, regenerate_report)
+                       for analysis_dir in analysis_dirs]
+            for completed, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if progress_callback:
+                    progress_callback(int(100 * completed / len(futures)),
+                                      f'已重算 {completed}/{len(futures)} 个分析')
+
+    results.sort(key=lambda item: item["analysis_dir"])
+    completed_count = sum(1 for item in results if item["status"] == "completed")
+
+    return {
+        "total": len(results),
+        "completed": completed_count,
+        "failed": len(results) - completed_count,
+        "elapsed": round(time.perf_counter() - start_time, 3),
+        "results": results
+    }
+
+
+def _reprocess_worker(analysis_dir: str, regenerate_report: bool) -> Dict:
+    """进程池任务：重算单个目录，异常转换为失败记录"""
+    try:
+        return reprocess_analysis(analysis_dir, regenerate_report=regenerate_report)
+    except Exception as e:
+        return {
+            "analysis_dir": analysis_dir,
+            "analysis_id": os.path.basename(analysis_dir),
+            "status": "failed",
+            "error": str(e)
+        }
+
+
+def _frame_size(json_data: Dict, metadata: Dict) -> Optional[Tuple[int, int]]:
+    """关节点像素坐标所在的帧尺寸（数据文件优先，其次清单中的视频信息）"""
+    if json_data.get("frame_size"):
+        width, height = json_data["frame_size"]
+        return int(width), int(height)
+
+    video_info = metadata.get("video_info") or {}
+    if video_info.get("width") and video_info.get("height"):
+        return int(video_info["width"]), int(video_info["height"])
+
+    return None
+
+
+def _keyframe_frame_number(kf_info: Optional[Dict], frames: List[Dict]) -> Optional[int]:
+    """数据文件中关键帧对应的帧号（精细化关键帧单独记录帧号）"""
+    if not kf_info:
+        return None
+    if kf_info.get("frame_number") is not None:
+        return kf_info["frame_number"]
+    index = kf_info.get("index")
+    if isinstance(index, int) and 0 <= index < len(frames):
+        return frames[index].get("frame_number")
+    return None
+
+
+def _report_video(analysis_dir: str, metadata: Dict) -> Optional[str]:
+    """报表目录中的视频文件（清单中的文件名优先）"""
+    reports_dir = os.path.join(analysis_dir, "reports")
+    if not os.path.isdir(reports_dir):
+        return None
+
+    video_file = metadata.get("video_file")
+    if video_file and os.path.exists(os.path.join(reports_dir, video_file)):
+        return os.path.join(reports_dir, video_file)
+    for filename in sorted(os.listdir(reports_dir)):
+        if filename.lower().endswith(_VIDEO_EXTENSIONS):
+            return os.path.join(reports_dir, filename)
+    return None
+
+
+def _update_moved_keyframe_images(analysis_dir: str, metadata: Dict, keyframes: Dict,
+                                  moved_keyframes: List[str]):
+    """
+    为位置变化的关键帧重新截取图片（报表按 keyframes/keyframe_<名称>.jpg 引用图片）
+
+    报表目录中有视频时按新帧号解码原分辨率帧写入；否则删除过期图片并标记 image_missing，
+    避免报表把旧位置的图片当作新关键帧展示。
+    """
+    keyframes_dir = os.path.join(analysis_dir, "keyframes")
+    stale_dirs = [keyframes_dir, os.path.join(analysis_dir, "reports", "keyframes")]
+
+    processor = None
+    video_path = _report_video(analysis_dir, metadata)
+    if video_path is not None:
+        from core.video_processor import VideoProcessor
+        try:
+            processor = VideoProcessor(video_path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 无法打开报表视频，关键帧图片将标记为缺失: {e}")
+
+    try:
+        for kf_name in moved_keyframes:
+            kf_info = keyframes[kf_name]
+            kf_filename = f"keyframe_{kf_name}.jpg"
+            image = None
+            if processor is not None:
+                image = processor.get_frame_at_index(kf_info["frame_data"]["frame_number"])
+
+            if image is not None:
+                os.makedirs(keyframes_dir, exist_ok=True)
+                image_path = os.path.join(keyframes_dir, kf_filename)
+                processor.save_frame(image, image_path)
+                kf_info["filename"] = kf_filename
+                kf_info["image_path"] = image_path
+                continue
+
+            for stale_dir in stale_dirs:
+                stale_path = os.path.join(stale_dir, kf_filename)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            kf_info["image_missing"] = True
+    finally:
+        if processor is not None:
+            processor.cap.release()
+
+
+def _regenerate_report(analysis_results: Dict, analysis_dir: str, metadata: Dict) -> Optional[str]:
+    """报表目录中存在视频文件时重新生成报表（沿用原报表的数据模式）"""
+    reports_dir = os.path.join(analysis_dir, "reports")
+    if not os.path.isdir(reports_dir):
+        return None
+
+    video_path = _report_video(analysis_dir, metadata)
+    if video_path is None:
+        print(f"⚠️ 报表目录中没有视频文件，跳过报表重新生成: {reports_dir}")
+        return None
+
+    data_mode = "external" if os.path.isdir(os.path.join(reports_dir, "series")) else "inline"
+    report_generator = ReportGenerator(data_mode=data_mode)
+    return report_generator.generate_report(
+        analysis_results=analysis_results,
+        video_path=video_path,
+        output_dir=reports_dir
+    )
@@ -0,0 +1,298 @@
+"""
+训练课分析器
+对包含多次投篮的长视频进行分段，并行分析每一次投篮，再汇总训练课整体指标
+
+流程：
+1. 低成本扫描：按较大间隔、在缩小后的帧上用轻量模型检测姿态，得到手腕和重心时序
+2. 分段：ShotSegmenter 将时序切分为逐次投篮的时间窗口
+3. 并行分析：每个窗口由独立的 BasketballShotAnalyzer 完整分析（各线程使用独立的
+   视频读取器和姿态检测器），得到该次投篮的关键帧和各项指标
+4. 汇总：统计各次投篮标量指标的均值、标准差、最小值和最大值
+"""
+import os
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+from tqdm import tqdm
+
+from core.video_processor import VideoProcessor
+from core.pose_backends import create_pose_backend
+from core.data_manager import DataManager
+from sports.basketball.metrics import BasketballMetrics
+from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+from sports.basketball.shot_segmenter import ShotSegmenter
+from config import BASKETBALL_SHOT_CONFIG
+
+
+class SessionAnalyzer:
+    """训练课（多次投篮）分析器"""
+
+    def __init__(self, config: Dict = None, max_workers: Optional[int] = None):
+        """
+        初始化训练课分析器
+
+        Args:
+            config: 配置字典，默认使用全局配置
+            max_workers: 并行分析的投篮数，默认取配置
+        """
+        self.config = config or BASKETBALL_SHOT_CONFIG
+        self.segment_config = self.config.get("session_segmentation", {})
+        self.max_workers = max_workers or self.segment_config.get("max_workers", 4)
+
+    def analyze(self, video_path: str, frame_interval: int = None,
+                output_dir: Optional[str] = None,
+                progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict:
+        """
+        分析训练课视频
+
+        Args:
+            video_path: 视频文件路径
+            frame_interval: 单次投篮分析的帧间隔，默认取配置
+            output_dir: 输出目录（提供时保存每次投篮的关键帧图片、数据文件和训练课汇总）
+            progress_callback: 进度回调函数 callback(progress: int, message: str)
+
+        Returns:
+            训练课结果字典，包含 video_info、shots（每次投篮的窗口和分析结果）和 session（汇总）
+        """
+        frame_interval = frame_interval or self.config.get("frame_interval", 5)
+
+        processor = VideoProcessor(video_path)
+        video_info = processor.get_video_info()
+
+        # 1. 低成本扫描
+        if progress_callback:
+            progress_callback(5, '扫描手腕和重心轨迹...')
+        series = self._scan_series(processor)
+
+        # 2. 分段
+        windows = ShotSegmenter.segment(
+            series,
+            raise_margin=self.segment_config.get("raise_margin", 0.03),
+            merge_gap_seconds=self.segment_config.get("merge_gap_seconds", 0.6),
+            lead_seconds=self.segment_config.get("lead_seconds", 2.5),
+            follow_seconds=self.segment_config.get("follow_seconds", 1.0),
+            padding_seconds=self.segment_config.get("padding_seconds", 0.3)
+        )
+        print(f"✓ 检测到 {len(windows)} 次投篮")
+        if progress_callback:
+            progress_callback(20, f'检测到 {len(windows)} 次投篮，开始逐次分析...')
+
+        # 3. 并行分析各次投篮
+        shots = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._analyze_shot, video_path, window,
+                                       frame_interval, output_dir)
+                       for window in windows]
+            for completed, future in enumerate(as_completed(futures), start=1):
+                shots.append(future.result())
+                if progress_callback:
+                    progress_callback(20 + int(75 * completed / len(futures)),
+                                      f'已完成 {completed}/{len(futures)} 次投篮分析')
+
+        shots.sort(key=lambda shot: shot["window"]["shot_index"])
+
+        # 4. 汇总
+        session = self.aggregate(shots, video_info["duration"])
+        result = {
+            "video_info": video_info,
+            "frame_interval": frame_interval,
+            "shots": shots,
+            "session": session
+        }
+
+        if output_dir:
+            self._save_summary(result, output_dir)
+
+        if progress_callback:
+            progress_callback(100, '训练课分析完成')
+
+        return result
+
+    def _scan_series(self, processor: VideoProcessor) -> Dict[str, np.ndarray]:
+        """
+        低成本扫描整段视频，得到手腕、肩部和重心的归一化 y 坐标时序
+
+        使用配置的姿态检测后端（MediaPipe 时使用最轻量的模型），并在缩小后的帧上检测
+        （归一化坐标不受缩放影响）。
+        """
+        scan_interval = max(1, int(round(
+            processor.fps * self.segment_config.get("scan_interval_seconds", 0.1))))
+        scan_width = self.segment_config.get("scan_width", 320)
+
+        detector = create_pose_backend({
+            **self.config,
+            "mediapipe": {**self.config.get("mediapipe", {}), "model_complexity": 0,
+                          "roi_tracking": False}
+        })
+        frame_numbers, timestamps = [], []
+        wrist_y, shoulder_y, com_y = [], [], []
+
+        total = processor.frame_count // scan_interval + 1
+        for frame_idx, frame in tqdm(processor.iter_frames(scan_interval),
+                                     total=total, desc="扫描投篮"):
+            if frame.shape[1] > scan_width:
+                frame = processor.resize_frame(frame, width=scan_width)
+
+            pose_result = detector.detect_frame({
+                "frame_number": frame_idx,
+                "timestamp": frame_idx / processor.fps,
+                "image": frame
+            })
+            landmarks = pose_result["landmarks"] if pose_result else {}
+            wrist = landmarks.get("right_wrist")
+            shoulder = landmarks.get("right_shoulder")
+            center_of_mass = BasketballMetrics.calculate_center_of_mass(
+                landmarks) if landmarks else None
+
+            frame_numbers.append(frame_idx)
+            timestamps.append(frame_idx / processor.fps)
+            wrist_y.append(wrist["y"] if wrist else np.nan)
+            shoulder_y.append(shoulder["y"] if shoulder else np.nan)
+            com_y.append(center_of_mass["y"] if center_of_mass else np.nan)
+
+        return {
+            "frame_number": np.asarray(frame_numbers, dtype=np.int64),
+            "timestamp": np.asarray(timestamps, dtype=float),
+            "wrist_y": np.asarray(wrist_y, dtype=float),
+            "shoulder_y": np.asarray(shoulder_y, dtype=float),
+            "com_y": np.asarray(com_y, dtype=float)
+        }
+
+    def _analyze_shot(self, video_path: str, window: Dict, frame_interval: int,
+                      output_dir: Optional[str]) -> Dict:
+        """
+        完整分析单次投篮窗口（在工作线程中运行）
+
+        Returns:
+            {window, status, analysis_results | error}；analysis_results 中不含图像数据
+        """
+        shot_index = window["shot_index"]
+        try:
+            processor = VideoProcessor(
+                video_path,
+                max_inference_dimension=self.config.get("max_inference_dimension"))
+            frames_data = processor.read_frame_range(
+                window["start_frame"], window["end_frame"], step=frame_interval)
+
+            analyzer = BasketballShotAnalyzer(self.config)
+            analysis_results = analyzer.analyze_frames(frames_data, processor.fps)
+
+            if output_dir:
+                shot_dir = os.path.join(output_dir, f"shot_{shot_index + 1:02d}")
+                analyzer.save_keyframe_images(
+                    os.path.join(shot_dir, "keyframes"), analysis_results["keyframes"], processor)
+                DataManager().export_to_json(
+                    analysis_results, os.path.join(shot_dir, "data", "analysis_data.json"))
+        except Exception as e:
+            # 单次投篮失败（解码、检测、写文件等任何错误）只影响这一个窗口，整节训练照常汇总
+            print(f"⚠️  第{shot_index + 1}次投篮分析失败: {e}")
+            return {"window": window, "status": "failed", "error": str(e)}
+
+        # 释放图像数据，长训练课可能包含数十次投篮
+        for frame in analysis_results["frames"]:
+            for key in ("image", "annotated_image", "pose_result"):
+                frame.pop(key, None)
+        for kf_info in analysis_results["keyframes"].values():
+            for key in ("image", "annotated_image", "pose_result"):
+                kf_info["frame_data"].pop(key, None)
+
+        return {"window": window, "status": "completed", "analysis_results": analysis_results}
+
+    @staticmethod
+    def shot_metrics(analysis_results: Dict) -> Dict[str, float]:
+        """
+        提取单次投篮的标量指标（用于训练课汇总）
+
+        Args:
+            analysis_results: 单次投篮分析结果
+
+        Returns:
+            指标名 -> 数值
+        """
+        metrics = {}
+        rhythm = analysis_results.get("rhythm_analysis", {})
+
+        for key in ("shooting_duration", "rhythm_consistency"):
+            if rhythm.get(key) is not None:
+                metrics[key] = float(rhythm[key])
+        for phase, duration in rhythm.get("key_phases", {}).items():
+            metrics[f"{phase}_duration"] = float(duration)
+
+        velocity_ratio = analysis_results.get("energy_transfer", {}).get("velocity_ratio")
+        if velocity_ratio is not None:
+            metrics["velocity_ratio"] = float(velocity_ratio)
+
+        # 关键时刻的关节角度
+        keyframes = analysis_results.get("keyframes", {})
+        for kf_name in ("squat_deepest", "release"):
+            if kf_name in keyframes:
+                for angle_name, value in keyframes[kf_name]["frame_data"].get("angles", {}).items():
+                    if value is not None:
+                        metrics[f"{kf_name}_{angle_name}"] = float(value)
+
+        return metrics
+
+    @staticmethod
+    def aggregate(shots: List[Dict], duration: float) -> Dict:
+        """
+        汇总训练课指标
+
+        Args:
+            shots: 各次投篮结果
+            duration: 视频时长（秒）
+
+        Returns:
+            训练课汇总：投篮次数、每分钟投篮数及各指标的统计量
+        """
+        completed = [shot for shot in shots if shot["status"] == "completed"]
+
+        values: Dict[str, List[float]] = {}
+        for shot in completed:
+            for name, value in SessionAnalyzer.shot_metrics(shot["analysis_results"]).items():
+                values.setdefault(name, []).append(value)
+
+        metrics = {}
+        for name, series in values.items():
+            array = np.asarray(series, dtype=float)
+            metrics[name] = {
+                "mean": float(array.mean()),
+                "std": float(array.std()),
+                "min": float(array.min()),
+                "max": float(array.max()),
+                "count": int(array.size)
+            }
+
+        return {
+            "shot_count": len(shots),
+            "analyzed_count": len(completed),
+            "failed_count": len(shots) - len(completed),
+            "shots_per_minute": len(shots) / (duration / 60) if duration > 0 else 0.0,
+            "metrics": metrics
+        }
+
+    @staticmethod
+    def _save_summary(result: Dict, output_dir: str):
+        """保存训练课汇总（每次投篮只记录窗口、状态和标量指标，完整数据见各投篮目录）"""
+        summary = {
+            "video_info": result["video_info"],
+            "frame_interval": result["frame_interval"],
+            "session": result["session"],
+            "shots": []
+        }
+        for shot in result["shots"]:
+            entry = {"window": shot["window"], "status": shot["status"]}
+            if shot["status"] == "completed":
+                shot_index = shot["window"]["shot_index"]
+                entry["data_file"] = os.path.join(
+                    f"shot_{shot_index + 1:02d}", "data", "analysis_data.json")
+                entry["metrics"] = SessionAnalyzer.shot_metrics(shot["analysis_results"])
+            else:
+                entry["error"] = shot.get("error", "")
+            summary["shots"].append(entry)
+
+        os.makedirs(output_dir, exist_ok=True)
+        summary_path = os.path.join(output_dir, "session_summary.json")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"✓ 训练课汇总已保存到: {summary_path}")
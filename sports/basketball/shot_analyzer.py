@@ -5,10 +5,10 @@
 import numpy as np
 from typing import List, Dict, Optional
 import os
-import cv2
-from tqdm import tqdm
 
-from core.pose_detector import PoseDetector
+from core.pose_backends import PoseBackend, create_pose_backend, draw_custom_landmarks
+from core.instrumentation import StageProfiler, maybe_stage
+from core.data_manager import DataManager
 from sports.basketball.metrics import BasketballMetrics
 from config import BASKETBALL_SHOT_CONFIG
 
@@ -16,113 +16,99 @@ from config import BASKETBALL_SHOT_CONFIG
 class BasketballShotAnalyzer:
     """篮球投篮分析器"""
 
-    def __init__(self, config: Dict = None):
+    def __init__(self, config: Dict = None, profiler: Optional[StageProfiler] = None,
+                 pose_backend: Optional[PoseBackend] = None):
         """
         初始化分析器
 
         Args:
             config: 配置字典，默认使用全局配置
+            profiler: 阶段性能记录器（可选，记录 pose / kinematics / keyframes / annotate 阶段）
+            pose_backend: 姿态检测后端，默认按配置中的 pose_backend 创建
         """
         self.config = config or BASKETBALL_SHOT_CONFIG
+        self.profiler = profiler
 
-        # 初始化姿态检测器
-        mp_config = self.config.get("mediapipe", {})
-        self.pose_detector = PoseDetector(**mp_config)
+        # 姿态检测后端在首次使用时创建（全部帧命中关节点缓存时无需加载模型）
+        self._pose_backend: Optional[PoseBackend] = pose_backend
 
         # 指标计算器
         self.metrics = BasketballMetrics()
 
         # 分析结果
         self.frames_data = []
+        self.dense_frames = []  # 关键帧精细化时额外检测的逐帧结果
         self.analysis_results = {}
-
-    def analyze_frames(self, frames_data: List[Dict], fps: float) -> Dict:
+        self.time_series = {}
+
+    @property
+    def pose_backend(self) -> PoseBackend:
+        """姿态检测后端（延迟创建）"""
+        if self._pose_backend is None:
+            self._pose_backend = create_pose_backend(self.config)
+        return self._pose_backend
+
+    def analyze_frames(self, frames_data: List[Dict], fps: float,
+                       video_processor=None,
+                       dense_frames: Optional[Dict[int, Dict]] = None) -> Dict:
         """
         分析提取的视频帧
 
         Args:
-            frames_data: 帧数据列表（来自VideoProcessor）
+            frames_data: 帧数据列表（来自VideoProcessor，或 LandmarkCache 还原的
+                带 cached_pose 的帧，后者不再推理）
             fps: 视频帧率
+            video_processor: 视频处理器；提供时对关键帧做逐帧精细化
+                （第一遍按粗间隔检测，第二遍只重新解码候选关键帧附近的帧）
+            dense_frames: 帧号 -> 缓存的逐帧检测结果，精细化时优先使用
 
         Returns:
             分析结果字典
         """
+        from tqdm import tqdm
+
         print(f"\n开始姿态分析... (共 {len(frames_data)} 帧)")
 
-        analyzed_frames = []
+        self.time_series = {}
+        self.dense_frames = []
 
         # 逐帧分析
-        for frame_info in tqdm(frames_data, desc="姿态检测"):
-            image = frame_info["image"]
-
-            # 姿态检测
-            pose_result = self.pose_detector.detect(image)
-
-            if pose_result:
-                # 计算关节角度
-                landmarks = pose_result["landmarks"]
-                angles = self.metrics.calculate_joint_angles(
-                    landmarks,
-                    self.config["angle_metrics"]
-                )
-
-                # 计算重心
-                center_of_mass = self.metrics.calculate_center_of_mass(
-                    landmarks)
-
-                # 计算投篮弧度
-                shooting_arc = self.metrics.calculate_shooting_arc(
-                    landmarks.get("right_shoulder"),
-                    landmarks.get("right_elbow"),
-                    landmarks.get("right_wrist")
-                )
-
-                # 保存分析结果
-                analyzed_frame = {
-                    **frame_info,
-                    "pose_detected": True,
-                    "landmarks": landmarks,
-                    "angles": angles,
-                    "center_of_mass": center_of_mass,
-                    "shooting_arc": shooting_arc,
-                    "pose_result": pose_result
-                }
-            else:
-                # 姿态检测失败
-                analyzed_frame = {
-                    **frame_info,
-                    "pose_detected": False,
-                    "landmarks": None,
-                    "angles": {},
-                    "center_of_mass": None,
-                    "shooting_arc": None
-                }
-
-            analyzed_frames.append(analyzed_frame)
-
-        self.frames_data = analyzed_frames
+        with maybe_stage(self.profiler, "pose", len(frames_data)):
+            self.frames_data = [self._analyze_frame(frame_info)
+                                for frame_info in tqdm(frames_data, desc="姿态检测")]
 
         # 计算时序数据（速度、加速度等）
         print("计算运动学指标...")
-        self._calculate_temporal_metrics(fps)
+        with maybe_stage(self.profiler, "kinematics", len(self.frames_data)):
+            self._calculate_temporal_metrics(fps)
+            self._build_time_series()
 
         # 识别关键帧
         print("识别关键帧...")
-        keyframes = self._detect_keyframes()
-
-        # 计算动作节奏分析（从球最低点开始）
-        print("计算动作节奏...")
-        rhythm_analysis = self.metrics.calculate_rhythm_metrics(keyframes, fps)
-
-        # 检测发力顺序（从球最低点开始）
-        print("检测发力顺序...")
-        force_sequence = self.metrics.detect_force_sequence(
-            self.frames_data, fps, keyframes)
-
-        # 计算能量传递效率（从球最低点到出手）
-        print("计算能量传递效率...")
-        energy_transfer = self.metrics.calculate_energy_transfer_efficiency(
-            self.frames_data, keyframes)
+        with maybe_stage(self.profiler, "keyframes") as stage:
+            keyframes = self._detect_keyframes()
+
+            # 在候选关键帧附近逐帧精细化
+            if video_processor is not None:
+                print("关键帧精细化...")
+                keyframes = self._refine_keyframes(
+                    keyframes, video_processor, fps, dense_frames or {})
+            stage.items = len(keyframes)
+
+        with maybe_stage(self.profiler, "kinematics"):
+            # 计算动作节奏分析（从球最低点开始）
+            print("计算动作节奏...")
+            rhythm_analysis = self.metrics.calculate_rhythm_metrics(keyframes, fps)
+
+            # 检测发力顺序（从球最低点开始）
+            print("检测发力顺序...")
+            force_sequence = self.metrics.detect_force_sequence(
+                self.frames_data, fps, keyframes)
+
+            # 计算能量传递效率（从球最低点到出手）
+            print("计算能量传递效率...")
+            energy_transfer = self.metrics.calculate_energy_transfer_efficiency(
+                self.frames_data, keyframes)
 
         # 确定有效分析范围（从球最低点开始）
         ball_lowest_frame = keyframes.get('ball_lowest', {}).get('index', 0)
@@ -133,7 +119,8 @@ class BasketballShotAnalyzer:
 
         # 保存标注图片
         print("生成标注图片...")
-        self._generate_annotated_images()
+        with maybe_stage(self.profiler, "annotate"):
+            self._generate_annotated_images()
 
         # 汇总分析结果
         self.analysis_results = {
@@ -158,10 +145,165 @@ class BasketballShotAnalyzer:
         print("✓ 分析完成!")
         return self.analysis_results
 
+    def _analyze_frame(self, frame_info: Dict) -> Dict:
+        """对单帧进行姿态检测（命中缓存时直接使用缓存结果）并计算角度、重心和投篮弧度"""
+        if "cached_pose" in frame_info:
+            frame_info = dict(frame_info)
+            pose_result = frame_info.pop("cached_pose")
+        else:
+            pose_result = self.pose_backend.detect_frame(frame_info)
+
+        if not pose_result:
+            # 姿态检测失败
+            return {
+                **frame_info,
+                "pose_detected": False,
+                "landmarks": None,
+                "angles": {},
+                "center_of_mass": None,
+                "shooting_arc": None
+            }
+
+        # 计算关节角度
+        landmarks = pose_result["landmarks"]
+        angles = self.metrics.calculate_joint_angles(
+            landmarks,
+            self.config["angle_metrics"]
+        )
+
+        # 计算重心
+        center_of_mass = self.metrics.calculate_center_of_mass(landmarks)
+
+        # 计算投篮弧度
+        shooting_arc = self.metrics.calculate_shooting_arc(
+            landmarks.get("right_shoulder"),
+            landmarks.get("right_elbow"),
+            landmarks.get("right_wrist")
+        )
+
+        return {
+            **frame_info,
+            "pose_detected": True,
+            "landmarks": landmarks,
+            "angles": angles,
+            "center_of_mass": center_of_mass,
+            "shooting_arc": shooting_arc,
+            "pose_result": pose_result
+        }
+
+    def _refine_keyframes(self, keyframes: Dict[str, Dict], video_processor,
+                          fps: float, cached_frames: Dict[int, Dict]) -> Dict[str, Dict]:
+        """
+        在粗采样检测出的候选关键帧附近逐帧重新解码、检测并评分
+
+        每个候选的搜索窗口是其前后两个粗采样帧之间的区间，重叠窗口的帧只检测一次。
+        关键帧的 index 仍指向最近的粗采样帧（节奏、发力等指标基于粗采样序列），
+        frame_data 替换为窗口内得分最高的逐帧结果。
+
+        Args:
+            keyframes: 第一遍检测的关键帧
+            video_processor: 视频处理器
+            fps: 视频帧率
+            cached_frames: 帧号 -> 缓存的逐帧检测结果（命中的帧不再解码）
+
+        Returns:
+            精细化后按时间排序的关键帧
+        """
+        from sports.basketball.keyframe_detector import KeyframeDetector, REFINABLE_KEYFRAMES
+
+        dense_cache = {}  # 帧号 -> 逐帧分析结果
+        decoded_count = 0
+        refined_count = 0
+        last_index = len(self.frames_data) - 1
+
+        for kf_name, kf_info in keyframes.items():
+            if kf_name not in REFINABLE_KEYFRAMES:
+                continue
+
+            index = kf_info["index"]
+            center_number = self.frames_data[index]["frame_number"]
+            start = self.frames_data[index - 1]["frame_number"] + 1 if index > 0 else 0
+            end = (self.frames_data[index + 1]["frame_number"] - 1 if index < last_index
+                   else video_processor.frame_count - 1)
+
+            # 已检测过的粗采样帧直接复用，只解码窗口内缺失的帧
+            dense_cache.setdefault(center_number, self.frames_data[index])
+            for n in range(start, end + 1):
+                if n not in dense_cache and n in cached_frames:
+                    dense_cache[n] = self._analyze_frame(cached_frames[n])
+            if any(n not in dense_cache for n in range(start, end + 1)):
+                # 窗口与上一帧不连续，清除跟踪和平滑状态，重新从整帧定位人物
+                self.pose_backend.reset()
+                for frame_info in video_processor.read_frame_range(start, end):
+                    if frame_info["frame_number"] not in dense_cache:
+                        dense_cache[frame_info["frame_number"]] = self._analyze_frame(frame_info)
+                        decoded_count += 1
+
+            window = [dict(dense_cache[n]) for n in range(start, end + 1)
+                      if n in dense_cache and dense_cache[n]["pose_detected"]]
+            if len(window) < 2:
+                continue
+            self._calculate_window_velocities(window, fps)
+
+            rescored = KeyframeDetector.rescore_keyframe(kf_name, window)
+            if not rescored:
+                continue
+
+            refined_frame = rescored["frame_data"]
+            if "annotated_image" not in refined_frame and "original_size" not in refined_frame:
+                self._annotate_frame(refined_frame)
+
+            # 精细化后的帧位于前后粗采样帧之间，index 取最近的粗采样帧
+            refined_number = refined_frame["frame_number"]
+            if index > 0 and refined_number - (start - 1) < center_number - refined_number:
+                index -= 1
+            elif index < last_index and (end + 1) - refined_number < refined_number - center_number:
+                index += 1
+
+            keyframes[kf_name] = {
+                **kf_info,
+                "index": index,
+                "frame_data": refined_frame,
+                "timestamp": refined_frame["timestamp"],
+                "description": rescored["description"],
+                "refined": True
+            }
+            if refined_number != center_number:
+                refined_count += 1
+
+        sampled_numbers = {frame["frame_number"] for frame in self.frames_data}
+        self.dense_frames = [frame for n, frame in sorted(dense_cache.items())
+                             if n not in sampled_numbers]
+
+        print(f"✓ 关键帧精细化完成: 额外检测 {decoded_count} 帧，"
+              f"{refined_count} 个关键帧位置得到修正")
+
+        return KeyframeDetector._sort_by_time(keyframes)
+
+    def _calculate_window_velocities(self, window: List[Dict], fps: float):
+        """为逐帧窗口计算速度和加速度（写入窗口内的帧副本）"""
+        timestamps = [frame["timestamp"] for frame in window]
+        for frame in window:
+            frame["velocities"] = {}
+            frame["accelerations"] = {}
+
+        for joint_name in self.config["joints_of_interest"]:
+            positions = [frame["landmarks"].get(joint_name) for frame in window]
+            velocities = self.metrics.calculate_velocity(
+                positions, fps, timestamps=timestamps)
+            accelerations = self.metrics.calculate_acceleration(
+                velocities, fps, timestamps=timestamps)
+
+            for i, frame in enumerate(window):
+                frame["velocities"][joint_name] = velocities[i]
+                frame["accelerations"][joint_name] = accelerations[i]
+
     def _calculate_temporal_metrics(self, fps: float):
         """计算时序相关的指标（速度、加速度）"""
         # 提取各关节点的位置序列
         joints_of_interest = self.config["joints_of_interest"]
+        # 帧可能按间隔或非均匀采样，速度按实际时间间隔计算
+        timestamps = [frame["timestamp"] for frame in self.frames_data]
 
         for joint_name in joints_of_interest:
             positions = []
@@ -172,11 +314,12 @@ class BasketballShotAnalyzer:
                     positions.append(None)
 
             # 计算速度
-            velocities = self.metrics.calculate_velocity(positions, fps)
+            velocities = self.metrics.calculate_velocity(
+                positions, fps, timestamps=timestamps)
 
             # 计算加速度
             accelerations = self.metrics.calculate_acceleration(
-                velocities, fps)
+                velocities, fps, timestamps=timestamps)
 
             # 保存到各帧
             for i, frame in enumerate(self.frames_data):
@@ -188,6 +331,12 @@ class BasketballShotAnalyzer:
                 frame["velocities"][joint_name] = velocities[i]
                 frame["accelerations"][joint_name] = accelerations[i]
 
+            # 同时保留列式数组，供数据导出直接使用
+            self.time_series.setdefault("velocities", {})[
+                joint_name] = np.asarray(velocities, dtype=float)
+            self.time_series.setdefault("accelerations", {})[
+                joint_name] = np.asarray(accelerations, dtype=float)
+
         # 计算重心高度序列（用于检测最低点）
         com_heights = []
         for frame in self.frames_data:
@@ -200,6 +349,27 @@ class BasketballShotAnalyzer:
         for i, frame in enumerate(self.frames_data):
             frame["com_height"] = com_heights[i]
 
+    def _build_time_series(self):
+        """收集逐帧标量指标为列式数组（速度、加速度已在时序计算中写入）"""
+        series = DataManager.series_from_frames(self.frames_data)
+
+        # 配置的角度指标即使全程未检测到也保留一列（全为 NaN）
+        for metric in self.config["angle_metrics"]:
+            series["angles"].setdefault(metric["name"], np.full(len(self.frames_data), np.nan))
+
+        # 速度沿用时序计算得到的数组，加速度只在 time_series 中
+        series["velocities"].update(self.time_series.get("velocities", {}))
+        self.time_series.update(series)
+
+    def get_time_series(self) -> Dict:
+        """
+        获取最近一次分析的列式时序数组
+
+        Returns:
+            时序数据字典，可直接传给 DataManager.create_dataframes
+        """
+        return self.time_series
+
     def _detect_keyframes(self) -> Dict[str, Dict]:
         """检测关键帧"""
         from sports.basketball.keyframe_detector import KeyframeDetector
@@ -209,52 +379,82 @@ class BasketballShotAnalyzer:
         return keyframes
 
     def _generate_annotated_images(self):
-        """为所有帧生成带标注的图片"""
-        joints_to_draw = self.config["joints_of_interest"]
+        """
+        为所有帧生成带标注的图片
 
+        缩小到推理分辨率的帧不在此标注（像素坐标位于原视频空间），
+        保存关键帧图片时再基于原分辨率帧生成。
+        """
         for frame in self.frames_data:
-            if frame["pose_detected"] and "pose_result" in frame:
-                # 绘制骨架
-                annotated_image = self.pose_detector.draw_custom_landmarks(
-                    frame["image"],
-                    frame["pose_result"],
-                    joints_to_draw,
-                    color=(0, 255, 0),
-                    thickness=2,
-                    radius=5
+            if "original_size" not in frame and frame.get("image") is not None:
+                self._annotate_frame(frame)
+
+    def _annotate_frame(self, frame: Dict, image=None):
+        """
+        为单帧生成带骨架和角度标注的图片
+
+        Args:
+            frame: 帧数据
+            image: 用于标注的原分辨率图像，默认使用帧自身的图像
+        """
+        if not (frame["pose_detected"] and "pose_result" in frame):
+            return
+        if image is None and frame.get("image") is None:
+            # 缓存还原的帧不含图像
+            return
+
+        import cv2
+
+        # 绘制骨架
+        annotated_image = draw_custom_landmarks(
+            frame["image"] if image is None else image,
+            frame["pose_result"],
+            self.config["joints_of_interest"],
+            color=(0, 255, 0),
+            thickness=2,
+            radius=5
+        )
+
+        # 添加角度信息
+        if frame.get("angles"):
+            y_offset = 30
+            for angle_name, angle_value in frame["angles"].items():
+                text = f"{angle_name}: {angle_value:.1f}°"
+                cv2.putText(
+                    annotated_image,
+                    text,
+                    (10, y_offset),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6,
+                    (255, 255, 0),
+                    2
                 )
+                y_offset += 25
 
-                # 添加角度信息
-                if frame.get("angles"):
-                    y_offset = 30
-                    for angle_name, angle_value in frame["angles"].items():
-                        text = f"{angle_name}: {angle_value:.1f}°"
-                        cv2.putText(
-                            annotated_image,
-                            text,
-                            (10, y_offset),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.6,
-                            (255, 255, 0),
-                            2
-                        )
-                        y_offset += 25
-
-                frame["annotated_image"] = annotated_image
-
-    def save_keyframe_images(self, output_dir: str, keyframes: Dict):
+        frame["annotated_image"] = annotated_image
+
+    def save_keyframe_images(self, output_dir: str, keyframes: Dict,
+                             video_processor=None):
         """
         保存关键帧图片
 
         Args:
             output_dir: 输出目录
             keyframes: 关键帧字典
+            video_processor: 视频处理器；帧缩小到推理分辨率时用于重新解码原分辨率帧
         """
+        import cv2
+
         os.makedirs(output_dir, exist_ok=True)
 
         for keyframe_name, keyframe_info in keyframes.items():
             frame_data = keyframe_info["frame_data"]
 
+            if "annotated_image" not in frame_data and video_processor is not None:
+                full_image = video_processor.get_full_resolution_image(frame_data)
+                if full_image is not None:
+                    self._annotate_frame(frame_data, full_image)
+
             if "annotated_image" in frame_data:
                 output_path = os.path.join(
                     output_dir, f"keyframe_{keyframe_name}.jpg")
@@ -0,0 +1,138 @@
+"""
+投篮分段器
+
+在长时间训练视频中，根据手腕和重心的低成本时序数据切分出每一次投篮的时间窗口，
+使每个窗口内只包含一次投篮，便于逐个进行关键帧检测和指标计算。
+
+分段规则：
+- 手腕高于肩部（图像坐标 y 更小）超过一定幅度的连续区间视为一次出手动作
+- 间隔很短的相邻区间合并为一次投篮
+- 窗口起点在出手前的引导区间内取球最低点（手腕最低）和重心最低点中较早者
+- 窗口终点为出手结束后加上随球时间，且不越过下一次投篮的起点
+
+使用方法：
+    from sports.basketball.shot_segmenter import ShotSegmenter
+    windows = ShotSegmenter.segment(series)
+"""
+import numpy as np
+from typing import Dict, List
+
+
+class ShotSegmenter:
+    """投篮分段器"""
+
+    @staticmethod
+    def segment(series: Dict[str, np.ndarray], raise_margin: float = 0.03,
+                merge_gap_seconds: float = 0.6, lead_seconds: float = 2.5,
+                follow_seconds: float = 1.0, padding_seconds: float = 0.3) -> List[Dict]:
+        """
+        将时序数据切分为逐次投篮的窗口
+
+        Args:
+            series: 时序数组字典，包含 frame_number、timestamp、wrist_y、
+                shoulder_y、com_y（归一化坐标，缺失为 NaN）
+            raise_margin: 手腕高于肩部的最小幅度（归一化坐标）
+            merge_gap_seconds: 小于该间隔的相邻出手区间合并为一次投篮
+            lead_seconds: 出手前搜索起点的最长时间
+            follow_seconds: 出手后保留的随球时间
+            padding_seconds: 窗口起点额外向前保留的时间
+
+        Returns:
+            投篮窗口列表，每个元素包含 shot_index、start_frame、end_frame、
+            release_frame、start_time、end_time；未检测到出手时返回覆盖全片的单个窗口
+        """
+        frame_numbers = np.asarray(series["frame_number"])
+        timestamps = np.asarray(series["timestamp"], dtype=float)
+        wrist_y = np.asarray(series["wrist_y"], dtype=float)
+        shoulder_y = np.asarray(series["shoulder_y"], dtype=float)
+        com_y = np.asarray(series["com_y"], dtype=float)
+
+        if len(frame_numbers) == 0:
+            return []
+
+        # 手腕明显高于肩部的采样点（NaN 比较结果为 False）
+        with np.errstate(invalid='ignore'):
+            raised = wrist_y < shoulder_y - raise_margin
+
+        events = ShotSegmenter._merge_runs(
+            ShotSegmenter._find_runs(raised), timestamps, merge_gap_seconds)
+
+        if not events:
+            return [ShotSegmenter._build_window(
+                0, 0, len(frame_numbers) - 1, int(np.nanargmin(wrist_y))
+                if np.any(~np.isnan(wrist_y)) else 0, frame_numbers, timestamps)]
+
+        windows = []
+        previous_end = 0
+        for shot_index, (run_start, run_end) in enumerate(events):
+            # 起点：引导区间内球最低点（手腕 y 最大）与重心最低点（重心 y 最大）中较早者
+            lead_start = max(previous_end, ShotSegmenter._first_index_from(
+                timestamps, timestamps[run_start] - lead_seconds))
+            anchors = [run_start]
+            for values in (wrist_y, com_y):
+                lead = values[lead_start:run_start + 1]
+                if np.any(~np.isnan(lead)):
+                    anchors.append(lead_start + int(np.nanargmax(lead)))
+            start = max(previous_end, ShotSegmenter._first_index_from(
+                timestamps, timestamps[min(anchors)] - padding_seconds))
+
+            # 终点：出手结束后的随球时间，不越过下一次出手
+            next_start = events[shot_index + 1][0] - 1 if shot_index + 1 < len(events) else len(timestamps) - 1
+            end = min(next_start, ShotSegmenter._last_index_until(
+                timestamps, timestamps[run_end] + follow_seconds))
+
+            # 出手点：出手区间内手腕最高的位置
+            run_wrist = wrist_y[run_start:run_end + 1]
+            release = run_start + int(np.nanargmin(run_wrist))
+
+            windows.append(ShotSegmenter._build_window(
+                shot_index, start, end, release, frame_numbers, timestamps))
+            previous_end = end + 1
+
+        return windows
+
+    @staticmethod
+    def _find_runs(mask: np.ndarray) -> List[List[int]]:
+        """找出布尔序列中连续为 True 的区间 [start, end]"""
+        if not np.any(mask):
+            return []
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        return [[int(s), int(e)] for s, e in zip(starts, ends)]
+
+    @staticmethod
+    def _merge_runs(runs: List[List[int]], timestamps: np.ndarray,
+                    merge_gap_seconds: float) -> List[List[int]]:
+        """合并时间间隔过短的相邻区间"""
+        merged = []
+        for run in runs:
+            if merged and timestamps[run[0]] - timestamps[merged[-1][1]] < merge_gap_seconds:
+                merged[-1][1] = run[1]
+            else:
+                merged.append(list(run))
+        return merged
+
+    @staticmethod
+    def _first_index_from(timestamps: np.ndarray, time: float) -> int:
+        """时间不早于 time 的第一个采样点索引"""
+        return max(0, int(np.searchsorted(timestamps, time, side='left')))
+
+    @staticmethod
+    def _last_index_until(timestamps: np.ndarray, time: float) -> int:
+        """时间不晚于 time 的最后一个采样点索引"""
+        return min(len(timestamps) - 1, int(np.searchsorted(timestamps, time, side='right')) - 1)
+
+    @staticmethod
+    def _build_window(shot_index: int, start: int, end: int, release: int,
+                      frame_numbers: np.ndarray, timestamps: np.ndarray) -> Dict:
+        """构建窗口字典（帧号为原视频帧号）"""
+        return {
+            "shot_index": shot_index,
+            "start_frame": int(frame_numbers[start]),
+            "end_frame": int(frame_numbers[end]),
+            "release_frame": int(frame_numbers[release]),
+            "start_time": float(timestamps[start]),
+            "end_time": float(timestamps[end])
+        }
@@ -0,0 +1,210 @@
+"""
+速度档位与校准基准
+
+速度档位（fast / balanced / precise）定义在 config.SPEED_PROFILES 中，
+每个档位是对分析配置的覆盖项，统一决定模型复杂度、推理分辨率和采样密度。
+
+校准基准在参考视频上依次运行各档位，报告处理速度，以及各档位关键帧位置
+与 precise 档位的一致程度，用于确认快速档位的结果是否可接受。
+
+使用方法：
+    python -m sports.basketball.speed_profiles path/to/reference.mp4
+    python -m sports.basketball.speed_profiles path/to/reference.mp4 --profiles fast balanced --output report.json
+"""
+import argparse
+import copy
+import json
+import time
+from typing import Dict, List, Optional
+
+from config import BASKETBALL_SHOT_CONFIG, SPEED_PROFILES
+
+# 关键帧位置一致的容差（原视频帧数）
+KEYFRAME_TOLERANCE_FRAMES = 3
+
+
+def apply_speed_profile(config: Dict, profile: Optional[str]) -> Dict:
+    """
+    将速度档位应用到分析配置
+
+    Args:
+        config: 基础配置（不会被修改）
+        profile: 档位名称；None 时返回原配置的副本
+
+    Returns:
+        应用档位覆盖项后的新配置
+    """
+    merged = copy.deepcopy(config)
+    if profile is None:
+        return merged
+
+    if profile not in SPEED_PROFILES:
+        raise ValueError(
+            f"未知的速度档位: {profile}（可选: {', '.join(SPEED_PROFILES)}）")
+
+    _deep_update(merged, SPEED_PROFILES[profile]["overrides"])
+    merged["speed_profile"] = profile
+    return merged
+
+
+def _deep_update(target: Dict, overrides: Dict):
+    """递归合并字典（覆盖项中的嵌套字典逐键合并）"""
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_update(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def run_profile(video_path: str, profile: str, config: Dict = None) -> Dict:
+    """
+    按指定档位完整分析一次视频并计时
+
+    Args:
+        video_path: 视频文件路径
+        profile: 档位名称
+        config: 基础配置，默认使用全局配置
+
+    Returns:
+        {profile, wall_time, sampled_frames, video_fps_processed, inference_fps, keyframes}
+        keyframes 为 关键帧名 -> 原视频帧号
+    """
+    from core.video_processor import VideoProcessor
+    from sports.basketball.shot_analyzer import BasketballShotAnalyzer
+
+    profile_config = apply_speed_profile(config or BASKETBALL_SHOT_CONFIG, profile)
+    sampling_config = profile_config.get("adaptive_sampling", {})
+
+    start = time.perf_counter()
+
+    processor = VideoProcessor(
+        video_path, max_inference_dimension=profile_config.get("max_inference_dimension"))
+    frames_data = processor.extract_frames(
+        frame_interval=profile_config.get("frame_interval", 5),
+        adaptive=sampling_config.get("enabled", False),
+        min_interval=sampling_config.get("min_frame_interval", 1),
+        max_interval=sampling_config.get("max_frame_interval")
+    )
+    analyzer = BasketballShotAnalyzer(profile_config)
+    analysis_results = analyzer.analyze_frames(frames_data, processor.fps)
+
+    wall_time = time.perf_counter() - start
+
+    return {
+        "profile": profile,
+        "wall_time": wall_time,
+        "sampled_frames": len(frames_data),
+        "video_fps_processed": processor.frame_count / wall_time if wall_time > 0 else 0.0,
+        "inference_fps": len(frames_data) / wall_time if wall_time > 0 else 0.0,
+        "keyframes": {
+            name: kf_info["frame_data"]["frame_number"]
+            for name, kf_info in analysis_results["keyframes"].items()
+        }
+    }
+
+
+def keyframe_agreement(keyframes: Dict[str, int], reference: Dict[str, int],
+                       tolerance: int = KEYFRAME_TOLERANCE_FRAMES) -> Dict:
+    """
+    比较关键帧位置与参考结果的一致程度
+
+    Args:
+        keyframes: 关键帧名 -> 原视频帧号
+        reference: 参考档位的关键帧名 -> 原视频帧号
+        tolerance: 视为一致的最大帧差
+
+    Returns:
+        {compared, missing, within_tolerance, agreement_rate, mean_abs_frame_error, per_keyframe}
+    """
+    per_keyframe = {}
+    for name, reference_frame in reference.items():
+        if name in keyframes:
+            per_keyframe[name] = keyframes[name] - reference_frame
+
+    errors = [abs(diff) for diff in per_keyframe.values()]
+    within = sum(1 for error in errors if error <= tolerance)
+
+    return {
+        "compared": len(per_keyframe),
+        "missing": sorted(set(reference) - set(keyframes)),
+        "within_tolerance": within,
+        "agreement_rate": within / len(reference) if reference else 0.0,
+        "mean_abs_frame_error": sum(errors) / len(errors) if errors else None,
+        "per_keyframe": per_keyframe
+    }
+
+
+def calibrate(video_path: str, profiles: List[str] = None, reference: str = "precise",
+              tolerance: int = KEYFRAME_TOLERANCE_FRAMES) -> Dict:
+    """
+    在参考视频上校准各速度档位
+
+    Args:
+        video_path: 参考视频路径
+        profiles: 要测试的档位，默认全部
+        reference: 作为基准的档位
+        tolerance: 关键帧一致的容差（帧）
+
+    Returns:
+        {reference, tolerance_frames, results: [...]}，每个结果包含速度和与基准的一致程度
+    """
+    profiles = list(profiles or SPEED_PROFILES)
+    if reference not in profiles:
+        profiles.append(reference)
+
+    # 先运行基准档位
+    runs = {reference: run_profile(video_path, reference)}
+    for profile in profiles:
+        if profile not in runs:
+            runs[profile] = run_profile(video_path, profile)
+
+    results = []
+    for profile in profiles:
+        run = runs[profile]
+        run["agreement"] = keyframe_agreement(
+            run["keyframes"], runs[reference]["keyframes"], tolerance)
+        run["speedup"] = (runs[reference]["wall_time"] / run["wall_time"]
+                          if run["wall_time"] > 0 else 0.0)
+        results.append(run)
+
+    return {
+        "video_path": video_path,
+        "reference": reference,
+        "tolerance_frames": tolerance,
+        "results": results
+    }
+
+
+def main():
+    """命令行入口：打印校准结果，可选保存为 JSON"""
+    parser = argparse.ArgumentParser(description="速度档位校准基准")
+    parser.add_argument("video", help="参考视频路径")
+    parser.add_argument("--profiles", nargs="+", choices=list(SPEED_PROFILES),
+                        help="要测试的档位（默认全部）")
+    parser.add_argument("--reference", default="precise", choices=list(SPEED_PROFILES),
+                        help="基准档位（默认 precise）")
+    parser.add_argument("--tolerance", type=int, default=KEYFRAME_TOLERANCE_FRAMES,
+                        help="关键帧一致的容差（帧）")
+    parser.add_argument("--output", help="保存结果的 JSON 文件路径")
+    args = parser.parse_args()
+
+    report = calibrate(args.video, args.profiles, args.reference, args.tolerance)
+
+    print("\n" + "=" * 70)
+    print(f"速度档位校准（基准: {report['reference']}，容差: ±{report['tolerance_frames']}帧）")
+    print("=" * 70)
+    print(f"{'档位':<10}{'耗时(s)':>10}{'视频帧/秒':>12}{'推理帧/秒':>12}{'加速比':>8}{'关键帧一致率':>14}")
+    for result in report["results"]:
+        agreement = result["agreement"]
+        print(f"{result['profile']:<10}{result['wall_time']:>10.2f}"
+              f"{result['video_fps_processed']:>12.1f}{result['inference_fps']:>12.1f}"
+              f"{result['speedup']:>8.2f}{agreement['agreement_rate']:>14.0%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 校准结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ class ChartsManager {
         this.data = analysisData;
         this.sync = syncController;
         this.charts = {};
+        this.specs = {};
     }
     
     createRealtimeChart(canvasId) {
@@ -15,31 +16,7 @@ class ChartsManager {
         
         // 准备数据
         const frames = this.data.frames.map((f, i) => i);
-        const angles = this.extractAngles();
-        
-        const datasets = [];
-        const angleNames = Object.keys(angles);
-        const colors = [
-            'rgba(255, 99, 132, 1)',
-            'rgba(54, 162, 235, 1)',
-            'rgba(255, 206, 86, 1)',
-            'rgba(75, 192, 192, 1)',
-            'rgba(153, 102, 255, 1)',
-            'rgba(255, 159, 64, 1)'
-        ];
-        
-        angleNames.forEach((angleName, index) => {
-            datasets.push({
-                label: this.formatAngleName(angleName),
-                data: angles[angleName],
-                borderColor: colors[index % colors.length],
-                backgroundColor: colors[index % colors.length].replace('1)', '0.1)'),
-                borderWidth: 2,
-                tension: 0.4,
-                pointRadius: 0,
-                pointHoverRadius: 5
-            });
-        });
+        const datasets = this.buildRealtimeDatasets();
         
         const chart = new Chart(ctx, {
             type: 'line',
@@ -104,6 +81,7 @@ class ChartsManager {
         });
         
         this.charts[canvasId] = chart;
+        this.specs[canvasId] = { type: 'realtime' };
         this.sync.registerChart(canvasId, chart);
         
         return chart;
@@ -173,6 +151,7 @@ class ChartsManager {
         });
         
         this.charts[canvasId] = chart;
+        this.specs[canvasId] = { type: 'angle', name: angleName };
         return chart;
     }
     
@@ -236,12 +215,68 @@ class ChartsManager {
         });
         
         this.charts[canvasId] = chart;
+        this.specs[canvasId] = { type: 'velocity', name: jointName };
         return chart;
     }
     
+    buildRealtimeDatasets() {
+        const angles = this.extractAngles();
+        const colors = [
+            'rgba(255, 99, 132, 1)',
+            'rgba(54, 162, 235, 1)',
+            'rgba(255, 206, 86, 1)',
+            'rgba(75, 192, 192, 1)',
+            'rgba(153, 102, 255, 1)',
+            'rgba(255, 159, 64, 1)'
+        ];
+        
+        return Object.keys(angles).map((angleName, index) => ({
+            label: this.formatAngleName(angleName),
+            data: angles[angleName],
+            borderColor: colors[index % colors.length],
+            backgroundColor: colors[index % colors.length].replace('1)', '0.1)'),
+            borderWidth: 2,
+            tension: 0.4,
+            pointRadius: 0,
+            pointHoverRadius: 5
+        }));
+    }
+    
+    refreshData() {
+        // 逐帧数据分块加载后，用当前的 this.data.frames 重新填充所有图表
+        const timestamps = this.data.frames.map(f => f.timestamp.toFixed(2));
+        
+        Object.entries(this.specs).forEach(([canvasId, spec]) => {
+            const chart = this.charts[canvasId];
+            
+            if (spec.type === 'realtime') {
+                chart.data.labels = this.data.frames.map((f, i) => i);
+                chart.data.datasets = this.buildRealtimeDatasets();
+            } else if (spec.type === 'angle') {
+                chart.data.labels = timestamps;
+                chart.data.datasets[0].data = this.data.frames.map(f => f.angles[spec.name] || 0);
+            } else if (spec.type === 'velocity') {
+                chart.data.labels = timestamps;
+                chart.data.datasets[0].data = this.data.frames.map(f =>
+                    (f.velocities && f.velocities[spec.name]) ? f.velocities[spec.name] : 0
+                );
+            }
+            
+            chart.update('none');
+        });
+    }
+    
     extractAngles() {
         const angles = {};
         
+        // external 模式下角度名称由数据清单给出，保证各帧对齐
+        if (this.data.series) {
+            this.data.series.angles.forEach(angleName => {
+                angles[angleName] = this.data.frames.map(f => f.angles[angleName] || 0);
+            });
+            return angles;
+        }
+        
         this.data.frames.forEach(frame => {
             if (frame.angles) {
                 Object.keys(frame.angles).forEach(angleName => {
@@ -0,0 +1,90 @@
+/**
+ * 报表数据加载器
+ * external 数据模式下按顺序加载逐帧数据分块，并追加到 analysisData.frames
+ */
+
+class ReportDataLoader {
+    constructor(analysisData) {
+        this.data = analysisData;
+        this.manifest = analysisData.series || null;
+        this.listeners = [];
+        this.loadedChunks = 0;
+    }
+    
+    isExternal() {
+        return this.manifest !== null;
+    }
+    
+    onChunk(callback) {
+        this.listeners.push(callback);
+    }
+    
+    async load() {
+        if (!this.isExternal()) {
+            return;
+        }
+        
+        // 并行请求所有分块，但按顺序追加，保证帧数组有序
+        const requests = this.manifest.chunks.map(url =>
+            fetch(url).then(response => {
+                if (!response.ok) {
+                    throw new Error(`加载数据文件失败: ${url} (${response.status})`);
+                }
+                return response.json();
+            })
+        );
+        
+        for (const request of requests) {
+            let chunk;
+            try {
+                chunk = await request;
+            } catch (error) {
+                console.error(error);
+                return;
+            }
+            
+            this.appendChunk(chunk);
+            this.loadedChunks += 1;
+            this.listeners.forEach(callback => callback(this.loadedChunks, this.manifest.chunks.length));
+        }
+        
+        console.log('Loaded', this.data.frames.length, 'frames from', this.loadedChunks, 'data files');
+    }
+    
+    appendChunk(chunk) {
+        const angleNames = Object.keys(chunk.angles);
+        const jointNames = Object.keys(chunk.velocities);
+        
+        for (let i = 0; i < chunk.frame_number.length; i++) {
+            const angles = {};
+            angleNames.forEach(name => {
+                const value = chunk.angles[name][i];
+                if (value !== null) {
+                    angles[name] = value;
+                }
+            });
+            
+            const velocities = {};
+            const accelerations = {};
+            jointNames.forEach(name => {
+                const velocity = chunk.velocities[name][i];
+                if (velocity !== null) {
+                    velocities[name] = velocity;
+                }
+                const acceleration = chunk.accelerations[name][i];
+                if (acceleration !== null) {
+                    accelerations[name] = acceleration;
+                }
+            });
+            
+            this.data.frames.push({
+                frame_number: chunk.frame_number[i],
+                timestamp: chunk.timestamp[i],
+                pose_detected: chunk.pose_detected[i] === 1,
+                angles: angles,
+                velocities: velocities,
+                accelerations: accelerations
+            });
+        }
+    }
+}